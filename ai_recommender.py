@@ -1,44 +1,405 @@
 import requests
 import json
 import os
+import queue
 import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from itertools import chain, islice
+from single_flight import SharedStops, SingleFlight
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from recommendation_cache import RecommendationCache
+from json_stream import JsonArrayParser
+from track_catalog import CATALOG, MOODS, artist_key, credits_any
+from prompt_spec import parse_prompt
+from journey_sequencer import CURVES, DEFAULT_CURVE, mood_order, mood_points, sequence
+from track_record import Track, to_dicts
+from rate_limiter import parse_retry_after
 
 # Get the Hugging Face API key from environment variables
 HUGGINGFACE_API_KEY = os.environ.get('HUGGINGFACE_API_KEY', '')
+HUGGINGFACE_API_URL = "https://api-inference.huggingface.co/models/mistralai/Mistral-7B-Instruct-v0.2"
+
+# Seconds to wait for the model when no journey deadline applies
+HUGGINGFACE_CONNECT_TIMEOUT = 5
+HUGGINGFACE_TIMEOUT = int(os.environ.get('HUGGINGFACE_TIMEOUT', '60'))
+
+# Identical prompts arriving together (e.g. template buttons) share one inference call
+inference_single_flight = SingleFlight(wait_timeout=HUGGINGFACE_TIMEOUT)
+# A shared generation is stopped only once every request waiting on it has given up
+inference_stops = SharedStops()
+
+# Inference calls racing a journey deadline run here, so the request thread can give up on them
+inference_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('HUGGINGFACE_MAX_CONCURRENCY', '8')), thread_name_prefix="inference")
+
+# Tracks a streamed generation may get ahead of the client reading them
+STREAM_QUEUE_SIZE = 20
+
+# While the model keeps failing (errors, timeouts, "model is loading"), skip it and use the local fallback
+inference_breaker = CircuitBreaker(
+    "huggingface",
+    failure_rate=float(os.environ.get('HUGGINGFACE_BREAKER_FAILURE_RATE', '0.5')),
+    min_calls=int(os.environ.get('HUGGINGFACE_BREAKER_MIN_CALLS', '4')),
+    window=float(os.environ.get('HUGGINGFACE_BREAKER_WINDOW', '120')),
+    open_seconds=float(os.environ.get('HUGGINGFACE_BREAKER_OPEN_SECONDS', '60'))
+)
+
+# Finished AI recommendations, reused when the same prompt arrives with the same taste summary.
+# Set RECOMMENDATION_CACHE_PATH to share them between workers.
+recommendation_cache = RecommendationCache(
+    path=os.environ.get('RECOMMENDATION_CACHE_PATH') or None,
+    ttl=int(os.environ.get('RECOMMENDATION_CACHE_TTL', '3600')),
+    max_entries=int(os.environ.get('RECOMMENDATION_CACHE_MAX_ENTRIES', '1000'))
+)
+
+# Journey seeds are drawn from here when the request doesn't bring its own
+_seed_source = random.SystemRandom()
+MAX_SEED = 2 ** 32
+
+def journey_seed(seed=None):
+    """
+    The seed a journey is built with: the client's, so an earlier journey can be replayed,
+    or a fresh one. Raises ValueError if the client's seed isn't an integer.
+    """
+    if seed is None:
+        return _seed_source.randrange(MAX_SEED)
+    if isinstance(seed, bool) or not isinstance(seed, (int, str)) or not str(seed).lstrip('-').isdigit():
+        raise ValueError("seed must be an integer")
+    return int(seed) % MAX_SEED
+
+def journey_random(seed, prompt):
+    """
+    A private RNG for one journey. Seeded from a string, which Python hashes with SHA-512
+    rather than the per-process salted hash(), so the same seed and prompt shuffle the
+    same way on every worker and never touch the shared module-level RNG.
+    """
+    return random.Random(f"{seed}:{prompt}")
+
+def non_empty_items(items):
+    """
+    Return None if items is None or empty, otherwise an iterator over all of them.
+    Works for plain lists and for lazy paginated iterators, which are only advanced by one item.
+    """
+    if items is None:
+        return None
+    iterator = iter(items)
+    try:
+        first = next(iterator)
+    except StopIteration:
+        return None
+    return chain([first], iterator)
+
+def generate_recommendations(prompt, top_artists=None, top_tracks=None, seed=None):
+    """
+    Generate music recommendations using AI based on a prompt and user's top artists/tracks.
+    Tracks are returned as dicts in the API's JSON shape.
+    top_artists and top_tracks can be lists or lazy iterators; only as many items as needed are consumed.
+    """
+    return generate_journey(prompt, top_artists, top_tracks, seed=seed)['tracks']
+
+def generate_journey(prompt, top_artists=None, top_tracks=None, budget=None, seed=None):
+    """
+    Generate a journey and report which path produced it.
+
+    With a budget (in seconds) the AI call runs in the background while the local fallback
+    is built, and the AI result is only used if it arrives before the deadline.
+    Returns {"tracks": [...], "source": "ai" | "mixed_artist_journey" | "fallback", "seed": seed},
+    plus "fallback_reason" when the fallback was used. Local journeys built from the same
+    prompt, seed and top artists are identical, so passing the returned seed back replays them.
+    """
+    seed = journey_seed(seed)
+    journey = _generate_journey(prompt, top_artists, top_tracks, budget, seed)
+    return {**journey, "tracks": to_dicts(journey["tracks"]), "seed": seed}
+
+def _generate_journey(prompt, top_artists, top_tracks, budget, seed):
+    try:
+        top_artists = non_empty_items(top_artists)
+        top_tracks = non_empty_items(top_tracks)
+
+        journey = mixed_journey(prompt, top_artists, top_tracks, seed)
+        if journey:
+            return journey
+
+        taste = taste_summary(top_artists, top_tracks)
+        journey = journey_without_model(prompt, taste, seed)
+        if journey:
+            return journey
+
+        if budget is None:
+            recommendations = _generate_ai_tracks(prompt, taste, HUGGINGFACE_TIMEOUT, check_cache=False)
+            if recommendations:
+                return {"tracks": recommendations, "source": "ai"}
+            return fallback_journey(prompt, seed, "ai_failed")
+
+        # Race the model against the deadline, building the fallback while it generates
+        deadline = time.monotonic() + budget
+        key = recommendation_cache.make_key(prompt, *taste)
+        stop = inference_stops.join(key)
+        try:
+            ai_future = inference_executor.submit(_generate_ai_tracks, prompt, taste, budget, False, stop)
+            fallback = fallback_recommendations(prompt, seed)
+            recommendations = ai_future.result(timeout=max(deadline - time.monotonic(), 0))
+        except FutureTimeoutError:
+            print(f"AI recommendations did not arrive within {budget}s. Using fallback recommendations.")
+            return {"tracks": fallback, "source": "fallback", "fallback_reason": "deadline"}
+        finally:
+            # Once no other request is waiting, this frees the inference thread instead of
+            # letting it finish an answer nobody will use
+            inference_stops.leave(key)
+
+        if recommendations:
+            return {"tracks": recommendations, "source": "ai"}
+        return {"tracks": fallback, "source": "fallback", "fallback_reason": "ai_failed"}
+
+    except Exception as e:
+        print(f"Error generating AI recommendations: {e}")
+        return fallback_journey(prompt, seed, "error")
+
+def mixed_journey(prompt, top_artists, top_tracks, seed):
+    """
+    The mixed artist journey if the prompt asks for one and we have top artists, else None.
+    top_artists and top_tracks must already have been through non_empty_items.
+    """
+    # Check if this is a request for a mixed artist journey with a specific intro track
+    spec = parse_prompt(prompt)
+
+    # If we have top artists and it's a mixed journey request, use our specialized function
+    if (spec.mixed_journey or spec.intro) and top_artists:
+        print("Using specialized mixed artist journey with actual top artists")
+        return {"tracks": create_mixed_artist_journey(prompt, top_artists, top_tracks, seed), "source": "mixed_artist_journey"}
+    return None
+
+def journey_without_model(prompt, taste, seed):
+    """
+    An AI journey from the cache, or the local fallback if the model can't be asked right
+    now; None if the model should be asked. The cache comes first, so cached journeys are
+    still served while the model is down or unconfigured.
+    """
+    found, cached = recommendation_cache.get(recommendation_cache.make_key(prompt, *taste))
+    if found and cached:
+        print("Using cached AI recommendations")
+        return {"tracks": [Track.from_dict(track) for track in cached], "source": "ai"}
+
+    # Check if we have an API key
+    if not HUGGINGFACE_API_KEY:
+        print("No Hugging Face API key found. Using fallback recommendations.")
+        return fallback_journey(prompt, seed, "no_api_key")
+
+    if inference_breaker.is_open():
+        print("Hugging Face circuit is open. Using fallback recommendations.")
+        return fallback_journey(prompt, seed, "circuit_open")
+
+    return None
+
+def stream_journey(prompt, top_artists=None, top_tracks=None, budget=None, seed=None):
+    """
+    Streaming version of generate_journey. Yields {"tracks": [...]} with the tracks available
+    so far, as soon as there are any (all of them at once for cached and local journeys, then
+    whatever the model has produced since the last batch), then a final
+    {"source": ..., "seed": ..., "fallback_reason": ...} summary.
+
+    With a budget, the local fallback is used if the model hasn't produced its first track
+    (or stalls between tracks) within budget seconds. Tracks already sent are kept. The
+    generation is stopped when the deadline passes or the caller closes this generator
+    (the client disconnected).
+    """
+    def finish(journey):
+        yield {"tracks": to_dicts(journey['tracks'])}
+        yield {**{key: value for key, value in journey.items() if key != 'tracks'}, "seed": seed}
+
+    seed = journey_seed(seed)
+    try:
+        top_artists = non_empty_items(top_artists)
+        top_tracks = non_empty_items(top_tracks)
+        journey = mixed_journey(prompt, top_artists, top_tracks, seed)
+        if not journey:
+            taste = taste_summary(top_artists, top_tracks)
+            journey = journey_without_model(prompt, taste, seed)
+        if journey:
+            yield from finish(journey)
+            return
+    except Exception as e:
+        print(f"Error generating AI recommendations: {e}")
+        yield from finish(fallback_journey(prompt, seed, "error"))
+        return
+
+    # The model is read on an inference thread so waiting for the next track can time out
+    tracks = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+    done = object()
+    stop = threading.Event()
+
+    def put(item):
+        # Blocks while the reader is behind, gives up once it has gone
+        while not stop.is_set():
+            try:
+                tracks.put(item, timeout=1)
+                return
+            except queue.Full:
+                pass
+
+    def pump():
+        try:
+            for track in _stream_tracks(prompt, *taste, budget or HUGGINGFACE_TIMEOUT, check_cache=False, stop=stop):
+                put(track)
+        except CircuitOpenError:
+            print("Hugging Face circuit is open. Skipping the AI call.")
+        except GenerationStopped:
+            # The reader is gone, nothing to report
+            pass
+        except Exception as e:
+            print(f"Error generating AI recommendations: {e}")
+        finally:
+            put(done)
+
+    inference_executor.submit(pump)
+    sent = 0
+    try:
+        while True:
+            try:
+                track = tracks.get(timeout=budget)
+            except queue.Empty:
+                print(f"AI recommendations stalled for {budget}s after {sent} tracks.")
+                reason = "deadline"
+                break
+            batch = [track]
+            # Take everything else the model has produced meanwhile
+            while batch[-1] is not done:
+                try:
+                    batch.append(tracks.get_nowait())
+                except queue.Empty:
+                    break
+            finished = batch[-1] is done
+            if finished:
+                batch.pop()
+            if batch:
+                sent += len(batch)
+                yield {"tracks": to_dicts(batch)}
+            if finished:
+                reason = "ai_failed"
+                break
+    finally:
+        # Past the deadline, or the client went away mid-stream
+        stop.set()
+
+    if sent:
+        yield {"source": "ai", "seed": seed}
+    else:
+        yield from finish(fallback_journey(prompt, seed, reason))
+
+def fallback_journey(prompt, seed, reason):
+    return {"tracks": fallback_recommendations(prompt, seed), "source": "fallback", "fallback_reason": reason}
+
+def model_unavailable_for(response):
+    """
+    Seconds the Hugging Face API says the model will be unavailable, if it said so
+    (503 while the model loads, 429 with Retry-After)
+    """
+    if response.status_code == 429 and response.headers.get('Retry-After'):
+        return parse_retry_after(response.headers['Retry-After'], default=None)
+    if response.status_code != 503:
+        return None
+    try:
+        return float(response.json().get('estimated_time'))
+    except (ValueError, TypeError, AttributeError):
+        return None
 
-def generate_recommendations(prompt, top_artists=None, top_tracks=None):
+def stream_model(full_prompt, timeout):
     """
-    Generate music recommendations using AI based on a prompt and user's top artists/tracks
+    Stream a completion from the inference API through the circuit breaker, yielding
+    the generated text piece by piece as the model produces it
     """
+    if not inference_breaker.allow():
+        raise CircuitOpenError("huggingface")
+
+    headers = {
+        "Authorization": f"Bearer {HUGGINGFACE_API_KEY}",
+        "Content-Type": "application/json"
+    }
+    payload = {
+        "inputs": full_prompt,
+        "parameters": {
+            "max_new_tokens": 2048,
+            "temperature": 0.7,
+            "top_p": 0.9,
+            "do_sample": True,
+            "return_full_text": False
+        },
+        "stream": True
+    }
     try:
-        # Check if this is a request for a mixed artist journey with a specific intro track
-        prompt_lower = prompt.lower()
-        mixed_artist_journey = 'top artists' in prompt_lower and 'journey' in prompt_lower
-        specific_intro = 'walk' in prompt_lower and 'playboi carti' in prompt_lower and 'intro' in prompt_lower
-
-        # If we have top artists and it's a mixed journey request, use our specialized function
-        if (mixed_artist_journey or specific_intro) and top_artists:
-            print("Using specialized mixed artist journey with actual top artists")
-            return create_mixed_artist_journey(prompt, top_artists, top_tracks)
-
-        # Check if we have an API key
-        if not HUGGINGFACE_API_KEY:
-            print("No Hugging Face API key found. Using fallback recommendations.")
-            return fallback_recommendations(prompt)
-        # Format the user's top artists and tracks
-        artists_text = ""
-        if top_artists and len(top_artists) > 0:
-            artists_text = "Your top artists are: " + ", ".join([artist.get('name', '') for artist in top_artists[:5]])
-
-        tracks_text = ""
-        if top_tracks and len(top_tracks) > 0:
-            tracks_text = "Your top tracks are: " + ", ".join([
-                f"{track.get('name', '')} by {track.get('artists', [{}])[0].get('name', '')}"
-                for track in top_tracks[:5]
-            ])
-
-        # Create the full prompt for the AI
-        full_prompt = f"""
+        response = requests.post(HUGGINGFACE_API_URL, headers=headers, json=payload, stream=True,
+                                 timeout=(HUGGINGFACE_CONNECT_TIMEOUT, timeout))
+    except Exception:
+        inference_breaker.record_failure()
+        raise
+
+    with response:
+        if response.status_code != 200:
+            inference_breaker.record_failure(model_unavailable_for(response))
+            print(f"Error from Hugging Face API: {response.status_code}")
+            print(response.text)
+            return
+
+        # The call only counts as a success once the stream has ended cleanly
+        try:
+            # Server-sent events: one "data:{...}" line per generated token
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                try:
+                    event = json.loads(line[len('data:'):])
+                except json.JSONDecodeError:
+                    continue
+                if 'error' in event:
+                    print(f"Error from Hugging Face API mid-stream: {event['error']}")
+                    inference_breaker.record_failure()
+                    return
+                text = (event.get('token') or {}).get('text')
+                if text and not (event.get('token') or {}).get('special'):
+                    yield text
+        except GeneratorExit:
+            # The reader stopped early (a complete answer, or it gave up), with the model still answering
+            inference_breaker.record_success()
+            raise
+        except Exception:
+            # Read timeouts and dropped connections mid-stream
+            inference_breaker.record_failure()
+            raise
+        inference_breaker.record_success()
+
+def clean_recommendation(rec):
+    """
+    Convert a track object from the model into a Track, or None if it lacks a title or artist
+    """
+    if 'title' not in rec or 'artist' not in rec:
+        return None
+    return Track(
+        str(rec['title']),
+        (str(rec['artist']),),
+        str(rec.get('album', 'Unknown Album')),
+        str(rec.get('mood', '')),
+        str(rec.get('reason', ''))
+    )
+
+def taste_summary(top_artists=None, top_tracks=None):
+    """
+    The lines describing the user's top 5 artists and tracks that go into the prompt
+    """
+    artists_text = ""
+    if top_artists:
+        artists_text = "Your top artists are: " + ", ".join([artist.get('name', '') for artist in islice(top_artists, 5)])
+
+    tracks_text = ""
+    if top_tracks:
+        tracks_text = "Your top tracks are: " + ", ".join([
+            f"{track.get('name', '')} by {track.get('artists', [{}])[0].get('name', '')}"
+            for track in islice(top_tracks, 5)
+        ])
+    return artists_text, tracks_text
+
+def build_full_prompt(prompt, artists_text, tracks_text):
+    return f"""
         You are a music recommendation AI that creates personalized playlists.
 
         {artists_text}
@@ -67,776 +428,216 @@ def generate_recommendations(prompt, top_artists=None, top_tracks=None):
         Only return the JSON array, nothing else.
         """
 
-        # Call the Hugging Face API
-        API_URL = "https://api-inference.huggingface.co/models/mistralai/Mistral-7B-Instruct-v0.2"
-        headers = {
-            "Authorization": f"Bearer {HUGGINGFACE_API_KEY}",
-            "Content-Type": "application/json"
-        }
-
-        payload = {
-            "inputs": full_prompt,
-            "parameters": {
-                "max_new_tokens": 2048,
-                "temperature": 0.7,
-                "top_p": 0.9,
-                "do_sample": True
-            }
-        }
-
-        print("Calling AI model for recommendations...")
-        response = requests.post(API_URL, headers=headers, json=payload)
+class GenerationStopped(Exception):
+    """
+    The generation was stopped before the model finished its answer
+    """
 
-        if response.status_code != 200:
-            print(f"Error from Hugging Face API: {response.status_code}")
-            print(response.text)
-            return fallback_recommendations(prompt)
+def stream_ai_recommendations(prompt, top_artists=None, top_tracks=None, timeout=HUGGINGFACE_TIMEOUT):
+    """
+    Yield cleaned tracks from the model one at a time, each as soon as its JSON object is
+    complete. If the generation is cut short, the tracks that did complete are still yielded.
+    Raises CircuitOpenError if the model is being skipped.
+    """
+    artists_text, tracks_text = taste_summary(top_artists, top_tracks)
+    return _stream_tracks(prompt, artists_text, tracks_text, timeout)
 
-        # Parse the response
-        result = response.json()
-        generated_text = result[0].get('generated_text', '')
+def _stream_tracks(prompt, artists_text, tracks_text, timeout, check_cache=True, stop=None):
+    """
+    stream_ai_recommendations for a taste summary that's already been built. Setting the
+    stop event ends the generation (and closes the connection to the model) at its next
+    token; GenerationStopped is then raised after the tracks completed so far.
+    """
+    cache_key = recommendation_cache.make_key(prompt, artists_text, tracks_text)
+    found, cached = recommendation_cache.get(cache_key) if check_cache else (False, None)
+    if found:
+        print("Using cached AI recommendations")
+        yield from (Track.from_dict(track) for track in cached)
+        return
+
+    print("Calling AI model for recommendations...")
+    parser = JsonArrayParser()
+    tracks = []
+    stopped = False
+    model = stream_model(build_full_prompt(prompt, artists_text, tracks_text), timeout)
+    try:
+        for text in model:
+            if stop is not None and stop.is_set():
+                print(f"AI generation stopped after {len(tracks)} tracks: nobody is waiting for it")
+                stopped = True
+                break
+            for rec in parser.feed(text):
+                track = clean_recommendation(rec)
+                if track:
+                    tracks.append(track)
+                    yield track
+            if parser.closed:
+                break
+    except requests.RequestException as e:
+        print(f"Hugging Face stream ended early: {e}")
+    finally:
+        model.close()
+
+    if stopped:
+        raise GenerationStopped(f"stopped after {len(tracks)} tracks")
+    if parser.skipped:
+        print(f"Skipped {parser.skipped} malformed tracks in the AI response")
+    if parser.started and not parser.closed:
+        print(f"AI response was cut off; keeping {len(tracks)} complete tracks")
+    elif tracks:
+        # Only complete answers are worth reusing
+        recommendation_cache.set(cache_key, to_dicts(tracks))
+
+def generate_ai_recommendations(prompt, top_artists=None, top_tracks=None, timeout=HUGGINGFACE_TIMEOUT):
+    """
+    Ask the Hugging Face model for recommendations. Returns the cleaned tracks,
+    or None if the call failed or the response couldn't be used.
+    """
+    try:
+        return _generate_ai_tracks(prompt, taste_summary(top_artists, top_tracks), timeout)
+    except Exception as e:
+        print(f"Error generating AI recommendations: {e}")
+        return None
 
-        # Extract the JSON part from the response
+def _generate_ai_tracks(prompt, taste, timeout, check_cache=True, stop=None):
+    """
+    generate_ai_recommendations for a taste summary that's already been built;
+    check_cache=False when the caller has just looked the answer up. stop is the caller's
+    event from inference_stops; without one this call waits until the answer is complete.
+    A stopped generation counts as failed for every request sharing it, since its tracks
+    are only the start of an answer.
+    """
+    try:
+        artists_text, tracks_text = taste
+        key = recommendation_cache.make_key(prompt, artists_text, tracks_text)
+        joined = stop is None
+        if joined:
+            stop = inference_stops.join(key)
         try:
-            # Find the start and end of the JSON array
-            json_start = generated_text.find('[')
-            json_end = generated_text.rfind(']') + 1
-
-            if json_start == -1 or json_end == 0:
-                print("Could not find JSON in response")
-                return fallback_recommendations(prompt)
-
-            json_str = generated_text[json_start:json_end]
-            recommendations = json.loads(json_str)
-
-            # Validate and clean up the recommendations
-            cleaned_recommendations = []
-            for rec in recommendations:
-                if 'title' in rec and 'artist' in rec:
-                    cleaned_rec = {
-                        'name': rec['title'],
-                        'artists': [{'name': rec['artist']}],
-                        'album': {'name': rec.get('album', 'Unknown Album')},
-                        'mood': rec.get('mood', ''),
-                        'reason': rec.get('reason', '')
-                    }
-                    cleaned_recommendations.append(cleaned_rec)
-
-            if not cleaned_recommendations:
-                return fallback_recommendations(prompt)
-
-            return cleaned_recommendations
-
-        except json.JSONDecodeError as e:
-            print(f"Error parsing JSON from AI response: {e}")
-            print(f"Response text: {generated_text}")
-            return fallback_recommendations(prompt)
+            # Identical requests in flight together share one generation
+            recommendations = inference_single_flight.do(
+                key,
+                lambda: list(_stream_tracks(prompt, artists_text, tracks_text, timeout, check_cache, stop))
+            )
+        except CircuitOpenError:
+            print("Hugging Face circuit is open. Skipping the AI call.")
+            return None
+        except GenerationStopped as e:
+            print(f"AI generation was {e}. Not using its partial answer.")
+            return None
+        finally:
+            if joined:
+                inference_stops.leave(key)
+
+        # Tracks are immutable, so coalesced callers can share them
+        return recommendations or None
 
     except Exception as e:
         print(f"Error generating AI recommendations: {e}")
-        return fallback_recommendations(prompt)
+        return None
 
-def create_mixed_artist_journey(prompt, top_artists, top_tracks):
+def create_mixed_artist_journey(prompt, top_artists, top_tracks, seed=None):
     """
     Create a journey playlist using the user's actual top artists and specific requirements from the prompt
     """
     print("Creating mixed artist journey with user's actual top artists")
-    prompt_lower = prompt.lower()
+    spec = parse_prompt(prompt)
 
-    # Add randomization based on timestamp to ensure different results each time
-    import time
-    random.seed(int(time.time()))
+    # Each seed gives a different, repeatable selection
+    rng = journey_random(journey_seed(seed), prompt)
 
-    # Check for track limit requests
-    track_limit = 20  # Default
-
-    # Look for exact track count specifications
-    if 'exactly 12 tracks' in prompt_lower or '12 tracks total' in prompt_lower:
-        track_limit = 12
-        print(f"User requested exactly {track_limit} tracks")
-    elif '10 tracks' in prompt_lower or 'ten tracks' in prompt_lower:
-        track_limit = 10
-        print(f"User requested {track_limit} tracks")
-    elif '15 tracks' in prompt_lower or 'fifteen tracks' in prompt_lower:
-        track_limit = 15
-        print(f"User requested {track_limit} tracks")
-    elif '5 tracks' in prompt_lower or 'five tracks' in prompt_lower:
-        track_limit = 5
+    track_limit = spec.track_limit or 20
+    if spec.track_limit:
         print(f"User requested {track_limit} tracks")
-    elif '12 tracks' in prompt_lower or 'twelve tracks' in prompt_lower:
-        track_limit = 12
-        print(f"User requested {track_limit} tracks")
-
-    # Check for tracks per mood
-    tracks_per_mood = None
-    if '2 tracks per mood' in prompt_lower or 'two tracks per mood' in prompt_lower:
-        tracks_per_mood = 2
-        print(f"User requested {tracks_per_mood} tracks per mood")
-    elif '1 track per mood' in prompt_lower or 'one track per mood' in prompt_lower:
-        tracks_per_mood = 1
-        print(f"User requested {tracks_per_mood} track per mood")
-    elif '3 tracks per mood' in prompt_lower or 'three tracks per mood' in prompt_lower:
-        tracks_per_mood = 3
-        print(f"User requested {tracks_per_mood} tracks per mood")
-
-    # Parse for custom include/exclude lists
-    excluded_artists = []
-    included_artists = []
-
-    # Check for artist exclusions
-    if 'exclude kendrick' in prompt_lower or 'exclude kendrick lamar' in prompt_lower:
-        excluded_artists.append('Kendrick Lamar')
-        print("Excluding Kendrick Lamar (except as a feature)")
-
-    if 'exclude xxxtentacion' in prompt_lower or 'exclude xxx' in prompt_lower:
-        excluded_artists.append('XXXTENTACION')
-        print("Excluding XXXTENTACION")
-
-    # Look for custom exclude list format: "exclude: artist1, artist2, artist3"
-    if 'exclude:' in prompt_lower:
-        exclude_section = prompt_lower.split('exclude:')[1].split('include:')[0].split('.')[0]
-        custom_excludes = [artist.strip() for artist in exclude_section.split(',')]
-        for artist in custom_excludes:
-            if artist and artist not in excluded_artists:
-                # Capitalize each word for proper formatting
-                formatted_artist = ' '.join(word.capitalize() for word in artist.split())
-                excluded_artists.append(formatted_artist)
-                print(f"Custom exclude: {formatted_artist}")
-
-    # Look for custom include list format: "include: artist1, artist2, artist3"
-    if 'include:' in prompt_lower:
-        include_section = prompt_lower.split('include:')[1].split('exclude:')[0].split('.')[0]
-        custom_includes = [artist.strip() for artist in include_section.split(',')]
-        for artist in custom_includes:
-            if artist:
-                # Capitalize each word for proper formatting
-                formatted_artist = ' '.join(word.capitalize() for word in artist.split())
-                included_artists.append(formatted_artist)
-                print(f"Custom include: {formatted_artist}")
-
-    # Extract top artist names for easier reference
-    top_artist_names = [artist.get('name', '') for artist in top_artists if artist.get('name') and artist.get('name') not in excluded_artists][:10]
+    if spec.tracks_per_mood:
+        print(f"User requested {spec.tracks_per_mood} tracks per mood")
+    if spec.exclude_artists:
+        print(f"Excluding: {', '.join(spec.exclude_artists)}")
+    excluded = {artist_key(artist) for artist in spec.exclude_artists}
+
+    # Extract top artist names for easier reference; stops reading top_artists once 10 are found
+    top_artist_names = list(islice((
+        artist.get('name', '') for artist in top_artists
+        if artist.get('name') and artist_key(artist.get('name')) not in excluded
+    ), 10))
 
     # Add included artists to the top artists list if they're not already there
-    for artist in included_artists:
+    for artist in spec.include_artists:
         if artist not in top_artist_names:
             top_artist_names.append(artist)
             print(f"Added {artist} to top artists list")
 
     # Shuffle the top artists list for more variety
-    random.shuffle(top_artist_names)
+    rng.shuffle(top_artist_names)
 
     print(f"User's top artists (after exclusions/inclusions): {', '.join(top_artist_names)}")
 
-    # Check if specific artists are mentioned in the prompt
-    specific_artists = {}
-
-    # Check for Playboi Carti specifically since it's mentioned in the prompt
-    if 'playboi carti' in prompt_lower:
-        specific_artists['Playboi Carti'] = {
-            'intro': 'walk' in prompt_lower and 'intro' in prompt_lower,
-            'finale': 'end' in prompt_lower or 'finally' in prompt_lower
-        }
-
-    # Check for other top artists in the prompt
-    for artist_name in top_artist_names:
-        if artist_name.lower() in prompt_lower and artist_name != 'Playboi Carti':
-            specific_artists[artist_name] = {
-                'intro': False,  # Only Playboi Carti is specified as intro
-                'finale': False  # Only Playboi Carti is specified as finale
-            }
-
-    # Create mood categories
-    high_energy_tracks = []
-    vibey_tracks = []
-    melancholic_tracks = []
-    sad_tracks = []
-    upbeat_tracks = []
-    finale_tracks = []
-
-    # Add specific intro track if requested
-    intro_track = None
-    if specific_artists.get('Playboi Carti', {}).get('intro'):
-        intro_track = {
-            'name': "WALK",
-            'artists': [{'name': "Playboi Carti"}],
-            'album': {'name': "WHOLE LOTTA RED"},
-            'mood': "high_energy",
-            'reason': "Requested as the intro track - high energy opener"
-        }
-
-    # Add tracks from top artists to appropriate mood categories
-    # This is where we'd use the actual top artists data
-
-    # Check for randomization request
-    randomize_selection = 'random' in prompt_lower or 'randomize' in prompt_lower or 'surprise me' in prompt_lower
-    if randomize_selection:
+    # Collect candidates for each section of the journey from the catalog
+    pools = {section: [] for section in MOODS + ("finale",)}
+
+    # Add tracks from the user's top artists; Playboi Carti is also used when the prompt names him
+    signature_artists = [artist for artist in top_artist_names if CATALOG.has_artist(artist)]
+    if spec.mentions_carti and 'Playboi Carti' not in signature_artists:
+        signature_artists.append('Playboi Carti')
+    for artist in signature_artists:
+        for mood in MOODS:
+            pools[mood].extend(CATALOG.get("signature", mood, artist))
+    # Only Playboi Carti can be asked for as the finale
+    if spec.finale and spec.mentions_carti:
+        pools['finale'].extend(CATALOG.get("signature", "finale", "Playboi Carti"))
+
+    if spec.randomize:
         print("User requested randomized track selection")
 
-    # Add Playboi Carti tracks if they're in the top artists
-    if 'Playboi Carti' in top_artist_names or 'playboi carti' in prompt_lower:
-        # High energy Playboi Carti tracks
-        high_energy_tracks.extend([
-            {
-                'name': "New Tank",
-                'artists': [{'name': "Playboi Carti"}],
-                'album': {'name': "Whole Lotta Red"},
-                'mood': "high_energy",
-                'reason': "Rage-type track with aggressive delivery"
-            },
-            {
-                'name': "Stop Breathing",
-                'artists': [{'name': "Playboi Carti"}],
-                'album': {'name': "Whole Lotta Red"},
-                'mood': "high_energy",
-                'reason': "Intense, aggressive track with a hard-hitting beat"
-            }
-        ])
-
-        # Vibey Playboi Carti tracks
-        vibey_tracks.extend([
-            {
-                'name': "Location",
-                'artists': [{'name': "Playboi Carti"}],
-                'album': {'name': "Playboi Carti"},
-                'mood': "vibey",
-                'reason': "Ethereal production with ambient qualities"
-            },
-            {
-                'name': "Sky",
-                'artists': [{'name': "Playboi Carti"}],
-                'album': {'name': "Whole Lotta Red"},
-                'mood': "vibey",
-                'reason': "More vibey and ambient sound with melodic elements"
-            }
-        ])
-
-        # Melancholic Playboi Carti tracks
-        melancholic_tracks.extend([
-            {
-                'name': "ILoveUIHateU",
-                'artists': [{'name': "Playboi Carti"}],
-                'album': {'name': "Whole Lotta Red"},
-                'mood': "melancholic",
-                'reason': "Melancholic but still energetic with bittersweet lyrics"
-            }
-        ])
-
-        # Sad Playboi Carti tracks
-        sad_tracks.extend([
-            {
-                'name': "F33l Lik3 Dyin",
-                'artists': [{'name': "Playboi Carti"}],
-                'album': {'name': "Whole Lotta Red"},
-                'mood': "sad",
-                'reason': "Emotional outro to Whole Lotta Red with vulnerable lyrics"
-            }
-        ])
-
-        # Upbeat Playboi Carti tracks
-        upbeat_tracks.extend([
-            {
-                'name': "Magnolia",
-                'artists': [{'name': "Playboi Carti"}],
-                'album': {'name': "Playboi Carti"},
-                'mood': "upbeat",
-                'reason': "Bouncy and upbeat with an infectious hook"
-            },
-            {
-                'name': "Slay3r",
-                'artists': [{'name': "Playboi Carti"}],
-                'album': {'name': "Whole Lotta Red"},
-                'mood': "upbeat",
-                'reason': "Bouncy track with a fun, energetic vibe"
-            }
-        ])
-
-        # Finale Playboi Carti tracks
-        if specific_artists.get('Playboi Carti', {}).get('finale'):
-            finale_tracks.extend([
-                {
-                    'name': "Teen X",
-                    'artists': [{'name': "Playboi Carti"}, {'name': "Future"}],
-                    'album': {'name': "Whole Lotta Red"},
-                    'mood': "high_energy",
-                    'reason': "Experimental and high-energy finale that blends multiple styles"
-                },
-                {
-                    'name': "Metamorphosis",
-                    'artists': [{'name': "Playboi Carti"}, {'name': "Kid Cudi"}],
-                    'album': {'name': "Whole Lotta Red"},
-                    'mood': "high_energy",
-                    'reason': "Psychedelic track that combines energy with emotional depth - perfect finale"
-                }
-            ])
-
-    # Add tracks from other top artists
-    # We'll add some popular tracks for common top artists
-
-    # Kendrick Lamar - only as a feature if excluded
-    if 'Kendrick Lamar' in top_artist_names and 'Kendrick Lamar' not in excluded_artists:
-        high_energy_tracks.extend([
-            {
-                'name': "DNA.",
-                'artists': [{'name': "Kendrick Lamar"}],
-                'album': {'name': "DAMN."},
-                'mood': "high_energy",
-                'reason': "Intense lyrics and hard-hitting beat with aggressive delivery"
-            },
-            {
-                'name': "HUMBLE.",
-                'artists': [{'name': "Kendrick Lamar"}],
-                'album': {'name': "DAMN."},
-                'mood': "high_energy",
-                'reason': "Confident, assertive track with a powerful beat"
-            }
-        ])
-
-        melancholic_tracks.extend([
-            {
-                'name': "PRIDE.",
-                'artists': [{'name': "Kendrick Lamar"}],
-                'album': {'name': "DAMN."},
-                'mood': "melancholic",
-                'reason': "Introspective track with a dreamy, nostalgic production"
-            }
-        ])
-
-        sad_tracks.extend([
-            {
-                'name': "u",
-                'artists': [{'name': "Kendrick Lamar"}],
-                'album': {'name': "To Pimp A Butterfly"},
-                'mood': "sad",
-                'reason': "Intense emotional breakdown with themes of self-loathing and guilt"
-            }
-        ])
-
-    # Drake
-    if 'Drake' in top_artist_names:
-        vibey_tracks.extend([
-            {
-                'name': "Passionfruit",
-                'artists': [{'name': "Drake"}],
-                'album': {'name': "More Life"},
-                'mood': "vibey",
-                'reason': "Tropical house-influenced track with a relaxed, groovy feel"
-            }
-        ])
-
-        sad_tracks.extend([
-            {
-                'name': "Marvin's Room",
-                'artists': [{'name': "Drake"}],
-                'album': {'name': "Take Care"},
-                'mood': "sad",
-                'reason': "Raw emotional vulnerability with drunk phone calls and regret"
-            }
-        ])
-
-        upbeat_tracks.extend([
-            {
-                'name': "Nice For What",
-                'artists': [{'name': "Drake"}],
-                'album': {'name': "Scorpion"},
-                'mood': "upbeat",
-                'reason': "Bouncy New Orleans bounce-inspired track with an empowering message"
-            }
-        ])
-
-    # Travis Scott
-    if 'Travis Scott' in top_artist_names:
-        high_energy_tracks.extend([
-            {
-                'name': "Sicko Mode",
-                'artists': [{'name': "Travis Scott"}, {'name': "Drake"}],
-                'album': {'name': "Astroworld"},
-                'mood': "high_energy",
-                'reason': "High energy track with dynamic beat changes and multiple sections"
-            }
-        ])
-
-        vibey_tracks.extend([
-            {
-                'name': "SKELETONS",
-                'artists': [{'name': "Travis Scott"}],
-                'album': {'name': "Astroworld"},
-                'mood': "vibey",
-                'reason': "Psychedelic and dreamy production with a hypnotic feel"
-            }
-        ])
-
-    # Kanye West
-    if 'Kanye West' in top_artist_names:
-        high_energy_tracks.extend([
-            {
-                'name': "POWER",
-                'artists': [{'name': "Kanye West"}],
-                'album': {'name': "My Beautiful Dark Twisted Fantasy"},
-                'mood': "high_energy",
-                'reason': "Powerful production with energetic delivery"
-            }
-        ])
-
-        melancholic_tracks.extend([
-            {
-                'name': "Runaway",
-                'artists': [{'name': "Kanye West"}, {'name': "Pusha T"}],
-                'album': {'name': "My Beautiful Dark Twisted Fantasy"},
-                'mood': "melancholic",
-                'reason': "Beautiful piano intro leading to an introspective journey of self-awareness"
-            }
-        ])
-
-        sad_tracks.extend([
-            {
-                'name': "Street Lights",
-                'artists': [{'name': "Kanye West"}],
-                'album': {'name': "808s & Heartbreak"},
-                'mood': "sad",
-                'reason': "Emotional track with auto-tuned vocals expressing vulnerability"
-            }
-        ])
-
-        upbeat_tracks.extend([
-            {
-                'name': "Good Life",
-                'artists': [{'name': "Kanye West"}, {'name': "T-Pain"}],
-                'album': {'name': "Graduation"},
-                'mood': "upbeat",
-                'reason': "Celebratory track with a positive message and catchy chorus"
-            }
-        ])
-
-    # Frank Ocean
-    if 'Frank Ocean' in top_artist_names:
-        vibey_tracks.extend([
-            {
-                'name': "Nights",
-                'artists': [{'name': "Frank Ocean"}],
-                'album': {'name': "Blonde"},
-                'mood': "vibey",
-                'reason': "Atmospheric with a beat switch that changes the mood halfway through"
-            }
-        ])
-
-        melancholic_tracks.extend([
-            {
-                'name': "Self Control",
-                'artists': [{'name': "Frank Ocean"}],
-                'album': {'name': "Blonde"},
-                'mood': "melancholic",
-                'reason': "Bittersweet lyrics with beautiful guitar and vocal layering"
-            },
-            {
-                'name': "Ivy",
-                'artists': [{'name': "Frank Ocean"}],
-                'album': {'name': "Blonde"},
-                'mood': "melancholic",
-                'reason': "Reflective lyrics about past relationships with a nostalgic tone"
-            }
-        ])
-
-    # Tyler, The Creator
-    if 'Tyler, The Creator' in top_artist_names:
-        upbeat_tracks.extend([
-            {
-                'name': "EARFQUAKE",
-                'artists': [{'name': "Tyler, The Creator"}],
-                'album': {'name': "IGOR"},
-                'mood': "upbeat",
-                'reason': "Bouncy track with a catchy chorus and playful energy"
-            }
-        ])
-
-        melancholic_tracks.extend([
-            {
-                'name': "See You Again",
-                'artists': [{'name': "Tyler, The Creator"}, {'name': "Kali Uchis"}],
-                'album': {'name': "Flower Boy"},
-                'mood': "melancholic",
-                'reason': "Dreamy production with nostalgic lyrics about longing"
-            }
-        ])
-
-    # The Weeknd
-    if 'The Weeknd' in top_artist_names:
-        vibey_tracks.extend([
-            {
-                'name': "After Hours",
-                'artists': [{'name': "The Weeknd"}],
-                'album': {'name': "After Hours"},
-                'mood': "vibey",
-                'reason': "Ambient production with a hypnotic rhythm and nocturnal feel"
-            }
-        ])
-
-        upbeat_tracks.extend([
-            {
-                'name': "Blinding Lights",
-                'artists': [{'name': "The Weeknd"}],
-                'album': {'name': "After Hours"},
-                'mood': "upbeat",
-                'reason': "Energetic 80s-inspired synth-pop track with a driving beat"
-            }
-        ])
-
-    # Add more artists as needed...
-
-    # If we don't have enough tracks from the user's top artists, add some generic ones
-    if len(high_energy_tracks) < 3:
-        high_energy_tracks.extend([
-            {
-                'name': "Mo Bamba",
-                'artists': [{'name': "Sheck Wes"}],
-                'album': {'name': "Mudboy"},
-                'mood': "high_energy",
-                'reason': "Rage-inducing anthem with heavy bass and crowd-pleasing energy"
-            }
-        ])
-
-    if len(vibey_tracks) < 3:
-        vibey_tracks.extend([
-            {
-                'name': "Redbone",
-                'artists': [{'name': "Childish Gambino"}],
-                'album': {'name': "Awaken, My Love!"},
-                'mood': "vibey",
-                'reason': "Smooth, funk-inspired groove with atmospheric production"
-            }
-        ])
-
-    if len(melancholic_tracks) < 3:
-        melancholic_tracks.extend([
-            {
-                'name': "505",
-                'artists': [{'name': "Arctic Monkeys"}],
-                'album': {'name': "Favourite Worst Nightmare"},
-                'mood': "melancholic",
-                'reason': "Nostalgic and builds to an emotional climax with yearning lyrics"
-            }
-        ])
-
-    if len(sad_tracks) < 3 and 'XXXTENTACION' not in excluded_artists:
-        sad_tracks.extend([
-            {
-                'name': "Jocelyn Flores",
-                'artists': [{'name': "XXXTENTACION"}],
-                'album': {'name': "17"},
-                'mood': "sad",
-                'reason': "Deeply emotional tribute to a friend who passed away"
-            }
-        ])
-    elif len(sad_tracks) < 3:
-        # Alternative sad track if XXXTENTACION is excluded
-        sad_tracks.extend([
-            {
-                'name': "Hurt",
-                'artists': [{'name': "Johnny Cash"}],
-                'album': {'name': "American IV: The Man Comes Around"},
-                'mood': "sad",
-                'reason': "Powerful cover filled with regret and reflection"
-            }
-        ])
-
-    if len(upbeat_tracks) < 3:
-        upbeat_tracks.extend([
-            {
-                'name': "Sunflower",
-                'artists': [{'name': "Post Malone"}, {'name': "Swae Lee"}],
-                'album': {'name': "Spider-Man: Into the Spider-Verse"},
-                'mood': "upbeat",
-                'reason': "Bright melody with uplifting lyrics and a catchy chorus"
-            }
-        ])
-
-    if len(finale_tracks) < 1 and 'end' in prompt_lower:
-        finale_tracks.extend([
-            {
-                'name': "Stronger",
-                'artists': [{'name': "Kanye West"}],
-                'album': {'name': "Graduation"},
-                'mood': "high_energy",
-                'reason': "Triumphant finale that combines electronic elements with motivational themes"
-            }
-        ])
-
-    # Combine all tracks to create a complete journey with some randomization
-    journey = []
-
-    # Add the specific intro track if requested
-    if intro_track:
-        journey.append(intro_track)
+    # If we don't have enough tracks from the user's top artists, add a well-known one
+    for mood in MOODS:
+        if len(pools[mood]) < 3:
+            pools[mood].extend(first_allowed(CATALOG.get("backfill", mood), spec.exclude_artists))
+    if len(pools['finale']) < 1 and spec.finale:
+        pools['finale'].extend(first_allowed(CATALOG.get("backfill", "finale"), spec.exclude_artists))
 
     # Shuffle each mood category to add variety
     # but keep the overall journey structure intact
-    # If randomize_selection is true, we'll do a more thorough shuffle
-    if randomize_selection:
-        # For a more randomized experience, we'll shuffle multiple times
-        for _ in range(3):
-            random.shuffle(high_energy_tracks)
-            random.shuffle(vibey_tracks)
-            random.shuffle(melancholic_tracks)
-            random.shuffle(sad_tracks)
-            random.shuffle(upbeat_tracks)
+    # If randomize is requested, we'll do a more thorough shuffle
+    for _ in range(3 if spec.randomize else 1):
+        for mood in MOODS:
+            rng.shuffle(pools[mood])
+    if spec.randomize:
         print("Applied extra randomization to track selection")
-    else:
-        # Standard shuffle for normal variety
-        random.shuffle(high_energy_tracks)
-        random.shuffle(vibey_tracks)
-        random.shuffle(melancholic_tracks)
-        random.shuffle(sad_tracks)
-        random.shuffle(upbeat_tracks)
-
-    # Check for different outro request
-    different_outro = 'different outro' in prompt_lower
-
-    # Check for custom track requests
-    custom_track_requests = []
-    if 'add track:' in prompt_lower or 'add song:' in prompt_lower:
-        # Extract custom track requests
-        track_sections = []
-        if 'add track:' in prompt_lower:
-            track_sections.extend(prompt_lower.split('add track:')[1:])
-        if 'add song:' in prompt_lower:
-            track_sections.extend(prompt_lower.split('add song:')[1:])
-
-        for section in track_sections:
-            # Extract the track info up to the next keyword or end of text
-            track_info = section.split('add')[0].strip()
-            if not track_info.endswith('.'):
-                track_info = track_info.split('.')[0]
-
-            # Try to parse artist and song
-            if ' by ' in track_info:
-                song, artist = track_info.split(' by ', 1)
-                song = song.strip()
-                artist = artist.strip()
-
-                # Format properly
-                artist = ' '.join(word.capitalize() for word in artist.split())
-
-                # Add to custom tracks
-                custom_track = {
-                    'name': song,
-                    'artists': [{'name': artist}],
-                    'album': {'name': "Unknown"},
-                    'mood': "custom",
-                    'reason': "User specifically requested this track"
-                }
-                custom_track_requests.append(custom_track)
-                print(f"Adding custom track: {song} by {artist}")
-
-    # Add custom tracks to the journey
-    if custom_track_requests:
-        # Insert custom tracks at the beginning of the journey
-        for track in custom_track_requests:
-            journey.append(track)
-        # Reduce the track limit to account for custom tracks
-        track_limit -= len(custom_track_requests)
-
-    if different_outro and 'Playboi Carti' in specific_artists:
+
+    if spec.different_outro and spec.mentions_carti:
         print("User requested a different outro than Playboi Carti")
-        # Replace the finale tracks with something else
-        if 'Kanye West' in top_artist_names:
-            finale_tracks = [{
-                'name': "Stronger",
-                'artists': [{'name': "Kanye West"}],
-                'album': {'name': "Graduation"},
-                'mood': "high_energy",
-                'reason': "Triumphant finale that combines electronic elements with motivational themes"
-            }]
-        elif 'Travis Scott' in top_artist_names:
-            finale_tracks = [{
-                'name': "STARGAZING",
-                'artists': [{'name': "Travis Scott"}],
-                'album': {'name': "Astroworld"},
-                'mood': "high_energy",
-                'reason': "Psychedelic track with a beat switch that serves as a perfect finale"
-            }]
-        elif 'Drake' in top_artist_names:
-            finale_tracks = [{
-                'name': "Headlines",
-                'artists': [{'name': "Drake"}],
-                'album': {'name': "Take Care"},
-                'mood': "high_energy",
-                'reason': "Confident track with a triumphant feel that works well as a finale"
-            }]
-        else:
-            finale_tracks = [{
-                'name': "Stronger",
-                'artists': [{'name': "Kanye West"}],
-                'album': {'name': "Graduation"},
-                'mood': "high_energy",
-                'reason': "Triumphant finale that combines electronic elements with motivational themes"
-            }]
+        # Replace the finale tracks with one from another top artist
+        outro_artist = next((artist for artist in CATALOG.outro_artists if artist in top_artist_names), "")
+        pools['finale'] = list(CATALOG.get("outro", "finale", outro_artist))
 
     # Create a balanced journey with the requested number of tracks
     # We'll allocate tracks proportionally to each mood
     journey = []
 
     # Add the specific intro track if requested
-    if intro_track:
-        journey.append(intro_track)
-        track_limit -= 1  # Reduce the limit since we've added the intro
-
-    # Check for custom mood weights in the prompt
-    mood_weights = {
-        'high_energy': 1,
-        'vibey': 1,
-        'melancholic': 1,
-        'sad': 1,
-        'upbeat': 1
-    }
+    if spec.intro:
+        journey.append(CATALOG.intro)
+
+    # Custom tracks come right after the intro
+    for track in spec.custom_tracks:
+        print(f"Adding custom track: {track.name} by {track.artists[0]}")
+    journey.extend(spec.custom_tracks)
+    track_limit -= len(journey)
 
-    # Look for phrases like "more high energy" or "less sad"
-    if 'more high energy' in prompt_lower or 'extra high energy' in prompt_lower:
-        mood_weights['high_energy'] = 2
-        print("Increasing weight for high energy tracks")
-    if 'more vibey' in prompt_lower or 'extra vibey' in prompt_lower:
-        mood_weights['vibey'] = 2
-        print("Increasing weight for vibey tracks")
-    if 'more melancholic' in prompt_lower or 'extra melancholic' in prompt_lower:
-        mood_weights['melancholic'] = 2
-        print("Increasing weight for melancholic tracks")
-    if 'more sad' in prompt_lower or 'extra sad' in prompt_lower:
-        mood_weights['sad'] = 2
-        print("Increasing weight for sad tracks")
-    if 'more upbeat' in prompt_lower or 'extra upbeat' in prompt_lower:
-        mood_weights['upbeat'] = 2
-        print("Increasing weight for upbeat tracks")
-
-    if 'less high energy' in prompt_lower or 'fewer high energy' in prompt_lower:
-        mood_weights['high_energy'] = 0.5
-        print("Decreasing weight for high energy tracks")
-    if 'less vibey' in prompt_lower or 'fewer vibey' in prompt_lower:
-        mood_weights['vibey'] = 0.5
-        print("Decreasing weight for vibey tracks")
-    if 'less melancholic' in prompt_lower or 'fewer melancholic' in prompt_lower:
-        mood_weights['melancholic'] = 0.5
-        print("Decreasing weight for melancholic tracks")
-    if 'less sad' in prompt_lower or 'fewer sad' in prompt_lower:
-        mood_weights['sad'] = 0.5
-        print("Decreasing weight for sad tracks")
-    if 'less upbeat' in prompt_lower or 'fewer upbeat' in prompt_lower:
-        mood_weights['upbeat'] = 0.5
-        print("Decreasing weight for upbeat tracks")
+    # Moods asked for "more" or "less" of get a weight of 2 or 0.5
+    mood_weights = {mood: 1 for mood in MOODS}
+    mood_weights.update(spec.mood_weights)
+    if spec.mood_weights:
+        print(f"Mood weights: {mood_weights}")
 
     # Calculate how many tracks to include from each mood category
     # We want to maintain the emotional journey while respecting the track limit
-    remaining_tracks = track_limit - len(finale_tracks)
+    remaining_tracks = track_limit - len(pools['finale'])
 
     # If tracks_per_mood was specified in the prompt, use that instead of calculating
-    if tracks_per_mood is not None:
-        # Override the calculated values with the user-specified value
-        tracks_per_mood = {
-            'high_energy': tracks_per_mood,
-            'vibey': tracks_per_mood,
-            'melancholic': tracks_per_mood,
-            'sad': tracks_per_mood,
-            'upbeat': tracks_per_mood
-        }
-        print(f"Using {tracks_per_mood['high_energy']} tracks per mood as requested")
+    if spec.tracks_per_mood is not None:
+        tracks_per_mood = {mood: spec.tracks_per_mood for mood in MOODS}
     else:
         # Calculate total weight
         total_weight = sum(mood_weights.values())
@@ -860,728 +661,88 @@ def create_mixed_artist_journey(prompt, top_artists, top_tracks):
                 tracks_per_mood[mood] -= 1
                 total_allocated -= 1
 
-    # Add tracks from each mood category based on calculated weights
+    # Take tracks from each mood category based on calculated weights
     print(f"Track allocation: {tracks_per_mood}")
-    journey.extend(high_energy_tracks[:tracks_per_mood['high_energy']])
-    journey.extend(vibey_tracks[:tracks_per_mood['vibey']])
-    journey.extend(melancholic_tracks[:tracks_per_mood['melancholic']])
-    journey.extend(sad_tracks[:tracks_per_mood['sad']])
-    journey.extend(upbeat_tracks[:tracks_per_mood['upbeat']])
+    body = []
+    for mood in MOODS:
+        body.extend(pools[mood][:tracks_per_mood[mood]])
 
     # If we still have room, add some random tracks from any category
-    remaining = track_limit - len(journey) - len(finale_tracks)
+    remaining = track_limit - len(body) - len(pools['finale'])
     if remaining > 0:
         print(f"Adding {remaining} additional tracks to fill the playlist")
         # Combine all remaining tracks
         remaining_tracks_pool = []
-        remaining_tracks_pool.extend(high_energy_tracks[tracks_per_mood['high_energy']:])
-        remaining_tracks_pool.extend(vibey_tracks[tracks_per_mood['vibey']:])
-        remaining_tracks_pool.extend(melancholic_tracks[tracks_per_mood['melancholic']:])
-        remaining_tracks_pool.extend(sad_tracks[tracks_per_mood['sad']:])
-        remaining_tracks_pool.extend(upbeat_tracks[tracks_per_mood['upbeat']:])
+        for mood in MOODS:
+            remaining_tracks_pool.extend(pools[mood][tracks_per_mood[mood]:])
 
         # Shuffle and add remaining tracks
-        random.shuffle(remaining_tracks_pool)
-        journey.extend(remaining_tracks_pool[:remaining])
+        rng.shuffle(remaining_tracks_pool)
+        body.extend(remaining_tracks_pool[:remaining])
+
+    # Order the tracks along the requested energy curve with smooth transitions
+    print(f"Sequencing {len(body)} tracks along the {spec.energy_curve} curve")
+    if spec.energy_curve == DEFAULT_CURVE:
+        order = mood_order(body)
+    else:
+        order = sequence(mood_points(body), CURVES[spec.energy_curve])
+    journey.extend(body[index] for index in order)
 
     # Add the finale tracks
-    journey.extend(finale_tracks)
+    journey.extend(pools['finale'])
 
     return journey
 
-def fallback_recommendations(prompt):
+def first_allowed(tracks, excluded_artists):
+    """
+    The first of tracks not credited to an excluded artist, as a list of zero or one tracks
+    """
+    for track in tracks:
+        if not credits_any(track, excluded_artists):
+            return [track]
+    return []
+
+def fallback_recommendations(prompt, seed=None):
     """Provide fallback recommendations if the AI service fails"""
     print("Using fallback recommendations")
 
     # Use random to add some variety to the recommendations
     # This ensures we don't always return the exact same tracks in the same order
-    random.seed(hash(prompt) % 10000)  # Use the prompt to seed the random generator
+    rng = journey_random(journey_seed(seed), prompt)
 
     # Check for specific artist mentions and request patterns
-    prompt_lower = prompt.lower()
-
-    # Check if this is a request for a mixed artist journey with a specific intro track
-    mixed_artist_journey = 'top artists' in prompt_lower and 'journey' in prompt_lower
-    specific_intro = False
-
-    # Check for specific intro track requests
-    if 'walk' in prompt_lower and 'playboi carti' in prompt_lower and 'intro' in prompt_lower:
-        specific_intro = True
+    spec = parse_prompt(prompt)
+    if spec.intro:
         print("Detected request for WALK by Playboi Carti as intro with mixed artists journey")
 
-    # Pure Playboi Carti journey (only if not requesting mixed artists)
-    if 'playboi carti' in prompt_lower and not mixed_artist_journey:
-        # Create a comprehensive Playboi Carti journey
-        high_energy_tracks = [
-            {
-                'name': "WALK",
-                'artists': [{'name': "Playboi Carti"}],
-                'album': {'name': "WHOLE LOTTA RED"},
-                'mood': "high_energy",
-                'reason': "Requested as the intro track - high energy opener"
-            },
-            {
-                'name': "New Tank",
-                'artists': [{'name': "Playboi Carti"}],
-                'album': {'name': "Whole Lotta Red"},
-                'mood': "high_energy",
-                'reason': "High energy, rage-type track with aggressive delivery"
-            },
-            {
-                'name': "Stop Breathing",
-                'artists': [{'name': "Playboi Carti"}],
-                'album': {'name': "Whole Lotta Red"},
-                'mood': "high_energy",
-                'reason': "Intense, aggressive track with a hard-hitting beat"
-            },
-            {
-                'name': "R.I.P.",
-                'artists': [{'name': "Playboi Carti"}],
-                'album': {'name': "Die Lit"},
-                'mood': "high_energy",
-                'reason': "Mosh pit energy with punk-inspired production"
-            }
-        ]
-
-        vibey_tracks = [
-            {
-                'name': "Sky",
-                'artists': [{'name': "Playboi Carti"}],
-                'album': {'name': "Whole Lotta Red"},
-                'mood': "vibey",
-                'reason': "More vibey and ambient sound with melodic elements"
-            },
-            {
-                'name': "Place",
-                'artists': [{'name': "Playboi Carti"}],
-                'album': {'name': "Whole Lotta Red"},
-                'mood': "vibey",
-                'reason': "Spacey production with a relaxed flow"
-            },
-            {
-                'name': "Flex",
-                'artists': [{'name': "Playboi Carti"}, {'name': "Leven Kali"}],
-                'album': {'name': "Playboi Carti"},
-                'mood': "vibey",
-                'reason': "Smooth, laid-back track with dreamy production"
-            },
-            {
-                'name': "Location",
-                'artists': [{'name': "Playboi Carti"}],
-                'album': {'name': "Playboi Carti"},
-                'mood': "vibey",
-                'reason': "Ethereal production with ambient qualities"
-            }
-        ]
-
-        melancholic_tracks = [
-            {
-                'name': "ILoveUIHateU",
-                'artists': [{'name': "Playboi Carti"}],
-                'album': {'name': "Whole Lotta Red"},
-                'mood': "melancholic",
-                'reason': "Melancholic but still energetic with bittersweet lyrics"
-            },
-            {
-                'name': "Over",
-                'artists': [{'name': "Playboi Carti"}],
-                'album': {'name': "Whole Lotta Red"},
-                'mood': "melancholic",
-                'reason': "Reflective track with a nostalgic feel"
-            },
-            {
-                'name': "Fell In Luv",
-                'artists': [{'name': "Playboi Carti"}, {'name': "Bryson Tiller"}],
-                'album': {'name': "Die Lit"},
-                'mood': "melancholic",
-                'reason': "Emotional track about love with a dreamy beat"
-            }
-        ]
-
-        sad_tracks = [
-            {
-                'name': "Long Time (Intro)",
-                'artists': [{'name': "Playboi Carti"}],
-                'album': {'name': "Die Lit"},
-                'mood': "sad",
-                'reason': "Emotional and reflective with introspective lyrics"
-            },
-            {
-                'name': "F33l Lik3 Dyin",
-                'artists': [{'name': "Playboi Carti"}],
-                'album': {'name': "Whole Lotta Red"},
-                'mood': "sad",
-                'reason': "Emotional outro to Whole Lotta Red with vulnerable lyrics"
-            },
-            {
-                'name': "Control",
-                'artists': [{'name': "Playboi Carti"}],
-                'album': {'name': "Whole Lotta Red"},
-                'mood': "sad",
-                'reason': "Emotional track with themes of love and vulnerability"
-            }
-        ]
-
-        upbeat_tracks = [
-            {
-                'name': "Magnolia",
-                'artists': [{'name': "Playboi Carti"}],
-                'album': {'name': "Playboi Carti"},
-                'mood': "upbeat",
-                'reason': "Bouncy and upbeat with an infectious hook"
-            },
-            {
-                'name': "Shoota",
-                'artists': [{'name': "Playboi Carti"}, {'name': "Lil Uzi Vert"}],
-                'album': {'name': "Die Lit"},
-                'mood': "upbeat",
-                'reason': "Energetic collaboration with a playful vibe"
-            },
-            {
-                'name': "wokeuplikethis*",
-                'artists': [{'name': "Playboi Carti"}, {'name': "Lil Uzi Vert"}],
-                'album': {'name': "Playboi Carti"},
-                'mood': "upbeat",
-                'reason': "Upbeat track with a catchy melody"
-            },
-            {
-                'name': "Slay3r",
-                'artists': [{'name': "Playboi Carti"}],
-                'album': {'name': "Whole Lotta Red"},
-                'mood': "upbeat",
-                'reason': "Bouncy track with a fun, energetic vibe"
-            }
-        ]
-
-        finale_tracks = [
-            {
-                'name': "Teen X",
-                'artists': [{'name': "Playboi Carti"}, {'name': "Future"}],
-                'album': {'name': "Whole Lotta Red"},
-                'mood': "high_energy",
-                'reason': "Experimental and high-energy finale that blends multiple styles"
-            },
-            {
-                'name': "Metamorphosis",
-                'artists': [{'name': "Playboi Carti"}, {'name': "Kid Cudi"}],
-                'album': {'name': "Whole Lotta Red"},
-                'mood': "high_energy",
-                'reason': "Psychedelic track that combines energy with emotional depth"
-            }
-        ]
-
-        # Combine all tracks to create a complete journey with some randomization
-        journey = []
-
-        # Shuffle each mood category slightly to add variety
-        # but keep the overall journey structure intact
-        random.shuffle(high_energy_tracks)
-        random.shuffle(vibey_tracks)
-        random.shuffle(melancholic_tracks)
-        random.shuffle(sad_tracks)
-        random.shuffle(upbeat_tracks)
-
-        # Make sure WALK is always the first track if it's in the prompt
-        if 'walk' in prompt_lower:
-            walk_track = None
-            for track in high_energy_tracks:
-                if track['name'].lower() == 'walk':
-                    walk_track = track
-                    high_energy_tracks.remove(track)
-                    break
-
-            if walk_track:
-                journey.append(walk_track)
-
-        # Add tracks to the journey
-        journey.extend(high_energy_tracks)
-        journey.extend(vibey_tracks)
-        journey.extend(melancholic_tracks)
-        journey.extend(sad_tracks)
-        journey.extend(upbeat_tracks)
-        journey.extend(finale_tracks)
-
-        return journey
-
-    # Mixed artist journey with specific intro track
-    if mixed_artist_journey or specific_intro:
+    journey = []
+    if spec.mentions_carti and not spec.mixed_journey:
+        # Pure Playboi Carti journey (only if not requesting mixed artists)
+        collection = "carti"
+    elif spec.mixed_journey or spec.intro:
         print("Creating mixed artist journey with top artists")
-
-        # Create a diverse journey with various artists
+        collection = "mixed"
         # Start with WALK by Playboi Carti if specifically requested
-        intro_track = None
-        if specific_intro:
-            intro_track = {
-                'name': "WALK",
-                'artists': [{'name': "Playboi Carti"}],
-                'album': {'name': "WHOLE LOTTA RED"},
-                'mood': "high_energy",
-                'reason': "Requested as the intro track - high energy opener"
-            }
-
-        # Create a diverse set of high energy tracks by different artists
-        high_energy_tracks = [
-            {
-                'name': "Sicko Mode",
-                'artists': [{'name': "Travis Scott"}, {'name': "Drake"}],
-                'album': {'name': "Astroworld"},
-                'mood': "high_energy",
-                'reason': "High energy track with dynamic beat changes and multiple sections"
-            },
-            {
-                'name': "DNA.",
-                'artists': [{'name': "Kendrick Lamar"}],
-                'album': {'name': "DAMN."},
-                'mood': "high_energy",
-                'reason': "Intense lyrics and hard-hitting beat with aggressive delivery"
-            },
-            {
-                'name': "New Tank",
-                'artists': [{'name': "Playboi Carti"}],
-                'album': {'name': "Whole Lotta Red"},
-                'mood': "high_energy",
-                'reason': "Rage-type track with aggressive delivery"
-            },
-            {
-                'name': "POWER",
-                'artists': [{'name': "Kanye West"}],
-                'album': {'name': "My Beautiful Dark Twisted Fantasy"},
-                'mood': "high_energy",
-                'reason': "Powerful production with energetic delivery"
-            },
-            {
-                'name': "m.A.A.d city",
-                'artists': [{'name': "Kendrick Lamar"}, {'name': "MC Eiht"}],
-                'album': {'name': "good kid, m.A.A.d city"},
-                'mood': "high_energy",
-                'reason': "Intense storytelling with a hard-hitting beat"
-            }
-        ]
-
-        # Vibey and ambient tracks by different artists
-        vibey_tracks = [
-            {
-                'name': "Nights",
-                'artists': [{'name': "Frank Ocean"}],
-                'album': {'name': "Blonde"},
-                'mood': "vibey",
-                'reason': "Atmospheric with a beat switch that changes the mood halfway through"
-            },
-            {
-                'name': "Location",
-                'artists': [{'name': "Playboi Carti"}],
-                'album': {'name': "Playboi Carti"},
-                'mood': "vibey",
-                'reason': "Ethereal production with ambient qualities"
-            },
-            {
-                'name': "Redbone",
-                'artists': [{'name': "Childish Gambino"}],
-                'album': {'name': "Awaken, My Love!"},
-                'mood': "vibey",
-                'reason': "Smooth, funk-inspired groove with atmospheric production"
-            },
-            {
-                'name': "After Hours",
-                'artists': [{'name': "The Weeknd"}],
-                'album': {'name': "After Hours"},
-                'mood': "vibey",
-                'reason': "Ambient production with a hypnotic rhythm and nocturnal feel"
-            },
-            {
-                'name': "Flashing Lights",
-                'artists': [{'name': "Kanye West"}, {'name': "Dwele"}],
-                'album': {'name': "Graduation"},
-                'mood': "vibey",
-                'reason': "Lush production with strings and synths creating an immersive atmosphere"
-            }
-        ]
-
-        # Melancholic but beautiful tracks by different artists
-        melancholic_tracks = [
-            {
-                'name': "Self Control",
-                'artists': [{'name': "Frank Ocean"}],
-                'album': {'name': "Blonde"},
-                'mood': "melancholic",
-                'reason': "Bittersweet lyrics with beautiful guitar and vocal layering"
-            },
-            {
-                'name': "ILoveUIHateU",
-                'artists': [{'name': "Playboi Carti"}],
-                'album': {'name': "Whole Lotta Red"},
-                'mood': "melancholic",
-                'reason': "Melancholic but still energetic with bittersweet lyrics"
-            },
-            {
-                'name': "Runaway",
-                'artists': [{'name': "Kanye West"}, {'name': "Pusha T"}],
-                'album': {'name': "My Beautiful Dark Twisted Fantasy"},
-                'mood': "melancholic",
-                'reason': "Beautiful piano intro leading to an introspective journey of self-awareness"
-            },
-            {
-                'name': "Ivy",
-                'artists': [{'name': "Frank Ocean"}],
-                'album': {'name': "Blonde"},
-                'mood': "melancholic",
-                'reason': "Reflective lyrics about past relationships with a nostalgic tone"
-            },
-            {
-                'name': "505",
-                'artists': [{'name': "Arctic Monkeys"}],
-                'album': {'name': "Favourite Worst Nightmare"},
-                'mood': "melancholic",
-                'reason': "Nostalgic and builds to an emotional climax with yearning lyrics"
-            }
-        ]
-
-        # Sad and emotional tracks by different artists
-        sad_tracks = [
-            {
-                'name': "Marvin's Room",
-                'artists': [{'name': "Drake"}],
-                'album': {'name': "Take Care"},
-                'mood': "sad",
-                'reason': "Raw emotional vulnerability with drunk phone calls and regret"
-            },
-            {
-                'name': "F33l Lik3 Dyin",
-                'artists': [{'name': "Playboi Carti"}],
-                'album': {'name': "Whole Lotta Red"},
-                'mood': "sad",
-                'reason': "Emotional outro to Whole Lotta Red with vulnerable lyrics"
-            },
-            {
-                'name': "u",
-                'artists': [{'name': "Kendrick Lamar"}],
-                'album': {'name': "To Pimp A Butterfly"},
-                'mood': "sad",
-                'reason': "Intense emotional breakdown with themes of self-loathing and guilt"
-            },
-            {
-                'name': "Jocelyn Flores",
-                'artists': [{'name': "XXXTENTACION"}],
-                'album': {'name': "17"},
-                'mood': "sad",
-                'reason': "Deeply emotional tribute to a friend who passed away"
-            },
-            {
-                'name': "Street Lights",
-                'artists': [{'name': "Kanye West"}],
-                'album': {'name': "808s & Heartbreak"},
-                'mood': "sad",
-                'reason': "Emotional track with auto-tuned vocals expressing vulnerability"
-            }
-        ]
-
-        # Upbeat and bouncy tracks by different artists
-        upbeat_tracks = [
-            {
-                'name': "Magnolia",
-                'artists': [{'name': "Playboi Carti"}],
-                'album': {'name': "Playboi Carti"},
-                'mood': "upbeat",
-                'reason': "Bouncy and upbeat with an infectious hook"
-            },
-            {
-                'name': "Good Life",
-                'artists': [{'name': "Kanye West"}, {'name': "T-Pain"}],
-                'album': {'name': "Graduation"},
-                'mood': "upbeat",
-                'reason': "Celebratory track with a positive message and catchy chorus"
-            },
-            {
-                'name': "Sunflower",
-                'artists': [{'name': "Post Malone"}, {'name': "Swae Lee"}],
-                'album': {'name': "Spider-Man: Into the Spider-Verse"},
-                'mood': "upbeat",
-                'reason': "Bright melody with uplifting lyrics and a catchy chorus"
-            },
-            {
-                'name': "EARFQUAKE",
-                'artists': [{'name': "Tyler, The Creator"}],
-                'album': {'name': "IGOR"},
-                'mood': "upbeat",
-                'reason': "Bouncy track with a catchy chorus and playful energy"
-            },
-            {
-                'name': "Slay3r",
-                'artists': [{'name': "Playboi Carti"}],
-                'album': {'name': "Whole Lotta Red"},
-                'mood': "upbeat",
-                'reason': "Bouncy track with a fun, energetic vibe"
-            }
-        ]
-
-        # Finale tracks - end with a Playboi Carti song that blends all moods
-        finale_tracks = [
-            {
-                'name': "Teen X",
-                'artists': [{'name': "Playboi Carti"}, {'name': "Future"}],
-                'album': {'name': "Whole Lotta Red"},
-                'mood': "high_energy",
-                'reason': "Experimental and high-energy finale that blends multiple styles"
-            },
-            {
-                'name': "Metamorphosis",
-                'artists': [{'name': "Playboi Carti"}, {'name': "Kid Cudi"}],
-                'album': {'name': "Whole Lotta Red"},
-                'mood': "high_energy",
-                'reason': "Psychedelic track that combines energy with emotional depth - perfect finale"
-            }
-        ]
-
-        # Combine all tracks to create a complete journey with some randomization
-        journey = []
-
-        # Add the specific intro track if requested
-        if intro_track:
-            journey.append(intro_track)
-
-        # Shuffle each mood category slightly to add variety
-        # but keep the overall journey structure intact
-        random.shuffle(high_energy_tracks)
-        random.shuffle(vibey_tracks)
-        random.shuffle(melancholic_tracks)
-        random.shuffle(sad_tracks)
-        random.shuffle(upbeat_tracks)
-
-        # Add tracks to the journey
-        journey.extend(high_energy_tracks)
-        journey.extend(vibey_tracks)
-        journey.extend(melancholic_tracks)
-        journey.extend(sad_tracks)
-        journey.extend(upbeat_tracks)
-        journey.extend(finale_tracks)
-
-        return journey
-
-    # Generic recommendations based on mood journey
-    high_energy_tracks = [
-        {
-            'name': "Sicko Mode",
-            'artists': [{'name': "Travis Scott"}, {'name': "Drake"}],
-            'album': {'name': "Astroworld"},
-            'mood': "high_energy",
-            'reason': "High energy opener with dynamic beat changes and multiple sections"
-        },
-        {
-            'name': "DNA.",
-            'artists': [{'name': "Kendrick Lamar"}],
-            'album': {'name': "DAMN."},
-            'mood': "high_energy",
-            'reason': "Intense lyrics and hard-hitting beat with aggressive delivery"
-        },
-        {
-            'name': "Mo Bamba",
-            'artists': [{'name': "Sheck Wes"}],
-            'album': {'name': "Mudboy"},
-            'mood': "high_energy",
-            'reason': "Rage-inducing anthem with heavy bass and crowd-pleasing energy"
-        },
-        {
-            'name': "HUMBLE.",
-            'artists': [{'name': "Kendrick Lamar"}],
-            'album': {'name': "DAMN."},
-            'mood': "high_energy",
-            'reason': "Confident, assertive track with a powerful beat"
-        },
-        {
-            'name': "Goosebumps",
-            'artists': [{'name': "Travis Scott"}, {'name': "Kendrick Lamar"}],
-            'album': {'name': "Birds in the Trap Sing McKnight"},
-            'mood': "high_energy",
-            'reason': "Hypnotic, high-energy track with psychedelic elements"
-        }
-    ]
-
-    vibey_tracks = [
-        {
-            'name': "Redbone",
-            'artists': [{'name': "Childish Gambino"}],
-            'album': {'name': "Awaken, My Love!"},
-            'mood': "vibey",
-            'reason': "Smooth, funk-inspired groove with atmospheric production"
-        },
-        {
-            'name': "Nights",
-            'artists': [{'name': "Frank Ocean"}],
-            'album': {'name': "Blonde"},
-            'mood': "vibey",
-            'reason': "Atmospheric with a beat switch that changes the mood halfway through"
-        },
-        {
-            'name': "After Hours",
-            'artists': [{'name': "The Weeknd"}],
-            'album': {'name': "After Hours"},
-            'mood': "vibey",
-            'reason': "Ambient production with a hypnotic rhythm and nocturnal feel"
-        },
-        {
-            'name': "Passionfruit",
-            'artists': [{'name': "Drake"}],
-            'album': {'name': "More Life"},
-            'mood': "vibey",
-            'reason': "Tropical house-influenced track with a relaxed, groovy feel"
-        },
-        {
-            'name': "Flashing Lights",
-            'artists': [{'name': "Kanye West"}, {'name': "Dwele"}],
-            'album': {'name': "Graduation"},
-            'mood': "vibey",
-            'reason': "Lush production with strings and synths creating an immersive atmosphere"
-        }
-    ]
-
-    melancholic_tracks = [
-        {
-            'name': "Self Control",
-            'artists': [{'name': "Frank Ocean"}],
-            'album': {'name': "Blonde"},
-            'mood': "melancholic",
-            'reason': "Bittersweet lyrics with beautiful guitar and vocal layering"
-        },
-        {
-            'name': "505",
-            'artists': [{'name': "Arctic Monkeys"}],
-            'album': {'name': "Favourite Worst Nightmare"},
-            'mood': "melancholic",
-            'reason': "Nostalgic and builds to an emotional climax with yearning lyrics"
-        },
-        {
-            'name': "Ivy",
-            'artists': [{'name': "Frank Ocean"}],
-            'album': {'name': "Blonde"},
-            'mood': "melancholic",
-            'reason': "Reflective lyrics about past relationships with a nostalgic tone"
-        },
-        {
-            'name': "Runaway",
-            'artists': [{'name': "Kanye West"}, {'name': "Pusha T"}],
-            'album': {'name': "My Beautiful Dark Twisted Fantasy"},
-            'mood': "melancholic",
-            'reason': "Beautiful piano intro leading to an introspective journey of self-awareness"
-        },
-        {
-            'name': "Mirrors",
-            'artists': [{'name': "Justin Timberlake"}],
-            'album': {'name': "The 20/20 Experience"},
-            'mood': "melancholic",
-            'reason': "Reflective lyrics with a bittersweet melody and expansive production"
-        }
-    ]
-
-    sad_tracks = [
-        {
-            'name': "Marvin's Room",
-            'artists': [{'name': "Drake"}],
-            'album': {'name': "Take Care"},
-            'mood': "sad",
-            'reason': "Raw emotional vulnerability with drunk phone calls and regret"
-        },
-        {
-            'name': "Jocelyn Flores",
-            'artists': [{'name': "XXXTENTACION"}],
-            'album': {'name': "17"},
-            'mood': "sad",
-            'reason': "Deeply emotional tribute to a friend who passed away"
-        },
-        {
-            'name': "u",
-            'artists': [{'name': "Kendrick Lamar"}],
-            'album': {'name': "To Pimp A Butterfly"},
-            'mood': "sad",
-            'reason': "Intense emotional breakdown with themes of self-loathing and guilt"
-        },
-        {
-            'name': "Hurt",
-            'artists': [{'name': "Johnny Cash"}],
-            'album': {'name': "American IV: The Man Comes Around"},
-            'mood': "sad",
-            'reason': "Powerful cover filled with regret and reflection at the end of life"
-        },
-        {
-            'name': "Everybody Hurts",
-            'artists': [{'name': "R.E.M."}],
-            'album': {'name': "Automatic for the People"},
-            'mood': "sad",
-            'reason': "Universal anthem about pain and the importance of perseverance"
-        }
-    ]
-
-    upbeat_tracks = [
-        {
-            'name': "Sunflower",
-            'artists': [{'name': "Post Malone"}, {'name': "Swae Lee"}],
-            'album': {'name': "Spider-Man: Into the Spider-Verse"},
-            'mood': "upbeat",
-            'reason': "Bright melody with uplifting lyrics and a catchy chorus"
-        },
-        {
-            'name': "Good Feeling",
-            'artists': [{'name': "Flo Rida"}],
-            'album': {'name': "Wild Ones"},
-            'mood': "upbeat",
-            'reason': "Energetic dance track with positive vibes and motivational lyrics"
-        },
-        {
-            'name': "I Wanna Dance With Somebody",
-            'artists': [{'name': "Whitney Houston"}],
-            'album': {'name': "Whitney"},
-            'mood': "upbeat",
-            'reason': "Classic feel-good dance anthem with joyful energy"
-        },
-        {
-            'name': "Can't Stop the Feeling!",
-            'artists': [{'name': "Justin Timberlake"}],
-            'album': {'name': "Trolls (Original Motion Picture Soundtrack)"},
-            'mood': "upbeat",
-            'reason': "Infectious pop song designed to make people dance and feel good"
-        },
-        {
-            'name': "Uptown Funk",
-            'artists': [{'name': "Mark Ronson"}, {'name': "Bruno Mars"}],
-            'album': {'name': "Uptown Special"},
-            'mood': "upbeat",
-            'reason': "Funk-inspired hit with irresistible groove and confident energy"
-        }
-    ]
-
-    finale_tracks = [
-        {
-            'name': "Stronger",
-            'artists': [{'name': "Kanye West"}],
-            'album': {'name': "Graduation"},
-            'mood': "high_energy",
-            'reason': "Triumphant finale that combines electronic elements with motivational themes"
-        },
-        {
-            'name': "All of the Lights",
-            'artists': [{'name': "Kanye West"}, {'name': "Rihanna"}, {'name': "Kid Cudi"}],
-            'album': {'name': "My Beautiful Dark Twisted Fantasy"},
-            'mood': "high_energy",
-            'reason': "Grand, orchestral production that brings together multiple elements for an epic conclusion"
-        }
-    ]
-
-    # Combine tracks to create a journey, with some randomization
-    journey = []
+        if spec.intro:
+            journey.append(CATALOG.intro)
+    else:
+        # Generic recommendations based on mood journey
+        collection = "general"
 
     # Shuffle each mood category slightly to add variety
     # but keep the overall journey structure intact
-    random.shuffle(high_energy_tracks)
-    random.shuffle(vibey_tracks)
-    random.shuffle(melancholic_tracks)
-    random.shuffle(sad_tracks)
-    random.shuffle(upbeat_tracks)
+    pools = {mood: list(CATALOG.get(collection, mood)) for mood in MOODS}
+    for mood in MOODS:
+        rng.shuffle(pools[mood])
+
+    # Make sure WALK is always the first track of a Playboi Carti journey if it's in the prompt
+    if collection == "carti" and spec.mentions_walk and CATALOG.intro in pools['high_energy']:
+        pools['high_energy'].remove(CATALOG.intro)
+        journey.append(CATALOG.intro)
 
     # Add tracks to the journey
-    journey.extend(high_energy_tracks)
-    journey.extend(vibey_tracks)
-    journey.extend(melancholic_tracks)
-    journey.extend(sad_tracks)
-    journey.extend(upbeat_tracks)
-    journey.extend(finale_tracks)
+    for mood in MOODS:
+        journey.extend(pools[mood])
+    journey.extend(CATALOG.get(collection, "finale"))
 
     return journey
@@ -1,25 +1,142 @@
-from flask import Flask, request, jsonify, redirect, send_from_directory
+from flask import Flask, Response, request, jsonify, redirect, send_from_directory, stream_with_context
 from flask_cors import CORS
 import os
 import requests
+from requests.adapters import HTTPAdapter
 import base64
 import json
+import time
 from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from ai_recommender import generate_recommendations
+from ai_recommender import generate_journey, stream_journey, journey_seed, inference_single_flight, inference_breaker, recommendation_cache
+from track_resolver import resolve_tracks
+from search_cache import SearchCache, DEFAULT_CACHE_PATH
+from user_cache import UserDataCache
+from token_store import AppTokenCache, TokenStore, DEFAULT_TOKEN_STORE_PATH
+from single_flight import SingleFlight, request_key
+from audio_features import AudioFeatureCache, AUDIO_FEATURES_BATCH, centroid, feature_matrix, parse_features
+from track_index import TrackIndex
+from seed_selection import select_seeds
+from spotify_common import PLAYLIST_ADD_LIMIT, TOP_TIME_RANGES, TOP_ITEMS_PAGE_SIZE, TopItemPages, add_tracks_steps, slice_top_items, top_items_count
+from rate_limiter import RateLimiter, RateLimitExceeded, ThrottledResponse, bearer_token, retry_statuses_for, token_key
 
 # Load environment variables
 load_dotenv()
 
+# Tracks per recommendation list, as Spotify's /recommendations returns by default
+RECOMMENDATION_LIMIT = 20
+
 # Spotify Client class
 class SpotifyClient:
-    def __init__(self, client_id, client_secret, redirect_uri):
+    def __init__(self, client_id, client_secret, redirect_uri, pool_size=10, timeout=(3.05, 15), rate_limiter=None, user_cache=None, token_store_path=DEFAULT_TOKEN_STORE_PATH, single_flight=None, audio_feature_cache=None):
         self.client_id = client_id
         self.client_secret = client_secret
         self.redirect_uri = redirect_uri
         self.auth_url = "https://accounts.spotify.com/authorize"
         self.token_url = "https://accounts.spotify.com/api/token"
         self.api_base_url = "https://api.spotify.com/v1/"
+        self.pool_size = pool_size
+        # (connect, read) timeout in seconds applied to every call unless overridden
+        self.timeout = timeout
+
+        # One keep-alive session per client so the TCP/TLS handshake to
+        # accounts.spotify.com and api.spotify.com is paid once per pooled connection
+        self.session = requests.Session()
+        self.session.headers.update({"Connection": "keep-alive"})
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, pool_block=False)
+        self.session.mount("https://", adapter)
+        self.adapter = adapter
+
+        # Background threads for prefetching the next page of paginated results
+        self.prefetch_executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="spotify-prefetch")
+
+        # Throttles calls and retries 429s/5xx; may be shared with other clients in the process
+        self.rate_limiter = rate_limiter or RateLimiter(max_in_flight=pool_size)
+
+        # Optional UserDataCache for profile and top items
+        self.user_cache = user_cache
+
+        # Optional AudioFeatureCache, shared by all users since features are per track
+        self.audio_feature_cache = audio_feature_cache
+
+        # Identical GETs in flight at the same time share one upstream request
+        self.single_flight = single_flight or SingleFlight()
+
+        # Client-credentials token for catalog calls (search, tracks) made without a logged-in user
+        self.app_tokens = AppTokenCache(self.get_client_credentials_token, path=token_store_path)
+
+    def _request(self, method, url, timeout=None, retry_statuses=None, **kwargs):
+        """
+        Send one request under the rate limiter. Unless retry_statuses says otherwise,
+        GETs are retried on 429 and 5xx, other methods only on 429.
+        """
+        user_key = token_key(bearer_token(kwargs.get("headers")))
+        if retry_statuses is None:
+            retry_statuses = retry_statuses_for(method)
+
+        def send():
+            return self.session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+
+        def call():
+            try:
+                return self.rate_limiter.call(send, user_key, retry_statuses)
+            except RateLimitExceeded as e:
+                print(f"Not calling Spotify: {e}")
+                return ThrottledResponse(e.retry_after)
+
+        if method != "GET":
+            return call()
+        key = request_key(method, url, kwargs.get("params"), kwargs.get("headers"))
+        return self.single_flight.do(key, call)
+
+    def _get_user_data(self, access_token, endpoint, params=None):
+        """
+        GET per-user data (profile, top items), answering from the user cache when possible.
+        Error responses are never cached.
+        """
+        user_key = token_key(access_token)
+        cache_key = UserDataCache.make_key(endpoint, params)
+        if self.user_cache is not None:
+            found, cached = self.user_cache.get(user_key, cache_key)
+            if found:
+                return cached
+
+        headers = {"Authorization": f"Bearer {access_token}"}
+        response = self._request("GET", endpoint, headers=headers, params=params)
+        result = response.json()
+        if self.user_cache is not None and 'error' not in result:
+            self.user_cache.set(user_key, cache_key, result, size=len(response.content))
+        return result
+
+    def invalidate_user_data(self, access_token):
+        if self.user_cache is not None:
+            self.user_cache.invalidate(token_key(access_token))
+
+    def get_pool_stats(self):
+        """
+        Report the connection pool size and, per host, how many connections were
+        opened versus how many requests were sent over them
+        """
+        hosts = {}
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            opened = pool.num_connections
+            sent = pool.num_requests
+            hosts[pool.host] = {
+                "connections_opened": opened,
+                "requests": sent,
+                "reused_requests": max(sent - opened, 0),
+                "idle_connections": sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool else 0
+            }
+        return {
+            "pool_size": self.pool_size,
+            "timeout": self.timeout,
+            "hosts": hosts
+        }
 
     def get_auth_url(self):
         params = {
@@ -42,23 +159,96 @@ class SpotifyClient:
             "code": code,
             "redirect_uri": self.redirect_uri
         }
-        response = requests.post(self.token_url, headers=headers, data=data)
+        response = self._request("POST", self.token_url, headers=headers, data=data)
         return response.json()
 
-    def get_top_artists(self, access_token, time_range="medium_term", limit=10):
-        headers = {"Authorization": f"Bearer {access_token}"}
-        endpoint = f"{self.api_base_url}me/top/artists"
-        params = {"time_range": time_range, "limit": limit}
-        response = requests.get(endpoint, headers=headers, params=params)
+    def refresh_access_token(self, refresh_token):
+        auth_header = base64.b64encode(f"{self.client_id}:{self.client_secret}".encode()).decode()
+        headers = {
+            "Authorization": f"Basic {auth_header}",
+            "Content-Type": "application/x-www-form-urlencoded"
+        }
+        data = {
+            "grant_type": "refresh_token",
+            "refresh_token": refresh_token
+        }
+        response = self._request("POST", self.token_url, headers=headers, data=data)
         return response.json()
 
-    def get_top_tracks(self, access_token, time_range="medium_term", limit=10):
-        headers = {"Authorization": f"Bearer {access_token}"}
-        endpoint = f"{self.api_base_url}me/top/tracks"
-        params = {"time_range": time_range, "limit": limit}
-        response = requests.get(endpoint, headers=headers, params=params)
+    def get_client_credentials_token(self):
+        auth_header = base64.b64encode(f"{self.client_id}:{self.client_secret}".encode()).decode()
+        headers = {
+            "Authorization": f"Basic {auth_header}",
+            "Content-Type": "application/x-www-form-urlencoded"
+        }
+        data = {"grant_type": "client_credentials"}
+        response = self._request("POST", self.token_url, headers=headers, data=data)
         return response.json()
 
+    def get_app_token(self):
+        """
+        Cached client-credentials token, or None if the app credentials are missing or rejected
+        """
+        if not self.client_id or not self.client_secret:
+            return None
+        return self.app_tokens.get_token()
+
+    def get_top_artists(self, access_token, time_range="medium_term", limit=10):
+        return self._get_top_items(access_token, f"{self.api_base_url}me/top/artists", time_range, limit)
+
+    def get_top_tracks(self, access_token, time_range="medium_term", limit=10):
+        return self._get_top_items(access_token, f"{self.api_base_url}me/top/tracks", time_range, limit)
+
+    def _get_top_items(self, access_token, endpoint, time_range, limit):
+        """
+        Fetch a full page of top items and slice it, so /top-artists (limit 10),
+        /create-playlist (limit 5) and the journey iterators all share one cached response
+        """
+        count = top_items_count(limit)
+        if count is None:
+            # Let Spotify report the bad limit
+            return self._get_user_data(access_token, endpoint, {"time_range": time_range, "limit": limit})
+        page = self._get_user_data(access_token, endpoint, {"time_range": time_range, "limit": TOP_ITEMS_PAGE_SIZE})
+        return slice_top_items(page, count)
+
+    def iter_top_artists(self, access_token, time_ranges=TOP_TIME_RANGES, max_items=None, page_size=TOP_ITEMS_PAGE_SIZE):
+        return self._iter_top_items(f"{self.api_base_url}me/top/artists", access_token, time_ranges, max_items, page_size)
+
+    def iter_top_tracks(self, access_token, time_ranges=TOP_TIME_RANGES, max_items=None, page_size=TOP_ITEMS_PAGE_SIZE):
+        return self._iter_top_items(f"{self.api_base_url}me/top/tracks", access_token, time_ranges, max_items, page_size)
+
+    def _iter_top_items(self, endpoint, access_token, time_ranges, max_items, page_size):
+        """
+        Lazily yield a user's top items across the given time ranges, most relevant first,
+        skipping items already seen in an earlier time range (see TopItemPages). The next
+        page is requested in the background while the current one is consumed, and nothing
+        more is fetched once max_items is reached or the caller stops iterating. The first
+        page is requested right away, so several iterators created together fetch concurrently.
+        """
+        pages = TopItemPages(endpoint, time_ranges, max_items, page_size)
+
+        def fetch(url, params):
+            return self.prefetch_executor.submit(self._get_user_data, access_token, url, params)
+
+        def generate(future):
+            try:
+                while future is not None:
+                    try:
+                        page = future.result()
+                    except Exception as e:
+                        page = {"error": str(e)}
+                    items, next_page = pages.take(page)
+                    future = fetch(*next_page) if next_page else None
+                    yield from items
+            finally:
+                if future is not None:
+                    future.cancel()
+
+        first = pages.first()
+        if first is None:
+            return iter(())
+        return generate(fetch(*first))
+
     def create_playlist(self, access_token, user_id, name, description):
         headers = {
             "Authorization": f"Bearer {access_token}",
@@ -70,17 +260,58 @@ class SpotifyClient:
             "description": description,
             "public": False
         })
-        response = requests.post(endpoint, headers=headers, data=data)
+        response = self._request("POST", endpoint, headers=headers, data=data)
         return response.json()
 
-    def add_tracks_to_playlist(self, access_token, playlist_id, track_uris):
+    def add_tracks_to_playlist(self, access_token, playlist_id, track_uris, position=None, chunk_size=PLAYLIST_ADD_LIMIT, max_chunk_retries=2):
+        """
+        Add tracks in the given order, at most 100 URIs (Spotify's cap) per request.
+        Chunks go out one after another at explicit positions, so a retried chunk lands
+        where it belongs, and each chunk's snapshot_id is kept as a chain. Only the
+        chunk that failed is retried, and only once the playlist's length shows the
+        failed attempt wasn't applied. Pass position=0 for a freshly created playlist to
+        skip looking up its current length. The steps are in spotify_common.add_tracks_steps.
+        """
+        steps = add_tracks_steps(playlist_id, track_uris, position, chunk_size, max_chunk_retries)
+        answer = None
+        while True:
+            try:
+                step = steps.send(answer)
+            except StopIteration as done:
+                return done.value
+            answer = self._playlist_step(access_token, playlist_id, step)
+
+    def _playlist_step(self, access_token, playlist_id, step):
+        if step[0] == "state":
+            try:
+                return self.get_playlist_state(access_token, playlist_id)
+            except (requests.RequestException, ValueError) as e:
+                return {"error": {"status": None, "message": str(e)}}
+
+        if step[0] == "wait":
+            time.sleep(self.rate_limiter.retry_delay(*step[1:]))
+            return None
+
+        chunk, position = step[1:]
         headers = {
             "Authorization": f"Bearer {access_token}",
             "Content-Type": "application/json"
         }
         endpoint = f"{self.api_base_url}playlists/{playlist_id}/tracks"
-        data = json.dumps({"uris": track_uris})
-        response = requests.post(endpoint, headers=headers, data=data)
+        status_code = None
+        try:
+            # Retried by add_tracks_steps, after checking the playlist, rather than blindly by the rate limiter
+            response = self._request("POST", endpoint, headers=headers, data=json.dumps({"uris": chunk, "position": position}), retry_statuses=())
+            status_code = response.status_code
+            return status_code, response.json(), False
+        except (requests.RequestException, ValueError) as e:
+            return status_code, {"error": {"status": status_code, "message": str(e)}}, True
+
+    def get_playlist_state(self, access_token, playlist_id):
+        headers = {"Authorization": f"Bearer {access_token}"}
+        endpoint = f"{self.api_base_url}playlists/{playlist_id}"
+        params = {"fields": "snapshot_id,tracks.total"}
+        response = self._request("GET", endpoint, headers=headers, params=params)
         return response.json()
 
     def get_recommendations(self, access_token, seed_artists=None, seed_tracks=None, limit=20, **kwargs):
@@ -98,9 +329,49 @@ class SpotifyClient:
             params[key] = value
 
         print(f"Recommendation params: {params}")
-        response = requests.get(endpoint, headers=headers, params=params)
+        response = self._request("GET", endpoint, headers=headers, params=params)
         return response.json()
 
+    def get_audio_features(self, access_token, track_ids, chunk_size=AUDIO_FEATURES_BATCH):
+        """
+        Audio features for the given track IDs as {track_id: (energy, valence, tempo, danceability)},
+        or None for tracks Spotify has no features for. Cached tracks aren't asked for again;
+        the rest are requested chunk_size IDs at a time, with the chunks fetched concurrently.
+        Tracks in a chunk that failed are left out.
+        """
+        track_ids = list(dict.fromkeys(track_id for track_id in track_ids if track_id))
+        if self.audio_feature_cache is not None:
+            features, missing = self.audio_feature_cache.get_many(track_ids)
+        else:
+            features, missing = {}, track_ids
+
+        headers = {"Authorization": f"Bearer {access_token}"}
+        endpoint = f"{self.api_base_url}audio-features"
+
+        def fetch(chunk):
+            try:
+                return self._request("GET", endpoint, headers=headers, params={"ids": ",".join(chunk)}).json()
+            except Exception as e:
+                return {"error": {"status": None, "message": str(e)}}
+
+        chunks = [missing[i:i + chunk_size] for i in range(0, len(missing), chunk_size)]
+        for chunk, response in zip(chunks, self.prefetch_executor.map(fetch, chunks)):
+            if 'error' in response:
+                print(f"Error getting audio features for {len(chunk)} tracks: {response['error']}")
+                continue
+            fetched = parse_features(response, chunk)
+            if self.audio_feature_cache is not None:
+                self.audio_feature_cache.set_many(fetched)
+            features.update(fetched)
+        return features
+
+    def get_audio_feature_matrix(self, access_token, track_ids):
+        """
+        Audio features as a float32 matrix with row i for track_ids[i] and columns
+        audio_features.FEATURE_COLUMNS. Rows of tracks without features are NaN.
+        """
+        return feature_matrix(track_ids, self.get_audio_features(access_token, track_ids))
+
     def search_tracks(self, access_token, query, limit=5):
         headers = {"Authorization": f"Bearer {access_token}"}
         endpoint = f"{self.api_base_url}search"
@@ -110,14 +381,12 @@ class SpotifyClient:
             "limit": limit
         }
         print(f"Searching for tracks with query: {query}")
-        response = requests.get(endpoint, headers=headers, params=params)
+        response = self._request("GET", endpoint, headers=headers, params=params)
         return response.json()
 
     def get_user_profile(self, access_token):
-        headers = {"Authorization": f"Bearer {access_token}"}
         endpoint = f"{self.api_base_url}me"
-        response = requests.get(endpoint, headers=headers)
-        return response.json()
+        return self._get_user_data(access_token, endpoint)
 
 # Set up Flask app
 app = Flask(__name__, static_folder='frontend')
@@ -138,8 +407,189 @@ REDIRECT_URI = base_redirect_uri + ("/callback" if not base_redirect_uri.endswit
 print(f"ORIGINAL REDIRECT_URI: {base_redirect_uri}")
 print(f"FINAL REDIRECT_URI: {REDIRECT_URI}")
 
+# Connection pool settings for calls to Spotify
+SPOTIFY_POOL_SIZE = int(os.getenv("SPOTIFY_POOL_SIZE", "10"))
+SPOTIFY_CONNECT_TIMEOUT = float(os.getenv("SPOTIFY_CONNECT_TIMEOUT", "3.05"))
+SPOTIFY_READ_TIMEOUT = float(os.getenv("SPOTIFY_READ_TIMEOUT", "15"))
+
+# Token store settings
+TOKEN_STORE_PATH = os.getenv("TOKEN_STORE_PATH", DEFAULT_TOKEN_STORE_PATH)
+
+# Seconds /create-journey waits for the AI before answering with the local fallback
+JOURNEY_DEADLINE = float(os.getenv("JOURNEY_DEADLINE", "10"))
+
+# Rate limiting for calls to Spotify
+SPOTIFY_RATE_LIMIT = float(os.getenv("SPOTIFY_RATE_LIMIT", "10"))
+SPOTIFY_RATE_BURST = int(os.getenv("SPOTIFY_RATE_BURST", "20"))
+SPOTIFY_MAX_IN_FLIGHT = int(os.getenv("SPOTIFY_MAX_IN_FLIGHT", str(SPOTIFY_POOL_SIZE)))
+SPOTIFY_MAX_RETRIES = int(os.getenv("SPOTIFY_MAX_RETRIES", "3"))
+
+spotify_rate_limiter = RateLimiter(
+    rate=SPOTIFY_RATE_LIMIT,
+    burst=SPOTIFY_RATE_BURST,
+    max_in_flight=SPOTIFY_MAX_IN_FLIGHT,
+    max_retries=SPOTIFY_MAX_RETRIES
+)
+
+# Per-user cache for profile and top items, shared by all endpoints in this worker
+user_data_cache = UserDataCache(
+    ttl=int(os.getenv("USER_CACHE_TTL", "300")),
+    max_entries=int(os.getenv("USER_CACHE_MAX_ENTRIES", "1000")),
+    max_bytes=int(os.getenv("USER_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+)
+
+# Audio features per track ID, shared by all users in this worker
+audio_feature_cache = AudioFeatureCache(
+    ttl=int(os.getenv("AUDIO_FEATURE_CACHE_TTL", str(7 * 24 * 3600))),
+    max_entries=int(os.getenv("AUDIO_FEATURE_CACHE_MAX_ENTRIES", "100000"))
+)
+
+# Audio features of tracks seen so far, searched for recommendations before asking Spotify
+track_index = TrackIndex(
+    max_tracks=int(os.getenv("TRACK_INDEX_MAX_TRACKS", "50000")),
+    approximate_above=int(os.getenv("TRACK_INDEX_APPROXIMATE_ABOVE", "20000"))
+)
+# The index only answers once it knows enough tracks, and only with tracks this close to the user's taste
+TRACK_INDEX_MIN_TRACKS = int(os.getenv("TRACK_INDEX_MIN_TRACKS", "1000"))
+TRACK_INDEX_MAX_DISTANCE = float(os.getenv("TRACK_INDEX_MAX_DISTANCE", "0.05"))
+
 # Create Spotify client
-spotify_client = SpotifyClient(CLIENT_ID, CLIENT_SECRET, REDIRECT_URI)
+spotify_client = SpotifyClient(
+    CLIENT_ID,
+    CLIENT_SECRET,
+    REDIRECT_URI,
+    pool_size=SPOTIFY_POOL_SIZE,
+    timeout=(SPOTIFY_CONNECT_TIMEOUT, SPOTIFY_READ_TIMEOUT),
+    rate_limiter=spotify_rate_limiter,
+    user_cache=user_data_cache,
+    token_store_path=TOKEN_STORE_PATH,
+    audio_feature_cache=audio_feature_cache
+)
+
+# Track search results cached on disk and shared by all workers on this machine
+search_cache = SearchCache(
+    path=os.getenv("SEARCH_CACHE_PATH", DEFAULT_CACHE_PATH),
+    ttl=int(os.getenv("SEARCH_CACHE_TTL", str(7 * 24 * 3600))),
+    max_entries=int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "50000"))
+)
+
+# Server-side sessions holding each user's tokens; access tokens are renewed in the background
+token_store = TokenStore(
+    spotify_client.refresh_access_token,
+    path=TOKEN_STORE_PATH,
+    refresh_margin=int(os.getenv("TOKEN_REFRESH_MARGIN", "300"))
+)
+token_store.start()
+
+def resolve_access_token(params):
+    # Prefer the server-side session; a raw access_token is still accepted from older clients
+    session_id = params.get('session_id')
+    if session_id:
+        access_token = token_store.get_access_token(session_id)
+        if access_token:
+            # The user's cached data follows the session, not the token, so a refresh doesn't orphan it
+            user_data_cache.link(token_key(access_token), "session:" + token_key(session_id))
+            return access_token
+    return params.get('access_token')
+
+def user_history(access_token):
+    """
+    Lazy iterators over the user's top artists and tracks across the short/medium/long term
+    history, or (None, None) without a token. Both start fetching their first page right away,
+    and the recommender only pulls as many pages as it actually uses.
+    """
+    if not access_token:
+        return None, None
+    try:
+        print("Getting user's Spotify data...")
+        return spotify_client.iter_top_artists(access_token), spotify_client.iter_top_tracks(access_token)
+    except Exception as e:
+        print(f"Error getting Spotify data: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        # Continue without Spotify data
+        return None, None
+
+def local_recommendations(access_token, track_items, limit=RECOMMENDATION_LIMIT):
+    """
+    The indexed tracks nearest to the average audio features of the user's top tracks,
+    or None if the track index is still too small or can't find limit tracks close
+    enough. The index only holds Spotify's recommendations, never anyone's top tracks.
+    """
+    try:
+        if track_index.get_stats()["tracks"] < TRACK_INDEX_MIN_TRACKS:
+            return None
+        track_ids = [track['id'] for track in track_items if track.get('id')]
+        seed = centroid(spotify_client.get_audio_feature_matrix(access_token, track_ids))
+        if seed is None:
+            return None
+        tracks = track_index.nearest(seed, limit, exclude=track_ids, max_distance=TRACK_INDEX_MAX_DISTANCE)
+    except Exception as e:
+        print(f"Error getting recommendations from the track index: {str(e)}")
+        return None
+    if len(tracks) < limit:
+        print(f"Track index only has {len(tracks)} close candidates, asking Spotify")
+        return None
+    return tracks
+
+def diverse_seeds(access_token, artist_ids, track_ids):
+    """
+    Seed artist and track IDs for /recommendations, chosen by relevance and diversity
+    (seed_selection.select_seeds) from the user's top artists and tracks over all three
+    time ranges. Falls back to the first 2 of artist_ids and 3 of track_ids.
+    """
+    try:
+        pages = [
+            (upstream_executor.submit(spotify_client.get_top_artists, access_token, time_range, TOP_ITEMS_PAGE_SIZE),
+             upstream_executor.submit(spotify_client.get_top_tracks, access_token, time_range, TOP_ITEMS_PAGE_SIZE))
+            for time_range in TOP_TIME_RANGES
+        ]
+        artist_lists, track_lists = [], []
+        for artists_future, tracks_future in pages:
+            for future, lists in ((artists_future, artist_lists), (tracks_future, track_lists)):
+                page = future.result()
+                if 'error' in page:
+                    print(f"Error getting top items for seeds: {page['error']}")
+                    continue
+                lists.append(page.get('items', []))
+
+        track_features = spotify_client.get_audio_features(
+            access_token, [track.get('id') for tracks in track_lists for track in tracks])
+        seed_artists, seed_tracks = select_seeds(artist_lists, track_lists, track_features)
+        if seed_artists or seed_tracks:
+            print(f"Diverse seeds: {len(seed_artists)} artists, {len(seed_tracks)} tracks")
+            return seed_artists, seed_tracks
+    except Exception as e:
+        print(f"Error choosing diverse seeds: {str(e)}")
+    return artist_ids[:2], track_ids[:3]
+
+def index_tracks(access_token, tracks):
+    """
+    Add tracks (e.g. Spotify's recommendations) to the track index in the background,
+    so later requests can be answered locally
+    """
+    def index():
+        try:
+            track_ids = [track.get('id') for track in tracks]
+            track_index.add(tracks, spotify_client.get_audio_feature_matrix(access_token, track_ids))
+        except Exception as e:
+            print(f"Error indexing tracks: {str(e)}")
+
+    upstream_executor.submit(index)
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def spotify_error_status(response):
+    # Pass Spotify rate limiting through as a 429 so the client can back off; other API errors stay 400
+    error = response.get('error')
+    if isinstance(error, dict) and error.get('status') == 429:
+        return 429
+    return 400
+
+# Shared thread pool for running independent Spotify calls concurrently.
+# Sized to the connection pool so concurrent calls don't queue for a socket.
+upstream_executor = ThreadPoolExecutor(max_workers=SPOTIFY_POOL_SIZE, thread_name_prefix="spotify-upstream")
 
 @app.route('/login')
 def login():
@@ -151,27 +601,34 @@ def callback():
     code = request.args.get('code')
     token_info = spotify_client.get_access_token(code)
 
-    # In a real app, you'd store tokens securely
-    # For this demo, we'll redirect to frontend with token in URL fragment
-    access_token = token_info.get('access_token')
+    if 'access_token' not in token_info:
+        print(f"Error exchanging authorization code: {token_info}")
+        return redirect(f"{RENDER_URL}/#error={token_info.get('error', 'login_failed')}")
+
+    # Keep the tokens server-side; the frontend only gets an opaque session id
+    session_id = token_store.create_session(token_info)
 
-    # Redirect back to the Render URL with the access token
-    return redirect(f"{RENDER_URL}/#access_token={access_token}")
+    # Redirect back to the Render URL with the session id
+    return redirect(f"{RENDER_URL}/#session_id={session_id}")
 
 @app.route('/top-artists')
 def top_artists():
-    access_token = request.args.get('access_token')
+    access_token = resolve_access_token(request.args)
     time_range = request.args.get('time_range', 'medium_term')
     limit = request.args.get('limit', 10)
+    if request.args.get('refresh'):
+        spotify_client.invalidate_user_data(access_token)
 
     artists = spotify_client.get_top_artists(access_token, time_range, limit)
     return jsonify(artists)
 
 @app.route('/top-tracks')
 def top_tracks():
-    access_token = request.args.get('access_token')
+    access_token = resolve_access_token(request.args)
     time_range = request.args.get('time_range', 'medium_term')
     limit = request.args.get('limit', 10)
+    if request.args.get('refresh'):
+        spotify_client.invalidate_user_data(access_token)
 
     tracks = spotify_client.get_top_tracks(access_token, time_range, limit)
     return jsonify(tracks)
@@ -188,49 +645,42 @@ def create_journey():
 
         prompt = data.get('prompt', '')
         print(f"Received journey prompt: {prompt}")
+        try:
+            seed = journey_seed(data.get('seed'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
         # Get access token if available (optional)
-        access_token = data.get('access_token')
-        top_artists = None
-        top_tracks = None
-
-        # If we have an access token, get the user's top artists and tracks
-        if access_token:
-            try:
-                print("Getting user's Spotify data...")
-                top_artists_response = spotify_client.get_top_artists(access_token, limit=20)
-                top_tracks_response = spotify_client.get_top_tracks(access_token, limit=20)
-
-                if 'items' in top_artists_response:
-                    top_artists = top_artists_response.get('items', [])
-                    print(f"Retrieved {len(top_artists)} top artists")
-                    if top_artists:
-                        print(f"Top artists: {', '.join([artist.get('name', '') for artist in top_artists[:5]])}")
-                else:
-                    print(f"No items in top_artists_response: {top_artists_response}")
-
-                if 'items' in top_tracks_response:
-                    top_tracks = top_tracks_response.get('items', [])
-                    print(f"Retrieved {len(top_tracks)} top tracks")
-                    if top_tracks:
-                        print(f"Top tracks: {', '.join([track.get('name', '') for track in top_tracks[:5]])}")
-                else:
-                    print(f"No items in top_tracks_response: {top_tracks_response}")
-            except Exception as e:
-                print(f"Error getting Spotify data: {str(e)}")
-                import traceback
-                traceback.print_exc()
-                # Continue without Spotify data
+        access_token = resolve_access_token(data)
+        top_artists, top_tracks = user_history(access_token)
 
         # Use AI to generate recommendations
         print("Generating AI recommendations...")
-        ai_recommendations = generate_recommendations(prompt, top_artists, top_tracks)
+        journey = generate_journey(prompt, top_artists, top_tracks, budget=JOURNEY_DEADLINE, seed=seed)
+        ai_recommendations = journey['tracks']
+        print(f"Journey built by: {journey['source']}")
+
+        # Look up Spotify URIs and album art for the suggestions so the journey can become a playlist.
+        # Anonymous journeys are resolved with the app's client-credentials token.
+        catalog_token = access_token or spotify_client.get_app_token()
+        if catalog_token:
+            try:
+                print("Resolving journey tracks on Spotify...")
+                ai_recommendations = resolve_tracks(spotify_client, catalog_token, ai_recommendations, cache=search_cache)
+            except Exception as e:
+                print(f"Error resolving journey tracks: {str(e)}")
+                # Continue with the unresolved tracks
 
         # Return the journey tracks
-        return jsonify({
+        response = {
             "name": f"AI Music Journey: {prompt[:30]}",
-            "tracks": ai_recommendations
-        })
+            "tracks": ai_recommendations,
+            "source": journey['source'],
+            "seed": journey['seed']
+        }
+        if 'fallback_reason' in journey:
+            response['fallback_reason'] = journey['fallback_reason']
+        return jsonify(response)
 
     except Exception as e:
         print(f"Unexpected error in create_journey: {str(e)}")
@@ -238,6 +688,63 @@ def create_journey():
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
+@app.route('/create-journey/stream', methods=['POST'])
+def create_journey_stream():
+    """
+    Same journey as /create-journey, sent as Server-Sent Events while it is built:
+    "progress" events for each stage, a "track" event per resolved track, then "done"
+    with the journey name and source (or "error").
+    """
+    data = request.json
+    if not data:
+        print("No JSON data received")
+        return jsonify({"error": "No JSON data received"}), 400
+
+    prompt = data.get('prompt', '')
+    print(f"Received streaming journey prompt: {prompt}")
+    try:
+        seed = journey_seed(data.get('seed'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    access_token = resolve_access_token(data)
+
+    def events():
+        try:
+            yield sse_event("progress", {"stage": "history"})
+            top_artists, top_tracks = user_history(access_token)
+            catalog_token = access_token or spotify_client.get_app_token()
+
+            yield sse_event("progress", {"stage": "generating"})
+            index = 0
+            for item in stream_journey(prompt, top_artists, top_tracks, budget=JOURNEY_DEADLINE, seed=seed):
+                if 'tracks' not in item:
+                    summary = item
+                    continue
+                tracks = item['tracks']
+                if catalog_token:
+                    try:
+                        # Everything that arrived together is searched concurrently
+                        tracks = resolve_tracks(spotify_client, catalog_token, tracks, cache=search_cache)
+                    except Exception as e:
+                        print(f"Error resolving journey tracks: {str(e)}")
+                for track in tracks:
+                    yield sse_event("track", {"index": index, "track": track})
+                    index += 1
+
+            print(f"Journey built by: {summary['source']}")
+            yield sse_event("done", {"name": f"AI Music Journey: {prompt[:30]}", "count": index, **summary})
+        except Exception as e:
+            print(f"Unexpected error in create_journey_stream: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            yield sse_event("error", {"error": str(e)})
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers={
+        "Cache-Control": "no-cache",
+        # Keep proxies from buffering the stream
+        "X-Accel-Buffering": "no"
+    })
+
 # Enhanced endpoint for personalized recommendations using Spotify API
 @app.route('/get-personalized-recommendations', methods=['POST'])
 def get_personalized_recommendations():
@@ -248,7 +755,7 @@ def get_personalized_recommendations():
             print("No JSON data received")
             return jsonify({"error": "No JSON data received"}), 400
 
-        access_token = data.get('access_token')
+        access_token = resolve_access_token(data)
         if not access_token:
             print("No access token provided")
             return jsonify({"error": "No access token provided"}), 400
@@ -256,13 +763,19 @@ def get_personalized_recommendations():
         prompt = data.get('prompt', '')
         print(f"Received prompt: {prompt}")
 
+        # Start the profile, top artists and top tracks requests concurrently;
+        # each result is still checked in order below
+        print("Getting user profile, top artists and top tracks...")
+        user_profile_future = upstream_executor.submit(spotify_client.get_user_profile, access_token)
+        top_artists_future = upstream_executor.submit(spotify_client.get_top_artists, access_token, limit=10)
+        top_tracks_future = upstream_executor.submit(spotify_client.get_top_tracks, access_token, limit=10)
+
         # Get user profile for debugging
         try:
-            print("Getting user profile...")
-            user_profile = spotify_client.get_user_profile(access_token)
+            user_profile = user_profile_future.result()
             if 'error' in user_profile:
                 print(f"Error getting user profile: {user_profile['error']}")
-                return jsonify({"error": f"Spotify API error: {user_profile['error'].get('message', 'Unknown error')}"}), 400
+                return jsonify({"error": f"Spotify API error: {user_profile['error'].get('message', 'Unknown error')}"}), spotify_error_status(user_profile)
             print(f"User profile retrieved: {user_profile.get('display_name')}")
         except Exception as e:
             print(f"Exception getting user profile: {str(e)}")
@@ -270,11 +783,10 @@ def get_personalized_recommendations():
 
         # Get top artists
         try:
-            print("Getting top artists...")
-            top_artists = spotify_client.get_top_artists(access_token, limit=10)
+            top_artists = top_artists_future.result()
             if 'error' in top_artists:
                 print(f"Error getting top artists: {top_artists['error']}")
-                return jsonify({"error": f"Spotify API error: {top_artists['error'].get('message', 'Unknown error')}"}), 400
+                return jsonify({"error": f"Spotify API error: {top_artists['error'].get('message', 'Unknown error')}"}), spotify_error_status(top_artists)
 
             artist_items = top_artists.get('items', [])
             print(f"Retrieved {len(artist_items)} top artists")
@@ -286,11 +798,10 @@ def get_personalized_recommendations():
 
         # Get top tracks
         try:
-            print("Getting top tracks...")
-            top_tracks = spotify_client.get_top_tracks(access_token, limit=10)
+            top_tracks = top_tracks_future.result()
             if 'error' in top_tracks:
                 print(f"Error getting top tracks: {top_tracks['error']}")
-                return jsonify({"error": f"Spotify API error: {top_tracks['error'].get('message', 'Unknown error')}"}), 400
+                return jsonify({"error": f"Spotify API error: {top_tracks['error'].get('message', 'Unknown error')}"}), spotify_error_status(top_tracks)
 
             track_items = top_tracks.get('items', [])
             print(f"Retrieved {len(track_items)} top tracks")
@@ -306,27 +817,40 @@ def get_personalized_recommendations():
 
         print(f"Using {len(artist_ids)} artist IDs and {len(track_ids)} track IDs for recommendations")
 
+        # Answer from the local track index when it already knows enough similar tracks
+        tracks = local_recommendations(access_token, track_items)
+        if tracks is not None:
+            print(f"Retrieved {len(tracks)} recommended tracks from the track index")
+            return jsonify({
+                "name": f"Personalized recommendations based on: {prompt[:30]}",
+                "tracks": tracks,
+                "source": "track_index"
+            })
+
         # Get recommendations
         try:
             print("Getting recommendations...")
+            seed_artists, seed_tracks = diverse_seeds(access_token, artist_ids, track_ids)
             recommendations = spotify_client.get_recommendations(
                 access_token,
-                seed_artists=artist_ids[:2] if artist_ids else None,
-                seed_tracks=track_ids[:3] if track_ids else None
+                seed_artists=seed_artists or None,
+                seed_tracks=seed_tracks or None
             )
 
             if 'error' in recommendations:
                 print(f"Error getting recommendations: {recommendations['error']}")
-                return jsonify({"error": f"Spotify API error: {recommendations['error'].get('message', 'Unknown error')}"}), 400
+                return jsonify({"error": f"Spotify API error: {recommendations['error'].get('message', 'Unknown error')}"}), spotify_error_status(recommendations)
 
             tracks = recommendations.get('tracks', [])
             print(f"Retrieved {len(tracks)} recommended tracks")
             for i, track in enumerate(tracks[:3]):
                 print(f"Recommendation {i+1}: {track.get('name')} by {', '.join([artist.get('name') for artist in track.get('artists', [])])}")
+            index_tracks(access_token, tracks)
 
             return jsonify({
                 "name": f"Personalized recommendations based on: {prompt[:30]}",
-                "tracks": tracks
+                "tracks": tracks,
+                "source": "spotify"
             })
         except Exception as e:
             print(f"Exception getting recommendations: {str(e)}")
@@ -351,7 +875,7 @@ def get_recommendations():
         print(f"Received prompt: {prompt}")
 
         # Try to use personalized recommendations if access token is provided
-        access_token = data.get('access_token')
+        access_token = resolve_access_token(data)
         if access_token:
             try:
                 # Create a new request to the personalized endpoint
@@ -461,26 +985,34 @@ def get_recommendations():
 def create_playlist():
     try:
         data = request.json
-        access_token = data.get('access_token')
+        access_token = resolve_access_token(data)
         prompt = data.get('prompt')
 
-        # Get user profile to get user ID
-        user_profile = spotify_client.get_user_profile(access_token)
+        # Get user profile (for the user ID) and top artists and tracks (for seeds) concurrently
+        user_profile_future = upstream_executor.submit(spotify_client.get_user_profile, access_token)
+        top_artists_future = upstream_executor.submit(spotify_client.get_top_artists, access_token, limit=5)
+        top_tracks_future = upstream_executor.submit(spotify_client.get_top_tracks, access_token, limit=5)
+
+        user_profile = user_profile_future.result()
         user_id = user_profile.get('id')
 
-        # Get top artists and tracks for seeds
-        top_artists = spotify_client.get_top_artists(access_token, limit=5)
-        top_tracks = spotify_client.get_top_tracks(access_token, limit=5)
+        top_artists = top_artists_future.result()
+        top_tracks = top_tracks_future.result()
 
         artist_ids = [artist['id'] for artist in top_artists.get('items', [])]
         track_ids = [track['id'] for track in top_tracks.get('items', [])]
 
-        # Get recommendations based on top artists and tracks
-        recommendations = spotify_client.get_recommendations(
-            access_token,
-            seed_artists=artist_ids[:2],
-            seed_tracks=track_ids[:3]
-        )
+        # Get recommendations based on top artists and tracks, from the track index if it can
+        tracks_details = local_recommendations(access_token, top_tracks.get('items', []))
+        if tracks_details is None:
+            seed_artists, seed_tracks = diverse_seeds(access_token, artist_ids, track_ids)
+            recommendations = spotify_client.get_recommendations(
+                access_token,
+                seed_artists=seed_artists,
+                seed_tracks=seed_tracks
+            )
+            tracks_details = recommendations.get('tracks', [])
+            index_tracks(access_token, tracks_details)
 
         # Create a new playlist
         playlist_name = f"Playlist based on: {prompt[:30]}"
@@ -492,11 +1024,8 @@ def create_playlist():
         )
 
         # Add tracks to the playlist
-        track_uris = [track['uri'] for track in recommendations.get('tracks', [])]
-        result = spotify_client.add_tracks_to_playlist(access_token, playlist['id'], track_uris)
-
-        # Get the tracks details to return to frontend
-        tracks_details = recommendations.get('tracks', [])
+        track_uris = [track['uri'] for track in tracks_details]
+        result = spotify_client.add_tracks_to_playlist(access_token, playlist['id'], track_uris, position=0)
 
         return jsonify({
             "name": playlist['name'],
@@ -509,7 +1038,9 @@ def create_playlist():
 
 @app.route('/user-profile')
 def user_profile():
-    access_token = request.args.get('access_token')
+    access_token = resolve_access_token(request.args)
+    if request.args.get('refresh'):
+        spotify_client.invalidate_user_data(access_token)
     profile = spotify_client.get_user_profile(access_token)
     return jsonify(profile)
 
@@ -519,7 +1050,20 @@ def debug():
     return jsonify({
         "status": "ok",
         "redirect_uri": REDIRECT_URI,
-        "render_url": RENDER_URL
+        "render_url": RENDER_URL,
+        "spotify_pool": spotify_client.get_pool_stats(),
+        "spotify_rate_limiter": spotify_rate_limiter.get_stats(),
+        "search_cache": search_cache.get_stats(),
+        "user_cache": user_data_cache.get_stats(),
+        "audio_feature_cache": audio_feature_cache.get_stats(),
+        "track_index": track_index.get_stats(),
+        "token_store": token_store.get_stats(),
+        "single_flight": {
+            "spotify": spotify_client.single_flight.get_stats(),
+            "huggingface": inference_single_flight.get_stats()
+        },
+        "huggingface_circuit": inference_breaker.get_state(),
+        "recommendation_cache": recommendation_cache.get_stats()
     })
 
 # Serve frontend files
@@ -0,0 +1,337 @@
+import asyncio
+import contextlib
+import os
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app import (
+    app as flask_app,
+    RENDER_URL,
+    CLIENT_ID,
+    CLIENT_SECRET,
+    REDIRECT_URI,
+    JOURNEY_DEADLINE,
+    SPOTIFY_CONNECT_TIMEOUT,
+    SPOTIFY_READ_TIMEOUT,
+    resolve_access_token,
+    spotify_client as sync_spotify_client,
+    diverse_seeds,
+    index_tracks,
+    local_recommendations,
+    search_cache,
+    spotify_error_status,
+    SPOTIFY_MAX_RETRIES,
+    SPOTIFY_RATE_BURST,
+    SPOTIFY_RATE_LIMIT,
+    user_data_cache
+)
+from ai_recommender import generate_journey, journey_seed
+from async_spotify_client import AsyncSpotifyClient
+from rate_limiter import RateLimiter
+from track_resolver import resolve_tracks_async
+
+# ASGI entry point. The Spotify-heavy endpoints run on the event loop with
+# AsyncSpotifyClient, so a single process can keep hundreds of journeys in
+# flight. Every other route (login, callback, static files, ...) is served
+# by the existing Flask app.
+#
+# Run with: gunicorn asgi:app -k uvicorn.workers.UvicornWorker
+
+# The event loop keeps far more calls in flight than the Flask thread pool, so the async
+# client gets its own limiter, sized to its connection pool instead of the Flask one
+ASYNC_SPOTIFY_POOL_SIZE = int(os.getenv("ASYNC_SPOTIFY_POOL_SIZE", "100"))
+async_spotify_rate_limiter = RateLimiter(
+    rate=SPOTIFY_RATE_LIMIT,
+    burst=SPOTIFY_RATE_BURST,
+    max_in_flight=int(os.getenv("ASYNC_SPOTIFY_MAX_IN_FLIGHT", str(ASYNC_SPOTIFY_POOL_SIZE))),
+    max_retries=SPOTIFY_MAX_RETRIES
+)
+
+spotify_client = AsyncSpotifyClient(
+    CLIENT_ID,
+    CLIENT_SECRET,
+    REDIRECT_URI,
+    pool_size=ASYNC_SPOTIFY_POOL_SIZE,
+    timeout=(SPOTIFY_CONNECT_TIMEOUT, SPOTIFY_READ_TIMEOUT),
+    rate_limiter=async_spotify_rate_limiter,
+    user_cache=user_data_cache
+)
+
+
+def spotify_error(response):
+    return response['error'].get('message', 'Unknown error') if isinstance(response['error'], dict) else response['error']
+
+
+async def top_artists(request):
+    access_token = await resolve_token(request.query_params)
+    time_range = request.query_params.get('time_range', 'medium_term')
+    limit = request.query_params.get('limit', 10)
+    if request.query_params.get('refresh'):
+        spotify_client.invalidate_user_data(access_token)
+
+    artists = await spotify_client.get_top_artists(access_token, time_range, limit)
+    return JSONResponse(artists)
+
+
+async def top_tracks(request):
+    access_token = await resolve_token(request.query_params)
+    time_range = request.query_params.get('time_range', 'medium_term')
+    limit = request.query_params.get('limit', 10)
+    if request.query_params.get('refresh'):
+        spotify_client.invalidate_user_data(access_token)
+
+    tracks = await spotify_client.get_top_tracks(access_token, time_range, limit)
+    return JSONResponse(tracks)
+
+
+async def user_profile(request):
+    access_token = await resolve_token(request.query_params)
+    if request.query_params.get('refresh'):
+        spotify_client.invalidate_user_data(access_token)
+    profile = await spotify_client.get_user_profile(access_token)
+    return JSONResponse(profile)
+
+
+def blocking_iter(items, loop):
+    """
+    Iterate the async iterator items from a worker thread, such as the blocking
+    recommender's, running each step on loop
+    """
+    async def step():
+        return await items.__anext__()
+
+    try:
+        while True:
+            try:
+                yield asyncio.run_coroutine_threadsafe(step(), loop).result()
+            except StopAsyncIteration:
+                return
+    finally:
+        # Not waited for: this may run on the event loop itself when the iterator is closed there
+        asyncio.run_coroutine_threadsafe(items.aclose(), loop)
+
+
+async def resolve_token(params):
+    # Session lookups may have to renew the token over the network, so run them in the thread pool
+    return await run_in_threadpool(resolve_access_token, params)
+
+
+async def read_json(request: Request):
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+
+async def create_journey(request):
+    try:
+        data = await read_json(request)
+        if not data:
+            return JSONResponse({"error": "No JSON data received"}, status_code=400)
+
+        prompt = data.get('prompt', '')
+        try:
+            seed = journey_seed(data.get('seed'))
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        access_token = await resolve_token(data)
+        top_artists = None
+        top_tracks = None
+
+        if access_token:
+            # Same lazy history as the Flask app's user_history: both first pages are requested
+            # now, later pages only if the recommender gets that far
+            loop = asyncio.get_running_loop()
+            top_artists = blocking_iter(spotify_client.iter_top_artists(access_token), loop)
+            top_tracks = blocking_iter(spotify_client.iter_top_tracks(access_token), loop)
+
+        # The recommender is blocking (Hugging Face over requests), keep it off the event loop
+        try:
+            journey = await run_in_threadpool(generate_journey, prompt, top_artists, top_tracks, JOURNEY_DEADLINE, seed)
+        finally:
+            # Cancel any page still being prefetched
+            for items in (top_artists, top_tracks):
+                if items is not None:
+                    items.close()
+        ai_recommendations = journey['tracks']
+
+        # Anonymous journeys are resolved with the app's client-credentials token
+        catalog_token = access_token or await run_in_threadpool(sync_spotify_client.get_app_token)
+        if catalog_token:
+            try:
+                ai_recommendations = await resolve_tracks_async(spotify_client, catalog_token, ai_recommendations, cache=search_cache)
+            except Exception as e:
+                print(f"Error resolving journey tracks: {str(e)}")
+
+        response = {
+            "name": f"AI Music Journey: {prompt[:30]}",
+            "tracks": ai_recommendations,
+            "source": journey['source'],
+            "seed": journey['seed']
+        }
+        if 'fallback_reason' in journey:
+            response['fallback_reason'] = journey['fallback_reason']
+        return JSONResponse(response)
+    except Exception as e:
+        print(f"Unexpected error in create_journey: {str(e)}")
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+async def get_personalized_recommendations(request):
+    try:
+        data = await read_json(request)
+        if not data:
+            return JSONResponse({"error": "No JSON data received"}, status_code=400)
+
+        access_token = await resolve_token(data)
+        if not access_token:
+            return JSONResponse({"error": "No access token provided"}, status_code=400)
+
+        prompt = data.get('prompt', '')
+
+        results = await asyncio.gather(
+            spotify_client.get_user_profile(access_token),
+            spotify_client.get_top_artists(access_token, limit=10),
+            spotify_client.get_top_tracks(access_token, limit=10),
+            return_exceptions=True
+        )
+        for label, result in zip(("user profile", "top artists", "top tracks"), results):
+            if isinstance(result, Exception):
+                print(f"Exception getting {label}: {str(result)}")
+                return JSONResponse({"error": f"Error getting {label}: {str(result)}"}, status_code=500)
+            if 'error' in result:
+                print(f"Error getting {label}: {result['error']}")
+                return JSONResponse({"error": f"Spotify API error: {spotify_error(result)}"}, status_code=spotify_error_status(result))
+
+        _, top_artists, top_tracks = results
+        artist_ids = [artist.get('id') for artist in top_artists.get('items', []) if artist.get('id')]
+        track_ids = [track.get('id') for track in top_tracks.get('items', []) if track.get('id')]
+
+        # The track index is searched with the blocking client, off the event loop
+        tracks = await run_in_threadpool(local_recommendations, access_token, top_tracks.get('items', []))
+        if tracks is not None:
+            return JSONResponse({
+                "name": f"Personalized recommendations based on: {prompt[:30]}",
+                "tracks": tracks,
+                "source": "track_index"
+            })
+
+        try:
+            seed_artists, seed_tracks = await run_in_threadpool(diverse_seeds, access_token, artist_ids, track_ids)
+            recommendations = await spotify_client.get_recommendations(
+                access_token,
+                seed_artists=seed_artists or None,
+                seed_tracks=seed_tracks or None
+            )
+            if 'error' in recommendations:
+                print(f"Error getting recommendations: {recommendations['error']}")
+                return JSONResponse({"error": f"Spotify API error: {spotify_error(recommendations)}"}, status_code=spotify_error_status(recommendations))
+
+            index_tracks(access_token, recommendations.get('tracks', []))
+            return JSONResponse({
+                "name": f"Personalized recommendations based on: {prompt[:30]}",
+                "tracks": recommendations.get('tracks', []),
+                "source": "spotify"
+            })
+        except Exception as e:
+            print(f"Exception getting recommendations: {str(e)}")
+            return JSONResponse({"error": f"Error getting recommendations: {str(e)}"}, status_code=500)
+    except Exception as e:
+        print(f"Unexpected error in get_personalized_recommendations: {str(e)}")
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+async def create_playlist(request):
+    try:
+        data = await read_json(request) or {}
+        access_token = await resolve_token(data)
+        prompt = data.get('prompt')
+
+        user_profile, top_artists, top_tracks = await asyncio.gather(
+            spotify_client.get_user_profile(access_token),
+            spotify_client.get_top_artists(access_token, limit=5),
+            spotify_client.get_top_tracks(access_token, limit=5)
+        )
+        user_id = user_profile.get('id')
+
+        artist_ids = [artist['id'] for artist in top_artists.get('items', [])]
+        track_ids = [track['id'] for track in top_tracks.get('items', [])]
+
+        tracks = await run_in_threadpool(local_recommendations, access_token, top_tracks.get('items', []))
+        if tracks is None:
+            seed_artists, seed_tracks = await run_in_threadpool(diverse_seeds, access_token, artist_ids, track_ids)
+            recommendations = await spotify_client.get_recommendations(
+                access_token,
+                seed_artists=seed_artists,
+                seed_tracks=seed_tracks
+            )
+            tracks = recommendations.get('tracks', [])
+            index_tracks(access_token, tracks)
+
+        playlist_name = f"Playlist based on: {prompt[:30]}"
+        playlist = await spotify_client.create_playlist(
+            access_token,
+            user_id,
+            playlist_name,
+            f"Created with prompt: {prompt}"
+        )
+
+        track_uris = [track['uri'] for track in tracks]
+        await spotify_client.add_tracks_to_playlist(access_token, playlist['id'], track_uris, position=0)
+
+        return JSONResponse({
+            "name": playlist['name'],
+            "external_url": playlist['external_urls']['spotify'],
+            "tracks": tracks
+        })
+    except Exception as e:
+        print(f"Error in create_playlist: {str(e)}")
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    yield
+    await spotify_client.aclose()
+
+
+async_routes = [
+    Route('/top-artists', top_artists),
+    Route('/top-tracks', top_tracks),
+    Route('/user-profile', user_profile),
+    Route('/create-journey', create_journey, methods=['POST']),
+    Route('/get-personalized-recommendations', get_personalized_recommendations, methods=['POST']),
+    Route('/create-playlist', create_playlist, methods=['POST'])
+]
+ASYNC_PATHS = {route.path for route in async_routes}
+
+async_app = Starlette(
+    routes=async_routes,
+    middleware=[
+        # Same origins as the flask-cors setup in app.py
+        Middleware(
+            CORSMiddleware,
+            allow_origins=[RENDER_URL, "http://localhost:5000", "http://127.0.0.1:5000"],
+            allow_methods=["*"],
+            allow_headers=["*"],
+            allow_credentials=True
+        )
+    ],
+    lifespan=lifespan
+)
+wsgi_app = WSGIMiddleware(flask_app)
+
+
+async def app(scope, receive, send):
+    # Lifespan events and the async routes go to Starlette, everything else to Flask
+    if scope['type'] == 'http' and scope['path'] not in ASYNC_PATHS:
+        await wsgi_app(scope, receive, send)
+    else:
+        await async_app(scope, receive, send)
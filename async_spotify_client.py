@@ -0,0 +1,251 @@
+import asyncio
+import base64
+import json
+from urllib.parse import urlencode
+
+import httpx
+
+from rate_limiter import RateLimiter, RateLimitExceeded, ThrottledResponse, bearer_token, retry_statuses_for, token_key
+from user_cache import UserDataCache
+from single_flight import SingleFlight, request_key
+from spotify_common import PLAYLIST_ADD_LIMIT, TOP_TIME_RANGES, TOP_ITEMS_PAGE_SIZE, TopItemPages, add_tracks_steps, slice_top_items, top_items_count
+
+
+class AsyncSpotifyClient:
+    """
+    Asyncio version of SpotifyClient in app.py with the same methods and return values.
+    All calls share one httpx.AsyncClient, so connections are pooled and kept alive
+    across requests handled by the same event loop.
+    """
+
+    def __init__(self, client_id, client_secret, redirect_uri, pool_size=100, timeout=(3.05, 15), keepalive_expiry=30.0, rate_limiter=None, user_cache=None, single_flight=None):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.redirect_uri = redirect_uri
+        self.auth_url = "https://accounts.spotify.com/authorize"
+        self.token_url = "https://accounts.spotify.com/api/token"
+        self.api_base_url = "https://api.spotify.com/v1/"
+        self.pool_size = pool_size
+        self.timeout = timeout
+
+        connect_timeout, read_timeout = timeout
+        self.http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size,
+                keepalive_expiry=keepalive_expiry
+            ),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout)
+        )
+        self.rate_limiter = rate_limiter or RateLimiter(max_in_flight=pool_size)
+        self.user_cache = user_cache
+        self.single_flight = single_flight or SingleFlight()
+
+    async def _request(self, method, url, retry_statuses=None, **kwargs):
+        user_key = token_key(bearer_token(kwargs.get("headers")))
+        if retry_statuses is None:
+            retry_statuses = retry_statuses_for(method)
+
+        async def send():
+            return await self.http.request(method, url, **kwargs)
+
+        async def call():
+            try:
+                return await self.rate_limiter.call_async(send, user_key, retry_statuses)
+            except RateLimitExceeded as e:
+                print(f"Not calling Spotify: {e}")
+                return ThrottledResponse(e.retry_after)
+
+        if method != "GET":
+            return await call()
+        key = request_key(method, url, kwargs.get("params"), kwargs.get("headers"))
+        return await self.single_flight.do_async(key, call)
+
+    async def _get_user_data(self, access_token, endpoint, params=None):
+        user_key = token_key(access_token)
+        cache_key = UserDataCache.make_key(endpoint, params)
+        if self.user_cache is not None:
+            found, cached = self.user_cache.get(user_key, cache_key)
+            if found:
+                return cached
+
+        headers = {"Authorization": f"Bearer {access_token}"}
+        response = await self._request("GET", endpoint, headers=headers, params=params)
+        result = response.json()
+        if self.user_cache is not None and 'error' not in result:
+            self.user_cache.set(user_key, cache_key, result, size=len(response.content))
+        return result
+
+    async def _get_top_items(self, access_token, endpoint, time_range, limit):
+        count = top_items_count(limit)
+        if count is None:
+            return await self._get_user_data(access_token, endpoint, {"time_range": time_range, "limit": limit})
+        page = await self._get_user_data(access_token, endpoint, {"time_range": time_range, "limit": TOP_ITEMS_PAGE_SIZE})
+        return slice_top_items(page, count)
+
+    def invalidate_user_data(self, access_token):
+        if self.user_cache is not None:
+            self.user_cache.invalidate(token_key(access_token))
+
+    async def aclose(self):
+        await self.http.aclose()
+
+    def get_auth_url(self):
+        params = {
+            "client_id": self.client_id,
+            "response_type": "code",
+            "redirect_uri": self.redirect_uri,
+            "scope": "user-top-read playlist-modify-public playlist-modify-private"
+        }
+        auth_url = f"{self.auth_url}?{urlencode(params)}"
+        return auth_url
+
+    async def get_access_token(self, code):
+        auth_header = base64.b64encode(f"{self.client_id}:{self.client_secret}".encode()).decode()
+        headers = {
+            "Authorization": f"Basic {auth_header}",
+            "Content-Type": "application/x-www-form-urlencoded"
+        }
+        data = {
+            "grant_type": "authorization_code",
+            "code": code,
+            "redirect_uri": self.redirect_uri
+        }
+        response = await self._request("POST", self.token_url, headers=headers, data=data)
+        return response.json()
+
+    async def get_top_artists(self, access_token, time_range="medium_term", limit=10):
+        return await self._get_top_items(access_token, f"{self.api_base_url}me/top/artists", time_range, limit)
+
+    async def get_top_tracks(self, access_token, time_range="medium_term", limit=10):
+        return await self._get_top_items(access_token, f"{self.api_base_url}me/top/tracks", time_range, limit)
+
+    def iter_top_artists(self, access_token, time_ranges=TOP_TIME_RANGES, max_items=None, page_size=TOP_ITEMS_PAGE_SIZE):
+        return self._iter_top_items(f"{self.api_base_url}me/top/artists", access_token, time_ranges, max_items, page_size)
+
+    def iter_top_tracks(self, access_token, time_ranges=TOP_TIME_RANGES, max_items=None, page_size=TOP_ITEMS_PAGE_SIZE):
+        return self._iter_top_items(f"{self.api_base_url}me/top/tracks", access_token, time_ranges, max_items, page_size)
+
+    def _iter_top_items(self, endpoint, access_token, time_ranges, max_items, page_size):
+        """
+        Async iterator version of SpotifyClient._iter_top_items: the next page is fetched in
+        a task while the current one is consumed, and the task is cancelled when the caller
+        stops iterating. Call it on the event loop; the first page is requested right away.
+        """
+        pages = TopItemPages(endpoint, time_ranges, max_items, page_size)
+
+        def fetch(url, params):
+            return asyncio.ensure_future(self._get_user_data(access_token, url, params))
+
+        async def generate(task):
+            try:
+                while task is not None:
+                    try:
+                        page = await task
+                    except Exception as e:
+                        page = {"error": str(e)}
+                    items, next_page = pages.take(page)
+                    task = fetch(*next_page) if next_page else None
+                    for item in items:
+                        yield item
+            finally:
+                if task is not None:
+                    task.cancel()
+
+        first = pages.first()
+        return generate(fetch(*first) if first else None)
+
+    async def create_playlist(self, access_token, user_id, name, description):
+        headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/json"
+        }
+        endpoint = f"{self.api_base_url}users/{user_id}/playlists"
+        data = json.dumps({
+            "name": name,
+            "description": description,
+            "public": False
+        })
+        response = await self._request("POST", endpoint, headers=headers, content=data)
+        return response.json()
+
+    async def add_tracks_to_playlist(self, access_token, playlist_id, track_uris, position=None, chunk_size=PLAYLIST_ADD_LIMIT, max_chunk_retries=2):
+        """
+        Same chunking and retries as SpotifyClient.add_tracks_to_playlist, driven by
+        spotify_common.add_tracks_steps
+        """
+        steps = add_tracks_steps(playlist_id, track_uris, position, chunk_size, max_chunk_retries)
+        answer = None
+        while True:
+            try:
+                step = steps.send(answer)
+            except StopIteration as done:
+                return done.value
+            answer = await self._playlist_step(access_token, playlist_id, step)
+
+    async def _playlist_step(self, access_token, playlist_id, step):
+        if step[0] == "state":
+            try:
+                return await self.get_playlist_state(access_token, playlist_id)
+            except (httpx.HTTPError, ValueError) as e:
+                return {"error": {"status": None, "message": str(e)}}
+
+        if step[0] == "wait":
+            await asyncio.sleep(self.rate_limiter.retry_delay(*step[1:]))
+            return None
+
+        chunk, position = step[1:]
+        headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/json"
+        }
+        endpoint = f"{self.api_base_url}playlists/{playlist_id}/tracks"
+        status_code = None
+        try:
+            # Retried by add_tracks_steps, after checking the playlist, rather than blindly by the rate limiter
+            response = await self._request("POST", endpoint, headers=headers, content=json.dumps({"uris": chunk, "position": position}), retry_statuses=())
+            status_code = response.status_code
+            return status_code, response.json(), False
+        except (httpx.HTTPError, ValueError) as e:
+            return status_code, {"error": {"status": status_code, "message": str(e)}}, True
+
+    async def get_playlist_state(self, access_token, playlist_id):
+        headers = {"Authorization": f"Bearer {access_token}"}
+        endpoint = f"{self.api_base_url}playlists/{playlist_id}"
+        params = {"fields": "snapshot_id,tracks.total"}
+        response = await self._request("GET", endpoint, headers=headers, params=params)
+        return response.json()
+
+    async def get_recommendations(self, access_token, seed_artists=None, seed_tracks=None, limit=20, **kwargs):
+        headers = {"Authorization": f"Bearer {access_token}"}
+        endpoint = f"{self.api_base_url}recommendations"
+        params = {"limit": limit}
+
+        if seed_artists:
+            params["seed_artists"] = ",".join(seed_artists[:5])
+        if seed_tracks:
+            params["seed_tracks"] = ",".join(seed_tracks[:5])
+
+        # Add any additional parameters (like min_energy, target_valence, etc.)
+        for key, value in kwargs.items():
+            params[key] = value
+
+        print(f"Recommendation params: {params}")
+        response = await self._request("GET", endpoint, headers=headers, params=params)
+        return response.json()
+
+    async def search_tracks(self, access_token, query, limit=5):
+        headers = {"Authorization": f"Bearer {access_token}"}
+        endpoint = f"{self.api_base_url}search"
+        params = {
+            "q": query,
+            "type": "track",
+            "limit": limit
+        }
+        print(f"Searching for tracks with query: {query}")
+        response = await self._request("GET", endpoint, headers=headers, params=params)
+        return response.json()
+
+    async def get_user_profile(self, access_token):
+        endpoint = f"{self.api_base_url}me"
+        return await self._get_user_data(access_token, endpoint)
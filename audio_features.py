@@ -0,0 +1,74 @@
+import numpy as np
+
+from ttl_cache import TTLCache
+
+# Spotify accepts at most 100 IDs per audio-features request
+AUDIO_FEATURES_BATCH = 100
+
+# Columns of a feature matrix, in order. Tempo is in BPM, the others are 0-1.
+FEATURE_COLUMNS = ("energy", "valence", "tempo", "danceability")
+ENERGY, VALENCE, TEMPO, DANCEABILITY = range(len(FEATURE_COLUMNS))
+
+# Rough top of the tempo range, so tempo weighs about as much as the 0-1 features in distances
+TEMPO_SCALE = 200.0
+
+
+class AudioFeatureCache(TTLCache):
+    """
+    In-memory cache of audio features per track ID. Features don't change and aren't
+    per user, so entries live long and are shared by everyone in the worker. Tracks
+    Spotify has no features for are cached as None so they aren't asked for again.
+    get_many returns ({track_id: features}, [missing track IDs]) where features is a
+    tuple in FEATURE_COLUMNS order, or None for tracks known to have no features.
+    """
+
+    def __init__(self, ttl=7 * 24 * 3600, max_entries=100000):
+        super().__init__(ttl, max_entries)
+
+
+def parse_features(response, track_ids):
+    """
+    {track_id: features} from an audio-features response for track_ids. Spotify answers
+    null for tracks it has no analysis of; those map to None.
+    """
+    features = dict.fromkeys(track_ids)
+    for item in response.get('audio_features') or []:
+        if not item or item.get('id') not in features:
+            continue
+        try:
+            features[item['id']] = tuple(float(item[column]) for column in FEATURE_COLUMNS)
+        except (KeyError, TypeError, ValueError):
+            pass
+    return features
+
+
+def feature_matrix(track_ids, features):
+    """
+    Pack features into a C-contiguous float32 matrix with one row per track ID, in the
+    order given, and one column per FEATURE_COLUMNS entry. Rows of tracks without
+    features are NaN.
+    """
+    matrix = np.full((len(track_ids), len(FEATURE_COLUMNS)), np.nan, dtype=np.float32)
+    for row, track_id in enumerate(track_ids):
+        values = features.get(track_id)
+        if values is not None:
+            matrix[row] = values
+    return matrix
+
+
+def normalized(matrix):
+    """
+    Copy of a feature matrix with tempo scaled to about 0-1, for distances between tracks
+    """
+    scaled = np.array(matrix, dtype=np.float32).reshape(-1, len(FEATURE_COLUMNS))
+    scaled[:, TEMPO] /= TEMPO_SCALE
+    return scaled
+
+
+def centroid(matrix):
+    """
+    Mean row of a feature matrix over the tracks that have features, or None if none do
+    """
+    rows = np.asarray(matrix)[~np.isnan(matrix).any(axis=1)]
+    return rows.mean(axis=0) if len(rows) else None
+
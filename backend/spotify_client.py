@@ -1,17 +1,45 @@
 import os
 import requests
+from requests.adapters import HTTPAdapter
 import base64
 import json
 from urllib.parse import urlencode
 
 class SpotifyClient:
-    def __init__(self, client_id, client_secret, redirect_uri):
+    def __init__(self, client_id, client_secret, redirect_uri, pool_size=10, timeout=(3.05, 15)):
         self.client_id = client_id
         self.client_secret = client_secret
         self.redirect_uri = redirect_uri
         self.auth_url = "https://accounts.spotify.com/authorize"
         self.token_url = "https://accounts.spotify.com/api/token"
         self.api_base_url = "https://api.spotify.com/v1/"
+        self.pool_size = pool_size
+        self.timeout = timeout
+
+        # Keep-alive session so repeated calls reuse pooled connections
+        self.session = requests.Session()
+        self.session.headers.update({"Connection": "keep-alive"})
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, pool_block=False)
+        self.session.mount("https://", adapter)
+        self.adapter = adapter
+
+    def _request(self, method, url, timeout=None, **kwargs):
+        return self.session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+
+    def get_pool_stats(self):
+        hosts = {}
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            hosts[pool.host] = {
+                "connections_opened": pool.num_connections,
+                "requests": pool.num_requests,
+                "reused_requests": max(pool.num_requests - pool.num_connections, 0),
+                "idle_connections": sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool else 0
+            }
+        return {"pool_size": self.pool_size, "timeout": self.timeout, "hosts": hosts}
         
     def get_auth_url(self):
         params = {
@@ -34,21 +62,21 @@ class SpotifyClient:
             "code": code,
             "redirect_uri": self.redirect_uri
         }
-        response = requests.post(self.token_url, headers=headers, data=data)
+        response = self._request("POST", self.token_url, headers=headers, data=data)
         return response.json()
     
     def get_top_artists(self, access_token, time_range="medium_term", limit=10):
         headers = {"Authorization": f"Bearer {access_token}"}
         endpoint = f"{self.api_base_url}me/top/artists"
         params = {"time_range": time_range, "limit": limit}
-        response = requests.get(endpoint, headers=headers, params=params)
+        response = self._request("GET", endpoint, headers=headers, params=params)
         return response.json()
     
     def get_top_tracks(self, access_token, time_range="medium_term", limit=10):
         headers = {"Authorization": f"Bearer {access_token}"}
         endpoint = f"{self.api_base_url}me/top/tracks"
         params = {"time_range": time_range, "limit": limit}
-        response = requests.get(endpoint, headers=headers, params=params)
+        response = self._request("GET", endpoint, headers=headers, params=params)
         return response.json()
     
     def create_playlist(self, access_token, user_id, name, description):
@@ -62,7 +90,7 @@ class SpotifyClient:
             "description": description,
             "public": False
         })
-        response = requests.post(endpoint, headers=headers, data=data)
+        response = self._request("POST", endpoint, headers=headers, data=data)
         return response.json()
     
     def add_tracks_to_playlist(self, access_token, playlist_id, track_uris):
@@ -72,7 +100,7 @@ class SpotifyClient:
         }
         endpoint = f"{self.api_base_url}playlists/{playlist_id}/tracks"
         data = json.dumps({"uris": track_uris})
-        response = requests.post(endpoint, headers=headers, data=data)
+        response = self._request("POST", endpoint, headers=headers, data=data)
         return response.json()
     
     def get_recommendations(self, access_token, seed_artists=None, seed_tracks=None, limit=20):
@@ -85,11 +113,11 @@ class SpotifyClient:
         if seed_tracks:
             params["seed_tracks"] = ",".join(seed_tracks[:5])
             
-        response = requests.get(endpoint, headers=headers, params=params)
+        response = self._request("GET", endpoint, headers=headers, params=params)
         return response.json()
     
     def get_user_profile(self, access_token):
         headers = {"Authorization": f"Bearer {access_token}"}
         endpoint = f"{self.api_base_url}me"
-        response = requests.get(endpoint, headers=headers)
+        response = self._request("GET", endpoint, headers=headers)
         return response.json()
\ No newline at end of file
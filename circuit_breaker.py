@@ -0,0 +1,141 @@
+import threading
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling a backend while its circuit breaker is open
+    """
+
+
+class CircuitBreaker:
+    """
+    Stops calling a backend that keeps failing.
+
+    - closed: calls go through; outcomes from the last `window` seconds are tracked, and the
+      breaker opens once at least `min_calls` were made and `failure_rate` of them failed.
+    - open: calls are refused (callers go straight to their fallback) for `open_seconds`,
+      or for as long as the backend said it needs (e.g. a model that is still loading).
+    - half_open: up to `half_open_probes` trial calls are let through; a success closes the
+      breaker, a failure opens it again.
+    """
+
+    def __init__(self, name, failure_rate=0.5, min_calls=5, window=60.0, open_seconds=30.0, half_open_probes=1):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+
+        self.lock = threading.Lock()
+        self.state = CLOSED
+        self.outcomes = deque()
+        self.opened_until = 0.0
+        self.probes_in_flight = 0
+        self.stats = {"rejected": 0, "opened": 0}
+
+    def _trim(self, now):
+        while self.outcomes and self.outcomes[0][0] < now - self.window:
+            self.outcomes.popleft()
+
+    def _open(self, now, seconds=None):
+        self.state = OPEN
+        self.opened_until = now + (seconds if seconds is not None else self.open_seconds)
+        self.probes_in_flight = 0
+        self.stats["opened"] += 1
+        print(f"Circuit breaker '{self.name}' opened for {self.opened_until - now:.1f}s")
+
+    def allow(self):
+        """
+        Whether a call may go out now. Every allowed call must be followed by
+        record_success() or record_failure().
+        """
+        with self.lock:
+            now = time.monotonic()
+            if self.state == OPEN:
+                if now < self.opened_until:
+                    self.stats["rejected"] += 1
+                    return False
+                self.state = HALF_OPEN
+                self.probes_in_flight = 0
+
+            if self.state == HALF_OPEN:
+                if self.probes_in_flight >= self.half_open_probes:
+                    self.stats["rejected"] += 1
+                    return False
+                self.probes_in_flight += 1
+            return True
+
+    def is_open(self):
+        """
+        Whether calls would be refused right now. Unlike allow(), this doesn't take a
+        half-open probe slot, so callers can skip straight to their fallback.
+        """
+        with self.lock:
+            now = time.monotonic()
+            if self.state == OPEN and now < self.opened_until:
+                rejecting = True
+            elif self.state == HALF_OPEN or self.state == OPEN:
+                rejecting = self.probes_in_flight >= self.half_open_probes
+            else:
+                rejecting = False
+            if rejecting:
+                self.stats["rejected"] += 1
+            return rejecting
+
+    def record_success(self):
+        with self.lock:
+            now = time.monotonic()
+            if self.state == HALF_OPEN:
+                print(f"Circuit breaker '{self.name}' closed")
+                self.state = CLOSED
+                self.outcomes.clear()
+                self.probes_in_flight = 0
+                return
+            self.outcomes.append((now, True))
+            self._trim(now)
+
+    def record_failure(self, retry_after=None):
+        """
+        retry_after: how long the backend said it will be unavailable, if it said so
+        """
+        with self.lock:
+            now = time.monotonic()
+            if self.state == HALF_OPEN:
+                self._open(now, retry_after)
+                return
+            if self.state == OPEN:
+                return
+
+            self.outcomes.append((now, False))
+            self._trim(now)
+            if retry_after is not None:
+                # The backend told us it is down; no need to wait for more failures
+                self._open(now, retry_after)
+                return
+            failures = sum(1 for _, ok in self.outcomes if not ok)
+            if len(self.outcomes) >= self.min_calls and failures / len(self.outcomes) >= self.failure_rate:
+                self._open(now)
+
+    def get_state(self):
+        with self.lock:
+            now = time.monotonic()
+            self._trim(now)
+            failures = sum(1 for _, ok in self.outcomes if not ok)
+            state = self.state
+            if state == OPEN and now >= self.opened_until:
+                state = HALF_OPEN
+            return {
+                "name": self.name,
+                "state": state,
+                "recent_calls": len(self.outcomes),
+                "recent_failures": failures,
+                "open_for": round(max(self.opened_until - now, 0.0), 1) if state == OPEN else 0,
+                **self.stats
+            }
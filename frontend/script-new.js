@@ -6,11 +6,17 @@ document.addEventListener('DOMContentLoaded', () => {
         : 'https://spotify-playlist-creator-1a7x.onrender.com'; // Your actual Render URL
     
     let accessToken = null;
+    let sessionId = null;
     let journeyHistory = [];
 
-    // Check if we have an access token in the URL (after redirect)
+    // Check if we have a session id (or a raw access token) in the URL (after redirect)
     const hashParams = new URLSearchParams(window.location.hash.substring(1));
     accessToken = hashParams.get('access_token');
+    sessionId = hashParams.get('session_id') || localStorage.getItem('sessionId');
+    if (sessionId) {
+        // The server keeps the session's token fresh, so it survives page reloads
+        localStorage.setItem('sessionId', sessionId);
+    }
 
     // Initialize theme
     initTheme();
@@ -21,8 +27,8 @@ document.addEventListener('DOMContentLoaded', () => {
     // Show the app section by default for the demo
     showApp();
 
-    if (accessToken) {
-        // Remove the access token from URL for security
+    if (sessionId || accessToken) {
+        // Remove the session id / access token from URL for security
         window.history.replaceState({}, document.title, window.location.pathname);
         // Show user profile and load Spotify data if logged in
         document.getElementById('user-profile').classList.remove('hidden');
@@ -64,8 +70,14 @@ document.addEventListener('DOMContentLoaded', () => {
         // User profile is only shown when logged in
     }
 
+    function authQuery() {
+        return sessionId
+            ? `session_id=${encodeURIComponent(sessionId)}`
+            : `access_token=${accessToken}`;
+    }
+
     function loadUserProfile() {
-        fetch(`${API_BASE_URL}/user-profile?access_token=${accessToken}`)
+        fetch(`${API_BASE_URL}/user-profile?${authQuery()}`)
             .then(response => response.json())
             .then(data => {
                 document.getElementById('profile-name').textContent = data.display_name;
@@ -77,7 +89,7 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     function loadTopArtists() {
-        fetch(`${API_BASE_URL}/top-artists?access_token=${accessToken}`)
+        fetch(`${API_BASE_URL}/top-artists?${authQuery()}`)
             .then(response => response.json())
             .then(data => {
                 const artistsContainer = document.getElementById('top-artists');
@@ -105,7 +117,7 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     function loadTopTracks() {
-        fetch(`${API_BASE_URL}/top-tracks?access_token=${accessToken}`)
+        fetch(`${API_BASE_URL}/top-tracks?${authQuery()}`)
             .then(response => response.json())
             .then(data => {
                 const tracksContainer = document.getElementById('top-tracks');
@@ -144,18 +156,25 @@ document.addEventListener('DOMContentLoaded', () => {
         createButton.textContent = 'Creating Journey...';
         createButton.disabled = true;
 
-        // Show loading indicator
+        // Show loading indicator until the first track arrives
         document.getElementById('loading-indicator').classList.remove('hidden');
         // Hide any previous results
-        document.getElementById('playlist-result').classList.add('hidden');
+        const resultElement = document.getElementById('playlist-result');
+        resultElement.classList.add('hidden');
+        resultElement.innerHTML = '';
 
-        fetch(`${API_BASE_URL}/create-journey`, {
+        const tracks = [];
+        let tracksList = null;
+        const moodLists = {};
+
+        fetch(`${API_BASE_URL}/create-journey/stream`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
             },
             body: JSON.stringify({
                 prompt: prompt,
+                session_id: sessionId,
                 access_token: accessToken
             })
         })
@@ -163,134 +182,146 @@ document.addEventListener('DOMContentLoaded', () => {
             if (!response.ok) {
                 throw new Error(`HTTP error! Status: ${response.status}`);
             }
-            return response.json();
+            // Tracks are rendered as the server streams them in
+            return readJourneyEvents(response, (event, data) => {
+                if (event === 'progress') {
+                    createButton.textContent = journeyStageLabels[data.stage] || 'Creating Journey...';
+                } else if (event === 'track') {
+                    if (!tracksList) {
+                        document.getElementById('loading-indicator').classList.add('hidden');
+                        resultElement.classList.remove('hidden');
+                        tracksList = document.createElement('div');
+                        tracksList.className = 'playlist-tracks';
+                        tracksList.innerHTML = '<h4>Your AI-Generated Music Journey:</h4>';
+                        resultElement.appendChild(tracksList);
+                    }
+                    tracks.push(data.track);
+                    appendJourneyTrack(tracksList, moodLists, data.track);
+                } else if (event === 'done') {
+                    finishJourney(prompt, { name: data.name, source: data.source, tracks: tracks });
+                } else if (event === 'error') {
+                    throw new Error(data.error);
+                }
+            });
         })
-        .then(data => {
+        .catch(error => {
+            console.error('Error:', error);
+            resetCreateButton();
+
             // Hide loading indicator
             document.getElementById('loading-indicator').classList.add('hidden');
-            
-            // Reset button
-            createButton.textContent = 'Create Music Journey';
-            createButton.innerHTML = `
-                <svg width="20" height="20" viewBox="0 0 24 24" fill="none" xmlns="http://www.w3.org/2000/svg" style="margin-right: 8px; vertical-align: middle;">
-                    <path d="M12 2C6.48 2 2 6.48 2 12C2 17.52 6.48 22 12 22C17.52 22 22 17.52 22 12C22 6.48 17.52 2 12 2ZM17 13H13V17H11V13H7V11H11V7H13V11H17V13Z" fill="white"/>
-                </svg>
-                Create Music Journey
-            `;
-            createButton.disabled = false;
-            
-            // Show results
-            const resultElement = document.getElementById('playlist-result');
-            resultElement.classList.remove('hidden');
-            resultElement.innerHTML = '';
-            
-            // Add to history if we have a valid result
-            if (data.tracks && data.tracks.length > 0) {
-                addToHistory(prompt, data);
-            }
 
-            // Display Spotify playlist link if available
-            if (data.playlist_url) {
-                const playlistLinkElement = document.createElement('div');
-                playlistLinkElement.id = 'playlist-link';
-                playlistLinkElement.innerHTML = `
-                    <a href="${data.playlist_url}" target="_blank">
-                        <svg width="24" height="24" viewBox="0 0 24 24" fill="none" xmlns="http://www.w3.org/2000/svg">
-                            <path d="M12 2C6.48 2 2 6.48 2 12C2 17.52 6.48 22 12 22C17.52 22 22 17.52 22 12C22 6.48 17.52 2 12 2ZM16.5 16.5C16.27 16.73 15.9 16.73 15.67 16.5C14.55 15.39 13.04 14.8 11.42 14.8C9.8 14.8 8.29 15.39 7.17 16.5C6.94 16.73 6.57 16.73 6.34 16.5C6.11 16.27 6.11 15.9 6.34 15.67C7.74 14.27 9.54 13.5 11.42 13.5C13.3 13.5 15.1 14.27 16.5 15.67C16.73 15.9 16.73 16.27 16.5 16.5ZM17.79 13.21C17.56 13.44 17.19 13.44 16.96 13.21C15.54 11.79 13.55 11 11.42 11C9.29 11 7.3 11.79 5.88 13.21C5.65 13.44 5.28 13.44 5.05 13.21C4.82 12.98 4.82 12.61 5.05 12.38C6.75 10.68 9.02 9.75 11.42 9.75C13.82 9.75 16.09 10.68 17.79 12.38C18.02 12.61 18.02 12.98 17.79 13.21Z" fill="#1DB954"/>
-                        </svg>
-                        Open Playlist in Spotify
-                    </a>
-                `;
-                resultElement.appendChild(playlistLinkElement);
-            }
+            alert(`Failed to create music journey: ${error.message}`);
+        });
+    }
 
-            // Display recommended tracks as a journey
-            if (data.tracks && data.tracks.length > 0) {
-                const tracksList = document.createElement('div');
-                tracksList.className = 'playlist-tracks';
-                tracksList.innerHTML = '<h4>Your AI-Generated Music Journey:</h4>';
-
-                // Define the moods we're looking for
-                const moodNames = {
-                    'high_energy': 'High Energy',
-                    'vibey': 'Vibey & Ambient',
-                    'melancholic': 'Melancholic & Nostalgic',
-                    'sad': 'Emotional & Sad',
-                    'upbeat': 'Upbeat & Bouncy',
-                    'custom': 'Your Requested Tracks',
-                    // Add fallbacks for other possible mood values
-                    'energetic': 'Energetic',
-                    'chill': 'Chill & Relaxed',
-                    'nostalgic': 'Nostalgic',
-                    'emotional': 'Emotional',
-                    'happy': 'Happy & Upbeat'
-                };
-
-                // Group tracks by their mood property
-                const tracksByMood = {};
-
-                // First, organize tracks by mood
-                data.tracks.forEach(track => {
-                    const mood = track.mood ? track.mood.toLowerCase() : 'other';
-                    if (!tracksByMood[mood]) {
-                        tracksByMood[mood] = [];
+    const journeyStageLabels = {
+        'history': 'Reading Your Top Tracks...',
+        'generating': 'Generating Journey...'
+    };
+
+    // Define the moods we're looking for
+    const moodNames = {
+        'high_energy': 'High Energy',
+        'vibey': 'Vibey & Ambient',
+        'melancholic': 'Melancholic & Nostalgic',
+        'sad': 'Emotional & Sad',
+        'upbeat': 'Upbeat & Bouncy',
+        'custom': 'Your Requested Tracks',
+        // Add fallbacks for other possible mood values
+        'energetic': 'Energetic',
+        'chill': 'Chill & Relaxed',
+        'nostalgic': 'Nostalgic',
+        'emotional': 'Emotional',
+        'happy': 'Happy & Upbeat'
+    };
+
+    function readJourneyEvents(response, onEvent) {
+        // Parse the Server-Sent Events stream from /create-journey/stream
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        function pump() {
+            return reader.read().then(({ done, value }) => {
+                buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+                const messages = buffer.split('\n\n');
+                buffer = messages.pop();
+                messages.forEach(message => {
+                    let event = 'message';
+                    let data = '';
+                    message.split('\n').forEach(line => {
+                        if (line.startsWith('event:')) {
+                            event = line.slice(6).trim();
+                        } else if (line.startsWith('data:')) {
+                            data += line.slice(5).trim();
+                        }
+                    });
+                    if (data) {
+                        onEvent(event, JSON.parse(data));
                     }
-                    tracksByMood[mood].push(track);
                 });
+                if (!done) {
+                    return pump();
+                }
+            });
+        }
 
-                // Create a section for each mood that has tracks
-                Object.keys(tracksByMood).forEach(mood => {
-                    const moodTracks = tracksByMood[mood];
-                    if (moodTracks.length > 0) {
-                        const moodSection = document.createElement('div');
-                        moodSection.className = 'mood-section';
-                        
-                        // Get a nice display name for the mood
-                        const moodDisplayName = moodNames[mood] || mood.charAt(0).toUpperCase() + mood.slice(1);
-                        
-                        moodSection.innerHTML = `<h5>${moodDisplayName}</h5><ul>`;
-                        
-                        moodTracks.forEach(track => {
-                            const artistNames = track.artists.map(artist => artist.name).join(', ');
-                            const albumName = track.album ? track.album.name : '';
-                            
-                            moodSection.innerHTML += `
-                                <li>
-                                    <div class="track-info">${track.name} - ${artistNames}</div>
-                                    <div class="album-name">${albumName}</div>
-                                    ${track.reason ? `<div class="track-reason">${track.reason}</div>` : ''}
-                                </li>
-                            `;
-                        });
-                        
-                        moodSection.innerHTML += '</ul>';
-                        tracksList.appendChild(moodSection);
-                    }
-                });
+        return pump();
+    }
 
-                resultElement.appendChild(tracksList);
-            } else {
-                const noTracksElement = document.createElement('p');
-                noTracksElement.textContent = 'No tracks found based on your prompt. Try a different description.';
-                resultElement.appendChild(noTracksElement);
-            }
-        })
-        .catch(error => {
-            console.error('Error:', error);
-            createButton.textContent = 'Create Music Journey';
-            createButton.innerHTML = `
-                <svg width="20" height="20" viewBox="0 0 24 24" fill="none" xmlns="http://www.w3.org/2000/svg" style="margin-right: 8px; vertical-align: middle;">
-                    <path d="M12 2C6.48 2 2 6.48 2 12C2 17.52 6.48 22 12 22C17.52 22 22 17.52 22 12C22 6.48 17.52 2 12 2ZM17 13H13V17H11V13H7V11H11V7H13V11H17V13Z" fill="white"/>
-                </svg>
-                Create Music Journey
-            `;
-            createButton.disabled = false;
+    function appendJourneyTrack(tracksList, moodLists, track) {
+        // Group tracks by their mood property, adding a section the first time a mood shows up
+        const mood = track.mood ? track.mood.toLowerCase() : 'other';
+        if (!moodLists[mood]) {
+            const moodSection = document.createElement('div');
+            moodSection.className = 'mood-section';
+
+            // Get a nice display name for the mood
+            const moodDisplayName = moodNames[mood] || mood.charAt(0).toUpperCase() + mood.slice(1);
+            moodSection.innerHTML = `<h5>${moodDisplayName}</h5><ul></ul>`;
+            tracksList.appendChild(moodSection);
+            moodLists[mood] = moodSection.querySelector('ul');
+        }
 
-            // Hide loading indicator
-            document.getElementById('loading-indicator').classList.add('hidden');
+        const artistNames = track.artists.map(artist => artist.name).join(', ');
+        const albumName = track.album ? track.album.name : '';
+        const item = document.createElement('li');
+        item.innerHTML = `
+            <div class="track-info">${track.name} - ${artistNames}</div>
+            <div class="album-name">${albumName}</div>
+            ${track.reason ? `<div class="track-reason">${track.reason}</div>` : ''}
+        `;
+        moodLists[mood].appendChild(item);
+    }
 
-            alert(`Failed to create music journey: ${error.message}`);
-        });
+    function finishJourney(prompt, data) {
+        // Hide loading indicator
+        document.getElementById('loading-indicator').classList.add('hidden');
+        resetCreateButton();
+
+        const resultElement = document.getElementById('playlist-result');
+        resultElement.classList.remove('hidden');
+
+        // Add to history if we have a valid result
+        if (data.tracks.length > 0) {
+            addToHistory(prompt, data);
+        } else {
+            const noTracksElement = document.createElement('p');
+            noTracksElement.textContent = 'No tracks found based on your prompt. Try a different description.';
+            resultElement.appendChild(noTracksElement);
+        }
+    }
+
+    function resetCreateButton() {
+        const createButton = document.getElementById('create-playlist-button');
+        createButton.innerHTML = `
+            <svg width="20" height="20" viewBox="0 0 24 24" fill="none" xmlns="http://www.w3.org/2000/svg" style="margin-right: 8px; vertical-align: middle;">
+                <path d="M12 2C6.48 2 2 6.48 2 12C2 17.52 6.48 22 12 22C17.52 22 22 17.52 22 12C22 6.48 17.52 2 12 2ZM17 13H13V17H11V13H7V11H11V7H13V11H17V13Z" fill="white"/>
+            </svg>
+            Create Music Journey
+        `;
+        createButton.disabled = false;
     }
     
     function initTheme() {
@@ -334,8 +365,8 @@ document.addEventListener('DOMContentLoaded', () => {
     }
     
     function addToHistory(prompt, data) {
-        // Only store if we have access token (logged in)
-        if (!accessToken) return;
+        // Only store if we're logged in
+        if (!sessionId && !accessToken) return;
         
         const historyItem = {
             id: Date.now(),
@@ -5,16 +5,22 @@ document.addEventListener('DOMContentLoaded', () => {
         ? '' // Use relative URL for local development
         : 'https://spotify-playlist-creator-1a7x.onrender.com'; // Your actual Render URL
     let accessToken = null;
+    let sessionId = null;
 
-    // Check if we have an access token in the URL (after redirect)
+    // Check if we have a session id (or a raw access token) in the URL (after redirect)
     const hashParams = new URLSearchParams(window.location.hash.substring(1));
     accessToken = hashParams.get('access_token');
+    sessionId = hashParams.get('session_id') || localStorage.getItem('sessionId');
+    if (sessionId) {
+        // The server keeps the session's token fresh, so it survives page reloads
+        localStorage.setItem('sessionId', sessionId);
+    }
 
     // Show the app section by default for the demo
     showApp();
 
-    if (accessToken) {
-        // Remove the access token from URL for security
+    if (sessionId || accessToken) {
+        // Remove the session id / access token from URL for security
         window.history.replaceState({}, document.title, window.location.pathname);
         // Show user profile and load Spotify data if logged in
         document.getElementById('user-profile').classList.remove('hidden');
@@ -52,8 +58,14 @@ document.addEventListener('DOMContentLoaded', () => {
         // User profile is only shown when logged in
     }
 
+    function authQuery() {
+        return sessionId
+            ? `session_id=${encodeURIComponent(sessionId)}`
+            : `access_token=${accessToken}`;
+    }
+
     function loadUserProfile() {
-        fetch(`${API_BASE_URL}/user-profile?access_token=${accessToken}`)
+        fetch(`${API_BASE_URL}/user-profile?${authQuery()}`)
             .then(response => response.json())
             .then(data => {
                 document.getElementById('profile-name').textContent = data.display_name;
@@ -65,7 +77,7 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     function loadTopArtists() {
-        fetch(`${API_BASE_URL}/top-artists?access_token=${accessToken}`)
+        fetch(`${API_BASE_URL}/top-artists?${authQuery()}`)
             .then(response => response.json())
             .then(data => {
                 const artistsContainer = document.getElementById('top-artists');
@@ -93,7 +105,7 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     function loadTopTracks() {
-        fetch(`${API_BASE_URL}/top-tracks?access_token=${accessToken}`)
+        fetch(`${API_BASE_URL}/top-tracks?${authQuery()}`)
             .then(response => response.json())
             .then(data => {
                 const tracksContainer = document.getElementById('top-tracks');
@@ -142,6 +154,7 @@ document.addEventListener('DOMContentLoaded', () => {
             },
             body: JSON.stringify({
                 prompt: prompt,
+                session_id: sessionId,
                 access_token: accessToken
             })
         })
@@ -0,0 +1,139 @@
+import numpy as np
+
+from track_catalog import MOODS
+
+# Target (energy, valence) shapes, as anchor points spread evenly over the journey
+CURVES = {
+    # High energy, vibey, melancholic, sad, then an upbeat lift: the order the moods have always run in
+    "journey": ((0.85, 0.5), (0.55, 0.5), (0.4, 0.3), (0.25, 0.15), (0.7, 0.8)),
+    "build_up": ((0.3, 0.35), (0.9, 0.7)),
+    "wind_down": ((0.85, 0.6), (0.2, 0.3)),
+    "peak": ((0.35, 0.4), (0.9, 0.7), (0.35, 0.4)),
+}
+DEFAULT_CURVE = "journey"
+
+# Where each mood sits on the (energy, valence) plane, for tracks without audio features
+MOOD_POINTS = dict(zip(MOODS, CURVES["journey"]))
+NEUTRAL_POINT = (0.55, 0.5)
+
+# Improvements smaller than this are float noise, not worth another pass
+_EPSILON = 1e-9
+
+
+def mood_points(tracks):
+    """
+    (energy, valence) rows for tracks placed by their mood label
+    """
+    return np.array([MOOD_POINTS.get(track.mood, NEUTRAL_POINT) for track in tracks], dtype=np.float64).reshape(-1, 2)
+
+
+def mood_order(tracks):
+    """
+    Indices of tracks in play order for the default journey: its mood sections in MOODS
+    order (the order CURVES["journey"] runs through), keeping the tracks' order within
+    each and tracks of other moods at the end. Tracks placed by mood label share one point
+    per mood, so following the curve with sequence() couldn't order them any better, and
+    its smoothness term may move a track across a section boundary to soften a jump.
+    """
+    def rank(index):
+        mood = tracks[index].mood
+        return MOODS.index(mood) if mood in MOODS else len(MOODS)
+    return sorted(range(len(tracks)), key=rank)
+
+
+def target_curve(anchors, length):
+    """
+    The curve through anchors, sampled at length evenly spaced positions
+    """
+    anchors = np.asarray(anchors, dtype=np.float64)
+    positions = np.linspace(0.0, 1.0, length)
+    stops = np.linspace(0.0, 1.0, len(anchors))
+    return np.column_stack([np.interp(positions, stops, anchors[:, column]) for column in range(anchors.shape[1])])
+
+
+def sequence(points, curve=CURVES[DEFAULT_CURVE], length=None, smoothness=0.5, max_passes=4):
+    """
+    Pick length of the candidate points (all of them by default) and order them to follow
+    curve, returning their indices in play order.
+
+    An ordering costs the squared distance of each track from the curve at its position,
+    plus smoothness times the squared distance between neighbouring tracks. A greedy pass
+    fills positions front to back with the cheapest unused candidate, then local search
+    tries, for every position, swapping in each unused candidate and swapping with each
+    later position, keeping the best improvement, until a pass changes nothing. Each move
+    is scored from the cost terms it touches, vectorized over all candidates, so a pass is
+    O(length * candidates) arithmetic but one Python step per position. Ordering the few
+    dozen tracks of a journey takes a couple of milliseconds, picking 20 from 500 candidates
+    about 5 ms, and reordering all 500 over 100 ms. Pairwise distances are precomputed, so
+    memory grows with candidates squared. Ties keep the candidates' original order.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    count = len(points)
+    length = count if length is None else max(min(length, count), 0)
+    if length == 0:
+        return []
+
+    targets = target_curve(curve, length)
+    # fit[i, c]: cost of candidate c at position i
+    fit = ((points[None, :, :] - targets[:, None, :]) ** 2).sum(axis=2)
+
+    # gaps[a, b]: squared distance between candidates a and b. Index `count` stands for
+    # "no neighbour" at either end of the journey and is 0 away from everything.
+    none = count
+    gaps = np.zeros((count + 1, count + 1))
+    norms = (points ** 2).sum(axis=1)
+    gaps[:count, :count] = np.maximum(norms[:, None] + norms[None, :] - 2.0 * points @ points.T, 0.0)
+
+    order = np.empty(length, dtype=np.intp)
+    used = np.zeros(count, dtype=bool)
+    previous = none
+    for position in range(length):
+        cost = fit[position] + smoothness * gaps[previous, :count]
+        cost[used] = np.inf
+        previous = order[position] = int(np.argmin(cost))
+        used[previous] = True
+
+    for _ in range(max_passes):
+        improved = False
+        for i in range(length):
+            left = order[i - 1] if i > 0 else none
+            right = order[i + 1] if i < length - 1 else none
+            to_left, to_right = gaps[left, :count], gaps[right, :count]
+
+            # Swap in an unused candidate
+            current = order[i]
+            if not used.all():
+                delta = fit[i] - fit[i, current] + smoothness * (
+                    to_left + to_right - to_left[current] - to_right[current])
+                delta[used] = np.inf
+                best = int(np.argmin(delta))
+                if delta[best] < -_EPSILON:
+                    used[current] = False
+                    current = order[i] = best
+                    used[current] = True
+                    improved = True
+
+            # Swap with a later position
+            if i == length - 1:
+                continue
+            to_current = gaps[current]
+            later = np.arange(i + 1, length)
+            others = order[later]
+            others_left = order[later - 1]
+            others_right = np.append(order[i + 2:], none)
+            delta = fit[i, others] + fit[later, current] - fit[i, current] - fit[later, others] + smoothness * (
+                to_left[others] + to_right[others] + to_current[others_left] + to_current[others_right]
+                - to_left[current] - to_right[current] - gaps[others, others_left] - gaps[others, others_right])
+            # Neighbours keep the edge between them; only the outer edges change
+            neighbour, beyond = others[0], others_right[0]
+            delta[0] = fit[i, neighbour] + fit[i + 1, current] - fit[i, current] - fit[i + 1, neighbour] + smoothness * (
+                to_left[neighbour] + to_current[beyond] - to_left[current] - gaps[neighbour, beyond])
+            best = int(np.argmin(delta))
+            if delta[best] < -_EPSILON:
+                j = later[best]
+                order[i], order[j] = order[j], current
+                improved = True
+        if not improved:
+            break
+
+    return order.tolist()
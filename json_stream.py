@@ -0,0 +1,67 @@
+import json
+
+
+class JsonArrayParser:
+    """
+    Incremental parser for a JSON array of objects that arrives in pieces, e.g. a model's
+    output token by token. feed() returns each object as soon as its closing brace arrives.
+    Text before the opening '[' is ignored, and an element that isn't valid JSON is skipped
+    without losing the ones around it, so a truncated or partly malformed array still
+    yields its valid prefix.
+    """
+
+    def __init__(self):
+        self.started = False
+        self.closed = False
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.current = []
+        self.skipped = 0
+
+    def feed(self, text):
+        objects = []
+        for char in text:
+            if self.closed:
+                break
+            if not self.started:
+                self.started = char == '['
+                continue
+
+            if self.depth == 0:
+                # Between elements: only the start of the next object or the end of the array matter
+                if char == '{':
+                    self.depth = 1
+                    self.current = [char]
+                elif char == ']':
+                    self.closed = True
+                continue
+
+            self.current.append(char)
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in '{[':
+                self.depth += 1
+            elif char in '}]':
+                self.depth -= 1
+                if self.depth == 0:
+                    self._finish(objects)
+        return objects
+
+    def _finish(self, objects):
+        try:
+            value = json.loads("".join(self.current))
+        except json.JSONDecodeError:
+            value = None
+        if isinstance(value, dict):
+            objects.append(value)
+        else:
+            self.skipped += 1
+        self.current = []
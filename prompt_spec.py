@@ -0,0 +1,149 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from track_record import Track
+
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8,
+    "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13, "fourteen": 14,
+    "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18, "nineteen": 19, "twenty": 20,
+}
+MAX_TRACK_LIMIT = 50
+
+# Shorthand exclusions that don't use the "exclude: a, b" list form
+EXCLUDE_ALIASES = {
+    "kendrick": "Kendrick Lamar",
+    "kendrick lamar": "Kendrick Lamar",
+    "xxx": "XXXTENTACION",
+    "xxxtentacion": "XXXTENTACION",
+}
+
+# Words that ask for a journey shape, by the start of the word, and the curve they pick
+CURVE_WORDS = (
+    ("build", "build_up"), ("ramp", "build_up"), ("warm", "build_up"),
+    ("wind", "wind_down"), ("cool", "wind_down"), ("calm", "wind_down"),
+    ("peak", "peak"), ("climax", "peak"),
+)
+
+# Names checked against the whole prompt, since they can also sit inside an
+# "include:" list or an "add track:" request that the pattern below consumes
+_CARTI_PATTERN = re.compile(r"\bplayboi\s+carti\b")
+_WALK_PATTERN = re.compile(r"\bwalk\b")
+
+_NUMBER = r"\d+|" + "|".join(NUMBER_WORDS)
+_MOOD = r"high\s+energy|vibey|melancholic|sad|upbeat"
+
+# Every phrase the prompt can contain, as one alternation scanned in a single pass.
+# Earlier alternatives win where two could match at the same position.
+_PROMPT_PATTERN = re.compile("|".join([
+    rf"\b(?P<per_mood>{_NUMBER})\s+tracks?\s+per\s+mood\b",
+    # "my top 50 tracks" names the user's history, not a length, so it's consumed first
+    rf"\btop\s+(?P<top_count>{_NUMBER})\s+tracks?\b",
+    # "10 tracks", "exactly 12 tracks", "a 15-track journey"
+    rf"\b(?P<track_count>{_NUMBER})[-\s]tracks?\b",
+    rf"\b(?P<weight_direction>more|extra|less|fewer)\s+(?P<weight_mood>{_MOOD})\b",
+    r"\bexclude:(?P<exclude_list>[^.]*?)(?=include:|\.|$)",
+    r"\binclude:(?P<include_list>[^.]*?)(?=exclude:|\.|$)",
+    r"\bexclude\s+(?P<exclude_alias>kendrick(?:\s+lamar)?|xxx(?:tentacion)?)\b",
+    r"\badd\s+(?:track|song):(?P<custom_track>[^.]*?)(?=\badd\b|\.|$)",
+    r"\b(?P<curve>(?:build|ramp|warm)(?:s|ing)?\s+up|(?:wind|cool|calm)(?:s|ing)?\s+down|peak\w*|climax\w*)\b",
+    r"\b(?P<different_outro>different\s+outro)\b",
+    r"\b(?P<top_artists>top\s+artists)\b",
+    r"\b(?P<journey>journey\w*)",
+    r"\b(?P<intro>intro)\b",
+    r"\b(?P<finale>end\w*|finally)\b",
+    r"\b(?P<randomize>random\w*|surprise\s+me)\b",
+]))
+
+JourneySpec = namedtuple("JourneySpec", (
+    "text",             # the lowercased prompt, for checks against runtime values like artist names
+    "track_limit",      # requested journey length, or None
+    "tracks_per_mood",  # requested tracks per mood, or None
+    "mood_weights",     # ((mood, weight), ...) for moods asked for more (2) or less (0.5) of
+    "include_artists",  # artists to add to the user's top artists
+    "exclude_artists",  # artists to leave out
+    "custom_tracks",    # Tracks the user asked for by name ("add track: X by Y")
+    "mixed_journey",    # asks for a journey across the user's top artists
+    "mentions_carti",
+    "mentions_walk",
+    "intro",            # asks for WALK by Playboi Carti as the intro
+    "finale",           # asks for a particular ending ("end with", "finally")
+    "different_outro",
+    "randomize",
+    "energy_curve",     # name of the journey_sequencer curve to follow, "journey" unless asked otherwise
+))
+
+
+def _number(text):
+    return int(text) if text.isdigit() else NUMBER_WORDS[text]
+
+
+def _title_case(name):
+    return " ".join(word.capitalize() for word in name.split())
+
+
+def _names(section):
+    return [_title_case(name) for name in section.split(",") if name.strip()]
+
+
+@lru_cache(maxsize=1024)
+def parse_prompt(prompt):
+    """
+    Read everything the local journey builders care about from a prompt in one regex pass.
+    Specs are immutable and cached per prompt.
+    """
+    text = (prompt or "").lower()
+    track_limit = None
+    tracks_per_mood = None
+    weights = {}
+    includes, excludes, custom_tracks = [], [], []
+    energy_curve = "journey"
+    seen = set()
+
+    for match in _PROMPT_PATTERN.finditer(text):
+        groups = {name: value for name, value in match.groupdict().items() if value is not None}
+        if "per_mood" in groups:
+            tracks_per_mood = _number(groups["per_mood"])
+        elif "top_count" in groups:
+            pass
+        elif "track_count" in groups:
+            track_limit = min(max(_number(groups["track_count"]), 1), MAX_TRACK_LIMIT)
+        elif "weight_mood" in groups:
+            mood = "_".join(groups["weight_mood"].split())
+            weights[mood] = 2 if groups["weight_direction"] in ("more", "extra") else 0.5
+        elif "exclude_list" in groups:
+            excludes.extend(_names(groups["exclude_list"]))
+        elif "include_list" in groups:
+            includes.extend(_names(groups["include_list"]))
+        elif "exclude_alias" in groups:
+            excludes.append(EXCLUDE_ALIASES[" ".join(groups["exclude_alias"].split())])
+        elif "custom_track" in groups:
+            song, _, artist = groups["custom_track"].partition(" by ")
+            if song.strip() and artist.strip():
+                custom_tracks.append(Track(song.strip(), (_title_case(artist),), "Unknown", "custom", "User specifically requested this track"))
+        elif "curve" in groups:
+            energy_curve = next(curve for word, curve in CURVE_WORDS if groups["curve"].startswith(word))
+        else:
+            seen.update(groups)
+
+    mentions_carti = bool(_CARTI_PATTERN.search(text))
+    mentions_walk = bool(_WALK_PATTERN.search(text))
+
+    return JourneySpec(
+        text=text,
+        track_limit=track_limit,
+        tracks_per_mood=tracks_per_mood,
+        mood_weights=tuple(weights.items()),
+        include_artists=tuple(dict.fromkeys(includes)),
+        exclude_artists=tuple(dict.fromkeys(excludes)),
+        custom_tracks=tuple(custom_tracks),
+        mixed_journey={"top_artists", "journey"} <= seen,
+        mentions_carti=mentions_carti,
+        mentions_walk=mentions_walk,
+        intro=mentions_carti and mentions_walk and "intro" in seen,
+        finale="finale" in seen,
+        different_outro="different_outro" in seen,
+        randomize="randomize" in seen,
+        energy_curve=energy_curve,
+    )
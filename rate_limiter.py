@@ -0,0 +1,249 @@
+import asyncio
+import hashlib
+import random
+import threading
+import time
+
+# HTTP statuses worth retrying: rate limited, or a transient error on Spotify's side
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# A 429 means the request was turned away unprocessed, so even a POST can be sent again.
+# A 5xx may come after the change was applied, so those are only retried for GETs.
+NON_IDEMPOTENT_RETRYABLE_STATUSES = {429}
+
+
+def token_key(access_token):
+    """
+    Short stable key for a user's access token, so raw tokens are never kept in memory as dict keys
+    """
+    if not access_token:
+        return None
+    return hashlib.sha256(access_token.encode()).hexdigest()[:16]
+
+
+def parse_retry_after(value, default=1.0):
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return default
+
+
+class RateLimiter:
+    """
+    Shared rate-limit layer for Spotify calls.
+
+    - A token bucket refills at `rate` calls per second up to `burst`, and at most
+      `max_in_flight` calls run at the same time.
+    - A 429's Retry-After is remembered for the whole app and for the user token that
+      hit it; new calls wait it out instead of hammering Spotify.
+    - Rate-limited and transient 5xx responses are retried with jittered exponential backoff.
+      Callers pass retry_statuses to narrow that down for requests that aren't safe to repeat.
+
+    State is per process, so each gunicorn worker keeps its own limiter.
+    """
+
+    def __init__(self, rate=10.0, burst=20, max_in_flight=10, max_retries=3,
+                 backoff_base=0.5, backoff_cap=8.0, max_wait=10.0):
+        self.rate = rate
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        # Longest we'll hold a caller waiting for a slot or a Retry-After window
+        self.max_wait = max_wait
+
+        self.lock = threading.Lock()
+        self.tokens = float(burst)
+        self.last_refill = time.monotonic()
+        self.in_flight = 0
+        self.app_blocked_until = 0.0
+        self.user_blocked_until = {}
+        self.stats = {"calls": 0, "throttled": 0, "retries": 0, "gave_up": 0}
+
+    def _refill(self, now):
+        elapsed = now - self.last_refill
+        self.last_refill = now
+        self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+
+    def _try_acquire(self, user_key):
+        """
+        Take a slot if one is free; otherwise return how long to wait before trying again
+        """
+        with self.lock:
+            now = time.monotonic()
+            blocked_until = max(self.app_blocked_until, self.user_blocked_until.get(user_key, 0.0))
+            if blocked_until > now:
+                return blocked_until - now
+
+            self._refill(now)
+            if self.in_flight >= self.max_in_flight:
+                return 0.01
+            if self.tokens < 1:
+                return (1 - self.tokens) / self.rate
+
+            self.tokens -= 1
+            self.in_flight += 1
+            self.stats["calls"] += 1
+            return 0.0
+
+    def release(self):
+        with self.lock:
+            self.in_flight = max(self.in_flight - 1, 0)
+
+    def acquire(self, user_key=None):
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            wait = self._try_acquire(user_key)
+            if wait <= 0:
+                return
+            if time.monotonic() + wait > deadline:
+                raise RateLimitExceeded(wait)
+            time.sleep(wait)
+
+    async def acquire_async(self, user_key=None):
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            wait = self._try_acquire(user_key)
+            if wait <= 0:
+                return
+            if time.monotonic() + wait > deadline:
+                raise RateLimitExceeded(wait)
+            await asyncio.sleep(wait)
+
+    def record_retry_after(self, user_key, retry_after):
+        with self.lock:
+            self.stats["throttled"] += 1
+            until = time.monotonic() + retry_after
+            self.app_blocked_until = max(self.app_blocked_until, until)
+            if user_key:
+                self.user_blocked_until[user_key] = max(self.user_blocked_until.get(user_key, 0.0), until)
+                # Drop windows that have already passed so the dict doesn't grow forever
+                now = time.monotonic()
+                self.user_blocked_until = {key: value for key, value in self.user_blocked_until.items() if value > now}
+
+    def retry_delay(self, attempt, status_code, retry_after=None):
+        """
+        Delay before the next attempt: the server's Retry-After plus jitter for 429s,
+        otherwise exponential backoff with full jitter
+        """
+        if status_code == 429 and retry_after is not None:
+            return retry_after + random.uniform(0, self.backoff_base)
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    def _should_retry(self, attempt, response, user_key, retry_statuses=RETRYABLE_STATUSES):
+        """
+        Inspect a response and return the delay before retrying it, or None to hand it back
+        """
+        retry_after = None
+        if response.status_code == 429:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            self.record_retry_after(user_key, retry_after)
+
+        if response.status_code not in retry_statuses:
+            return None
+
+        if attempt >= self.max_retries:
+            self._give_up()
+            return None
+
+        delay = self.retry_delay(attempt, response.status_code, retry_after)
+        if delay > self.max_wait:
+            self._give_up()
+            return None
+
+        with self.lock:
+            self.stats["retries"] += 1
+        print(f"Spotify returned {response.status_code}, retrying in {delay:.2f}s (attempt {attempt + 1}/{self.max_retries})")
+        return delay
+
+    def _give_up(self):
+        with self.lock:
+            self.stats["gave_up"] += 1
+
+    def call(self, send, user_key=None, retry_statuses=RETRYABLE_STATUSES):
+        """
+        Run `send()` (which performs one HTTP request and returns the response) under the
+        limiter, retrying responses whose status is in retry_statuses
+        """
+        attempt = 0
+        while True:
+            self.acquire(user_key)
+            try:
+                response = send()
+            finally:
+                self.release()
+
+            delay = self._should_retry(attempt, response, user_key, retry_statuses)
+            if delay is None:
+                return response
+            time.sleep(delay)
+            attempt += 1
+
+    async def call_async(self, send, user_key=None, retry_statuses=RETRYABLE_STATUSES):
+        """
+        Async version of call(); `send` is a coroutine function
+        """
+        attempt = 0
+        while True:
+            await self.acquire_async(user_key)
+            try:
+                response = await send()
+            finally:
+                self.release()
+
+            delay = self._should_retry(attempt, response, user_key, retry_statuses)
+            if delay is None:
+                return response
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def get_stats(self):
+        with self.lock:
+            now = time.monotonic()
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "max_in_flight": self.max_in_flight,
+                "in_flight": self.in_flight,
+                "app_blocked_for": round(max(self.app_blocked_until - now, 0.0), 2),
+                "blocked_users": sum(1 for value in self.user_blocked_until.values() if value > now),
+                **self.stats
+            }
+
+
+class RateLimitExceeded(Exception):
+    """
+    Raised when a call would have to wait longer than the limiter's max_wait
+    """
+
+    def __init__(self, retry_after):
+        super().__init__(f"Spotify rate limit reached, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class ThrottledResponse:
+    """
+    Stand-in for a Spotify 429 response when the limiter refuses to wait any longer.
+    The body has the same shape as Spotify's own error responses.
+    """
+
+    status_code = 429
+
+    def __init__(self, retry_after):
+        self.retry_after = retry_after
+        self.headers = {"Retry-After": str(int(retry_after + 0.999))}
+
+    def json(self):
+        return {"error": {"status": 429, "message": f"API rate limit exceeded, retry in {self.retry_after:.1f}s"}}
+
+
+def retry_statuses_for(method):
+    return RETRYABLE_STATUSES if method == "GET" else NON_IDEMPOTENT_RETRYABLE_STATUSES
+
+
+def bearer_token(headers):
+    authorization = (headers or {}).get("Authorization", "")
+    if authorization.startswith("Bearer "):
+        return authorization[len("Bearer "):]
+    return None
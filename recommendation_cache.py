@@ -0,0 +1,144 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from sqlite_store import SQLiteStore
+
+
+class RecommendationCache:
+    """
+    Bounded LRU cache of AI recommendations with a TTL.
+
+    Keys combine the normalized prompt with a digest of the taste summary (top artists and
+    tracks) sent to the model, so the same prompt from users with the same top 5 reuses one
+    generation. Without a path entries live in this process only; with a path they are kept
+    in a SQLite file shared by every worker that points at it.
+
+    Values are stored as JSON, so every hit returns a fresh copy the caller may modify.
+    """
+
+    def __init__(self, path=None, ttl=3600, max_entries=1000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evicted": 0}
+        self.store = None
+        if path:
+            self.store = SQLiteStore(path, (
+                "CREATE TABLE IF NOT EXISTS recommendation_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " last_used REAL NOT NULL,"
+                " expires_at REAL NOT NULL)",
+                "CREATE INDEX IF NOT EXISTS recommendation_cache_last_used ON recommendation_cache (last_used)",
+            ), evict_every=50)
+            self.store.connect()
+
+    @staticmethod
+    def make_key(prompt, *taste):
+        normalized_prompt = " ".join((prompt or "").lower().split())
+        taste_digest = hashlib.sha256("\x1f".join(taste).encode()).hexdigest()
+        return f"{normalized_prompt}\x1f{taste_digest}"
+
+    def _count(self, stat, amount=1):
+        with self.lock:
+            self.stats[stat] += amount
+
+    def get(self, key):
+        """
+        Return (found, value)
+        """
+        now = time.time()
+        if not self.path:
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry is None or entry[0] < now:
+                    if entry is not None:
+                        del self.entries[key]
+                    self.stats["misses"] += 1
+                    return False, None
+                self.entries.move_to_end(key)
+                self.stats["hits"] += 1
+                encoded = entry[1]
+            return True, json.loads(encoded)
+
+        try:
+            conn = self.store.connect()
+            row = conn.execute(
+                "SELECT value, expires_at FROM recommendation_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[1] >= now:
+                conn.execute("UPDATE recommendation_cache SET last_used = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            print(f"Recommendation cache read failed: {str(e)}")
+            return False, None
+
+        if row is None or row[1] < now:
+            self._count("misses")
+            return False, None
+        self._count("hits")
+        return True, json.loads(row[0])
+
+    def set(self, key, value):
+        now = time.time()
+        encoded = json.dumps(value)
+        if not self.path:
+            with self.lock:
+                self.entries[key] = (now + self.ttl, encoded)
+                self.entries.move_to_end(key)
+                self.stats["writes"] += 1
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+                    self.stats["evicted"] += 1
+            return
+
+        try:
+            self.store.connect().execute(
+                "INSERT OR REPLACE INTO recommendation_cache (key, value, last_used, expires_at) VALUES (?, ?, ?, ?)",
+                (key, encoded, now, now + self.ttl)
+            )
+        except sqlite3.Error as e:
+            print(f"Recommendation cache write failed: {str(e)}")
+            return
+
+        self._count("writes")
+        if self.store.writes_due_eviction():
+            self.evict()
+
+    def evict(self):
+        """
+        Drop expired entries from the shared cache, then the least recently used beyond max_entries
+        """
+        try:
+            conn = self.store.connect()
+            removed = conn.execute("DELETE FROM recommendation_cache WHERE expires_at < ?", (time.time(),)).rowcount
+            overflow = conn.execute("SELECT COUNT(*) FROM recommendation_cache").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                removed += conn.execute(
+                    "DELETE FROM recommendation_cache WHERE key IN"
+                    " (SELECT key FROM recommendation_cache ORDER BY last_used LIMIT ?)",
+                    (overflow,)
+                ).rowcount
+        except sqlite3.Error as e:
+            print(f"Recommendation cache eviction failed: {str(e)}")
+            return
+        self._count("evicted", removed)
+
+    def get_stats(self):
+        with self.lock:
+            stats = {
+                "mode": "shared" if self.path else "memory",
+                "ttl": self.ttl,
+                "max_entries": self.max_entries,
+                **self.stats
+            }
+            if not self.path:
+                stats["entries"] = len(self.entries)
+            else:
+                stats["path"] = self.path
+            return stats
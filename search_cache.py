@@ -0,0 +1,102 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from sqlite_store import SQLiteStore
+
+DEFAULT_CACHE_PATH = os.path.join(tempfile.gettempdir(), "spotify_search_cache.sqlite3")
+
+# Marker stored for searches that found no confident match
+_NO_MATCH = "null"
+
+
+class SearchCache:
+    """
+    SQLite-backed cache of track search results, shared by every worker process that
+    points at the same file. Entries expire after `ttl` seconds (`negative_ttl` for
+    searches that found nothing), and the oldest entries are evicted once the cache
+    holds more than `max_entries`.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=7 * 24 * 3600, negative_ttl=6 * 3600, max_entries=50000):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.store = SQLiteStore(path, (
+            "CREATE TABLE IF NOT EXISTS search_cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " expires_at REAL NOT NULL)",
+            "CREATE INDEX IF NOT EXISTS search_cache_created ON search_cache (created_at)",
+        ))
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evicted": 0}
+        self.store.connect()
+
+    def _count(self, stat):
+        with self.lock:
+            self.stats[stat] += 1
+
+    def get(self, key):
+        """
+        Return (found, value). value is None for a cached "no match".
+        """
+        try:
+            row = self.store.connect().execute(
+                "SELECT value, expires_at FROM search_cache WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Search cache read failed: {str(e)}")
+            return False, None
+
+        if row is None or row[1] < time.time():
+            self._count("misses")
+            return False, None
+        self._count("hits")
+        return True, json.loads(row[0])
+
+    def set(self, key, value):
+        now = time.time()
+        ttl = self.ttl if value is not None else self.negative_ttl
+        encoded = json.dumps(value) if value is not None else _NO_MATCH
+        try:
+            self.store.connect().execute(
+                "INSERT OR REPLACE INTO search_cache (key, value, created_at, expires_at) VALUES (?, ?, ?, ?)",
+                (key, encoded, now, now + ttl)
+            )
+        except sqlite3.Error as e:
+            print(f"Search cache write failed: {str(e)}")
+            return
+
+        self._count("writes")
+        if self.store.writes_due_eviction():
+            self.evict()
+
+    def evict(self):
+        """
+        Drop expired entries, then the oldest entries beyond max_entries
+        """
+        try:
+            conn = self.store.connect()
+            removed = conn.execute("DELETE FROM search_cache WHERE expires_at < ?", (time.time(),)).rowcount
+            overflow = conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                removed += conn.execute(
+                    "DELETE FROM search_cache WHERE key IN"
+                    " (SELECT key FROM search_cache ORDER BY created_at LIMIT ?)",
+                    (overflow,)
+                ).rowcount
+        except sqlite3.Error as e:
+            print(f"Search cache eviction failed: {str(e)}")
+            return
+        with self.lock:
+            self.stats["evicted"] += removed
+
+    def get_stats(self):
+        with self.lock:
+            return {"path": self.path, "ttl": self.ttl, "max_entries": self.max_entries, **self.stats}
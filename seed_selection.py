@@ -0,0 +1,152 @@
+import numpy as np
+
+from audio_features import FEATURE_COLUMNS, normalized
+
+# Spotify's /recommendations takes at most 5 seeds in total
+SEED_LIMIT = 5
+
+# How much relevance counts against diversity: 1 takes the top items in order, 0 only spreads them out.
+# At 0.5 a candidate by an artist already picked scores at most 0, so it only beats candidates
+# that resemble the picks more than they're relevant.
+RELEVANCE_WEIGHT = 0.5
+
+# Squared distance between normalized audio features at which two tracks are about 37% similar
+FEATURE_BANDWIDTH = 0.1
+
+
+def relevance(ranked_lists):
+    """
+    {id: score} over ranked lists of Spotify items (one per time range): the sum of
+    1 / sqrt(rank + 1) over the lists an item appears in, so items near the top of several
+    time ranges score highest. The square root keeps the top item from outscoring the rest
+    of the list so far that no diversity penalty can outweigh it.
+    """
+    scores = {}
+    for items in ranked_lists:
+        for rank, item in enumerate(items):
+            if item.get('id'):
+                scores[item['id']] = scores.get(item['id'], 0.0) + 1.0 / np.sqrt(rank + 1)
+    return scores
+
+
+def _first_seen(ranked_lists):
+    items = {}
+    for ranked in ranked_lists:
+        for item in ranked:
+            if item.get('id'):
+                items.setdefault(item['id'], item)
+    return list(items.values())
+
+
+def _multi_hot(rows):
+    columns = {}
+    for row in rows:
+        for value in row:
+            columns.setdefault(value, len(columns))
+    matrix = np.zeros((len(rows), len(columns)), dtype=np.float32)
+    for index, row in enumerate(rows):
+        matrix[index, [columns[value] for value in row]] = 1.0
+    return matrix
+
+
+def similarity_matrix(artist_sets, genre_sets, features):
+    """
+    Pairwise similarity of candidates in [0, 1]: the mean of how much their artists overlap
+    (Jaccard), how alike their genres are (cosine) and how close their audio features are
+    (Gaussian of the normalized distance, 0 where features are missing). Candidates that
+    share an artist, such as an artist and one of their tracks, are fully similar.
+    """
+    artists = _multi_hot(artist_sets)
+    shared = artists @ artists.T
+    sizes = artists.sum(axis=1)
+    overlap = shared / np.maximum(sizes[:, None] + sizes[None, :] - shared, 1.0)
+
+    genres = _multi_hot(genre_sets)
+    genres /= np.maximum(np.linalg.norm(genres, axis=1, keepdims=True), 1e-9)
+    genre_similarity = genres @ genres.T
+
+    scaled = normalized(features)
+    known = ~np.isnan(scaled).any(axis=1)
+    scaled = np.nan_to_num(scaled)
+    norms = (scaled ** 2).sum(axis=1)
+    distances = np.maximum(norms[:, None] + norms[None, :] - 2.0 * scaled @ scaled.T, 0.0)
+    feature_similarity = np.exp(-distances / FEATURE_BANDWIDTH) * (known[:, None] & known[None, :])
+
+    similarity = (overlap + genre_similarity + feature_similarity) / 3.0
+    similarity[shared > 0] = 1.0
+    np.fill_diagonal(similarity, 1.0)
+    return similarity
+
+
+def maximal_marginal_relevance(scores, similarity, count, relevance_weight=RELEVANCE_WEIGHT):
+    """
+    Indices of count candidates picked one at a time, each maximizing
+    relevance_weight * score - (1 - relevance_weight) * (similarity to the closest pick so far)
+    """
+    closest = np.zeros(len(scores))
+    available = np.ones(len(scores), dtype=bool)
+    picks = []
+    for _ in range(min(count, len(scores))):
+        marginal = relevance_weight * scores - (1.0 - relevance_weight) * closest
+        marginal[~available] = -np.inf
+        pick = int(np.argmax(marginal))
+        picks.append(pick)
+        available[pick] = False
+        closest = np.maximum(closest, similarity[pick])
+    return picks
+
+
+def select_seeds(artist_lists, track_lists, track_features, count=SEED_LIMIT, relevance_weight=RELEVANCE_WEIGHT):
+    """
+    Pick up to count seeds for /recommendations from a user's top artists and tracks, given
+    as one ranked list per time range, with track_features as returned by
+    SpotifyClient.get_audio_features. Artists and tracks compete for the same seed budget,
+    ranked by relevance across the time ranges and penalized for resembling seeds already
+    picked (maximal marginal relevance). Returns (artist IDs, track IDs).
+    """
+    artists = _first_seen(artist_lists)
+    tracks = _first_seen(track_lists)
+    if not artists and not tracks:
+        return [], []
+
+    scores = relevance(artist_lists)
+    scores.update(relevance(track_lists))
+    genres_by_artist = {artist['id']: artist.get('genres') or [] for artist in artists}
+
+    def track_artists(track):
+        return [artist['id'] for artist in track.get('artists', []) if artist.get('id')]
+
+    def track_row(track):
+        values = track_features.get(track['id'])
+        return values if values is not None else (np.nan,) * len(FEATURE_COLUMNS)
+
+    track_rows = np.array([track_row(track) for track in tracks], dtype=np.float32).reshape(-1, len(FEATURE_COLUMNS))
+
+    # An artist is described by their own genres and the mean features of their top tracks here
+    artist_columns = {artist['id']: index for index, artist in enumerate(artists)}
+    credits = np.zeros((len(artists), len(tracks)), dtype=np.float32)
+    for index, track in enumerate(tracks):
+        for artist_id in track_artists(track):
+            if artist_id in artist_columns:
+                credits[artist_columns[artist_id], index] = 1.0
+    credits *= ~np.isnan(track_rows).any(axis=1)
+    counts = credits.sum(axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        artist_rows = np.where(counts > 0, (credits @ np.nan_to_num(track_rows)) / counts, np.nan)
+
+    candidates = artists + tracks
+    artist_sets = [[artist['id']] for artist in artists] + [track_artists(track) for track in tracks]
+    genre_sets = [genres_by_artist[artist['id']] for artist in artists] + [
+        sorted({genre for artist_id in track_artists(track) for genre in genres_by_artist.get(artist_id, [])})
+        for track in tracks
+    ]
+    features = np.vstack([artist_rows, track_rows])
+
+    relevance_scores = np.array([scores[candidate['id']] for candidate in candidates])
+    relevance_scores /= relevance_scores.max()
+    picks = maximal_marginal_relevance(
+        relevance_scores, similarity_matrix(artist_sets, genre_sets, features), count, relevance_weight)
+
+    seed_artists = [candidates[pick]['id'] for pick in picks if pick < len(artists)]
+    seed_tracks = [candidates[pick]['id'] for pick in picks if pick >= len(artists)]
+    return seed_artists, seed_tracks
@@ -0,0 +1,136 @@
+import asyncio
+import threading
+
+
+def request_key(method, url, params=None, headers=None):
+    """
+    Key for an HTTP request: identical method, URL, query and credentials
+    """
+    authorization = (headers or {}).get("Authorization", "")
+    if isinstance(params, dict):
+        params = tuple(sorted((name, str(value)) for name, value in params.items()))
+    return (method, url, params, authorization)
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent calls: while a call for a key is in flight, other callers
+    with the same key wait for it and get its result (or its exception) instead of making
+    their own upstream request. Nothing is cached once the call completes. A caller that has
+    waited wait_timeout seconds for someone else's call stops waiting and makes its own.
+    """
+
+    def __init__(self, wait_timeout=60):
+        self.wait_timeout = wait_timeout
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.async_calls = {}
+        self.stats = {"calls": 0, "shared": 0, "wait_timeouts": 0}
+
+    def do(self, key, fn):
+        with self.lock:
+            call = self.calls.get(key)
+            if call is not None:
+                self.stats["shared"] += 1
+                leader = False
+            else:
+                call = self.calls[key] = _Call()
+                self.stats["calls"] += 1
+                leader = True
+
+        if not leader:
+            if not call.done.wait(self.wait_timeout):
+                with self.lock:
+                    self.stats["wait_timeouts"] += 1
+                return fn()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+        return call.result
+
+    async def do_async(self, key, fn):
+        """
+        Async version of do(); fn is a coroutine function. Calls are coalesced per event loop.
+        The shared call runs in its own task, so it carries on for the other callers when the
+        one that started it is cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        calls = self.async_calls.setdefault(loop, {})
+        task = calls.get(key)
+        if task is None:
+            with self.lock:
+                self.stats["calls"] += 1
+            task = calls[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda done: self._finish_async(loop, key, done))
+            # shield() so the caller being cancelled doesn't cancel the call for everyone
+            return await asyncio.shield(task)
+
+        with self.lock:
+            self.stats["shared"] += 1
+        # wait() leaves the task running if this caller times out or is cancelled
+        done, _ = await asyncio.wait({task}, timeout=self.wait_timeout)
+        if not done:
+            with self.lock:
+                self.stats["wait_timeouts"] += 1
+            return await fn()
+        return task.result()
+
+    def _finish_async(self, loop, key, task):
+        calls = self.async_calls[loop]
+        del calls[key]
+        if not calls:
+            del self.async_calls[loop]
+        if not task.cancelled():
+            # Mark the exception retrieved in case every caller was cancelled
+            task.exception()
+
+    def get_stats(self):
+        with self.lock:
+            return {"in_flight": len(self.calls), **self.stats}
+
+
+class SharedStops:
+    """
+    One stop event per key for a call shared by several waiters (see SingleFlight): each
+    waiter join()s before waiting and leave()s once it has its result or has given up, and
+    the event is only set when the last one leaves, so a call is never stopped while
+    someone still wants its result.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # key -> [waiters, stop event]
+        self.waiters = {}
+
+    def join(self, key):
+        with self.lock:
+            entry = self.waiters.setdefault(key, [0, threading.Event()])
+            entry[0] += 1
+            return entry[1]
+
+    def leave(self, key):
+        with self.lock:
+            entry = self.waiters[key]
+            entry[0] -= 1
+            if entry[0] == 0:
+                del self.waiters[key]
+                entry[1].set()
@@ -0,0 +1,125 @@
+# Spotify accepts at most 100 URIs per add-tracks request
+PLAYLIST_ADD_LIMIT = 100
+
+# Top items are available for three time ranges, at most 50 per page
+TOP_TIME_RANGES = ("short_term", "medium_term", "long_term")
+TOP_ITEMS_PAGE_SIZE = 50
+
+
+def top_items_count(limit):
+    """
+    How many items to slice from a full page of top items, or None if Spotify should
+    be asked for the limit as given (and report it if it's bad)
+    """
+    try:
+        count = int(limit)
+    except (TypeError, ValueError):
+        return None
+    return count if 0 < count <= TOP_ITEMS_PAGE_SIZE else None
+
+
+def slice_top_items(page, count):
+    if 'error' in page:
+        return page
+    return dict(page, items=page.get('items', [])[:count], limit=count)
+
+
+class TopItemPages:
+    """
+    Paging state for a user's top items across several time ranges, shared by the sync
+    and async clients, which only differ in how they fetch a page. first() is the first
+    (url, params) to fetch; take(page) returns the page's items not seen in an earlier
+    time range, capped at max_items, and the next (url, params) to fetch or None.
+    """
+
+    def __init__(self, endpoint, time_ranges, max_items, page_size):
+        self.endpoint = endpoint
+        self.max_items = max_items
+        self.pending = [(endpoint, {"time_range": time_range, "limit": page_size}) for time_range in time_ranges]
+        self.seen = set()
+        self.taken = 0
+
+    def first(self):
+        return self.pending.pop(0) if self.pending else None
+
+    def take(self, page):
+        if 'error' in page:
+            print(f"Error fetching page from {self.endpoint}: {page['error']}")
+            return [], None
+
+        items = []
+        for item in page.get('items', []):
+            if item.get('id') not in self.seen:
+                self.seen.add(item.get('id'))
+                items.append(item)
+        if self.max_items is not None:
+            items = items[:self.max_items - self.taken]
+        self.taken += len(items)
+
+        if self.max_items is not None and self.taken >= self.max_items:
+            return items, None
+        # Follow this time range's cursor first, then move on to the next time range
+        if page.get('next'):
+            return items, (page['next'], None)
+        return items, self.first()
+
+
+def add_tracks_steps(playlist_id, track_uris, position, chunk_size, max_chunk_retries):
+    """
+    The chunked playlist add behind both clients' add_tracks_to_playlist, as a generator
+    of the calls to make. The client makes each call and sends back its answer:
+      ("state",)               -> the playlist's snapshot_id and tracks.total, or {"error": ...}
+      ("add", chunk, position) -> (status code or None, response JSON or {"error": ...},
+                                   whether the call raised)
+      ("wait", attempt, status code) -> None, once the retry delay has passed
+    The generator returns the result of the whole add.
+    """
+    if not track_uris:
+        return {"snapshot_id": None, "snapshot_ids": [], "added": 0}
+
+    if position is None:
+        state = yield ("state",)
+        if 'error' in state:
+            return {"error": state['error'], "snapshot_id": None, "snapshot_ids": [], "added": 0}
+        position = state.get('tracks', {}).get('total', 0)
+
+    snapshot_ids = []
+    for offset in range(0, len(track_uris), chunk_size):
+        chunk = track_uris[offset:offset + chunk_size]
+        result = yield from _add_chunk_steps(chunk, position + offset, max_chunk_retries)
+        if 'error' in result:
+            print(f"Adding tracks {offset}-{offset + len(chunk)} to playlist {playlist_id} failed: {result['error']}")
+            return {
+                "error": result['error'],
+                "snapshot_id": snapshot_ids[-1] if snapshot_ids else None,
+                "snapshot_ids": snapshot_ids,
+                "added": offset
+            }
+        snapshot_ids.append(result.get('snapshot_id'))
+
+    return {"snapshot_id": snapshot_ids[-1], "snapshot_ids": snapshot_ids, "added": len(track_uris)}
+
+
+def _add_chunk_steps(chunk, position, max_retries):
+    result = None
+    for attempt in range(max_retries + 1):
+        if attempt:
+            # A failed attempt may still have been applied (a 502/504 from a proxy, a dropped
+            # connection), so look at the playlist length before sending the chunk again
+            state = yield ("state",)
+            if 'error' in state:
+                print(f"Not retrying playlist chunk at position {position}, couldn't check the playlist: {state['error']}")
+                return result
+            if state.get('tracks', {}).get('total', 0) >= position + len(chunk):
+                return {"snapshot_id": state.get('snapshot_id')}
+            print(f"Retrying playlist chunk at position {position} (attempt {attempt}/{max_retries})")
+
+        status_code, result, raised = yield ("add", chunk, position)
+        if 'error' not in result:
+            return result
+        # Client errors (bad URI, no permission) won't get better on a retry
+        if not raised and status_code < 500 and status_code != 429:
+            return result
+        if attempt < max_retries:
+            yield ("wait", attempt, status_code)
+    return result
@@ -0,0 +1,78 @@
+import os
+import sqlite3
+import threading
+
+# (path, schema) pairs whose schema this process has already created
+_ready = set()
+_ready_lock = threading.Lock()
+
+
+class SQLiteStore:
+    """
+    Per-thread connections to a SQLite file shared by every worker process on the machine.
+
+    sqlite3 connections can't be shared between threads, so each thread opens its own, in
+    autocommit mode. WAL lets readers carry on while another process writes. The schema
+    (CREATE TABLE/INDEX IF NOT EXISTS statements) and the WAL switch, which is stored in
+    the file, run once per process rather than on every new connection. Call
+    writes_due_eviction() after each write to find out when to run the caller's eviction.
+    With private=True the file is only readable by the user the app runs as.
+    """
+
+    def __init__(self, path, schema, synchronous="NORMAL", evict_every=100, private=False):
+        self.path = path
+        self.schema = tuple(schema)
+        # None keeps SQLite's default (FULL)
+        self.synchronous = synchronous
+        self.evict_every = evict_every
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.writes_since_evict = 0
+        if private:
+            make_private(path)
+
+    def connect(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            if self.synchronous:
+                # Per connection, unlike journal_mode
+                conn.execute(f"PRAGMA synchronous={self.synchronous}")
+            self._create_schema(conn)
+            self.local.conn = conn
+        return conn
+
+    def _create_schema(self, conn):
+        key = (self.path, self.schema)
+        with _ready_lock:
+            if key in _ready:
+                return
+            conn.execute("PRAGMA journal_mode=WAL")
+            for statement in self.schema:
+                conn.execute(statement)
+            _ready.add(key)
+
+    def writes_due_eviction(self):
+        """
+        Count a write; True once every evict_every writes. Checking the size on every
+        write would add a COUNT(*) to each insert.
+        """
+        with self.lock:
+            self.writes_since_evict += 1
+            if self.writes_since_evict < self.evict_every:
+                return False
+            self.writes_since_evict = 0
+            return True
+
+
+def make_private(path):
+    """
+    Create the database file (and its directory) readable by this user only, or tighten
+    an existing one. SQLite gives the -wal and -shm files it creates the same mode.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    os.close(os.open(path, os.O_RDWR | os.O_CREAT, 0o600))
+    for name in (path, path + "-wal", path + "-shm"):
+        if os.path.exists(name):
+            os.chmod(name, 0o600)
@@ -0,0 +1,208 @@
+import itertools
+import json
+import threading
+import time
+
+import pytest
+import requests
+
+import ai_recommender
+from ai_recommender import create_mixed_artist_journey
+from circuit_breaker import CLOSED, OPEN, CircuitBreaker
+from recommendation_cache import RecommendationCache
+from track_catalog import MOODS
+
+TOP_ARTISTS = [{"name": name} for name in ("Playboi Carti", "Travis Scott", "Future", "Drake", "The Weeknd")]
+
+CUSTOM_PROMPT = (
+    "Make a journey from my top artists with exactly 12 tracks. "
+    "add track: Song A by Artist One add track: Song B by Artist Two add track: Song C by Artist Three."
+)
+
+
+def test_custom_tracks_count_once_against_the_length():
+    journey = create_mixed_artist_journey(CUSTOM_PROMPT, TOP_ARTISTS, [], seed=1)
+    assert len(journey) == 12
+    assert [track.name.lower() for track in journey[:3]] == ["song a", "song b", "song c"]
+
+
+def test_same_seed_same_journey():
+    first = create_mixed_artist_journey(CUSTOM_PROMPT, TOP_ARTISTS, [], seed=7)
+    second = create_mixed_artist_journey(CUSTOM_PROMPT, TOP_ARTISTS, [], seed=7)
+    assert first == second
+
+
+def test_default_journey_keeps_the_mood_order():
+    top_artists = TOP_ARTISTS + [{"name": "Kendrick Lamar"}, {"name": "SZA"}]
+    for seed in range(10):
+        journey = create_mixed_artist_journey("a journey through my top artists, more sad", top_artists, [], seed=seed)
+        ranks = [MOODS.index(track.mood) for track in journey]
+        assert ranks == sorted(ranks)
+        assert ranks[0] == 0 and ranks[-1] == len(MOODS) - 1
+
+
+class FakeStream:
+    def __init__(self, lines, status_code=200, error=None):
+        self.lines = lines
+        self.status_code = status_code
+        self.error = error
+        self.headers = {}
+        self.text = ""
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.closed = True
+
+    def iter_lines(self, decode_unicode=False):
+        yield from self.lines
+        if self.error:
+            raise self.error
+
+
+def token(text):
+    return "data:" + json.dumps({"token": {"text": text, "special": False}})
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    breaker = CircuitBreaker("test", failure_rate=0.5, min_calls=1)
+    monkeypatch.setattr(ai_recommender, "inference_breaker", breaker)
+    return breaker
+
+
+def stream_with(monkeypatch, response):
+    monkeypatch.setattr(ai_recommender.requests, "post", lambda *args, **kwargs: response)
+    return ai_recommender.stream_model("prompt", timeout=1)
+
+
+def test_stream_success_is_recorded_after_the_end(monkeypatch, breaker):
+    stream = stream_with(monkeypatch, FakeStream([token("["), token("]")]))
+    assert next(stream) == "["
+    assert breaker.get_state()["recent_calls"] == 0
+    assert list(stream) == ["]"]
+    assert breaker.get_state()["recent_calls"] == 1
+    assert breaker.state == CLOSED
+
+
+def test_mid_stream_error_event_is_a_failure(monkeypatch, breaker):
+    response = FakeStream([token("[{"), "data:" + json.dumps({"error": "overloaded"})])
+    assert list(stream_with(monkeypatch, response)) == ["[{"]
+    assert breaker.state == OPEN
+
+
+def test_mid_stream_timeout_is_a_failure(monkeypatch, breaker):
+    response = FakeStream([token("[{")], error=requests.exceptions.ReadTimeout("stalled"))
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        list(stream_with(monkeypatch, response))
+    assert breaker.state == OPEN
+    assert response.closed
+
+
+def test_reader_stopping_early_is_a_success(monkeypatch, breaker):
+    stream = stream_with(monkeypatch, FakeStream([":keep-alive", token("["), token("{")]))
+    assert next(stream) == "["
+    stream.close()
+    assert breaker.get_state()["recent_calls"] == 1
+    assert breaker.state == CLOSED
+
+
+def test_cached_journeys_are_served_while_the_model_is_unavailable(monkeypatch, breaker):
+    cache = RecommendationCache()
+    monkeypatch.setattr(ai_recommender, "recommendation_cache", cache)
+    monkeypatch.setattr(ai_recommender, "HUGGINGFACE_API_KEY", "")
+    top_artists = [{"name": "Frank Ocean"}]
+    taste = ai_recommender.taste_summary(top_artists, None)
+    cache.set(cache.make_key("late night drive", *taste), [{"name": "Nights", "artists": [{"name": "Frank Ocean"}]}])
+
+    journey = ai_recommender.generate_journey("late night drive", top_artists, seed=1)
+    assert journey["source"] == "ai"
+    assert [track["name"] for track in journey["tracks"]] == ["Nights"]
+
+    journey = ai_recommender.generate_journey("something else", top_artists, seed=1)
+    assert journey["fallback_reason"] == "no_api_key"
+
+    monkeypatch.setattr(ai_recommender, "HUGGINGFACE_API_KEY", "key")
+    breaker.record_failure(retry_after=60)
+    events = list(ai_recommender.stream_journey("late night drive", top_artists, seed=1))
+    assert events[-1]["source"] == "ai"
+    assert [track["name"] for track in events[0]["tracks"]] == ["Nights"]
+
+
+class EndlessModel:
+    """A model that keeps generating tracks until it's closed, or told to finish its answer"""
+
+    def __init__(self):
+        self.closed = threading.Event()
+        self.finish = threading.Event()
+
+    def stream_model(self, full_prompt, timeout):
+        try:
+            yield "["
+            for number in itertools.count():
+                if self.finish.is_set():
+                    yield "]"
+                    return
+                yield json.dumps({"title": f"Song {number}", "artist": "Artist"}) + ","
+                time.sleep(0.01)
+        finally:
+            self.closed.set()
+
+
+@pytest.fixture
+def endless_model(monkeypatch, breaker):
+    model = EndlessModel()
+    monkeypatch.setattr(ai_recommender, "stream_model", model.stream_model)
+    monkeypatch.setattr(ai_recommender, "recommendation_cache", RecommendationCache())
+    monkeypatch.setattr(ai_recommender, "HUGGINGFACE_API_KEY", "key")
+    return model
+
+
+def test_generation_stops_when_the_client_disconnects(endless_model):
+    events = ai_recommender.stream_journey("late night drive", budget=5, seed=1)
+    assert next(events)["tracks"][0]["name"] == "Song 0"
+    events.close()
+    assert endless_model.closed.wait(2)
+
+
+def test_generation_stops_at_the_deadline(endless_model):
+    journey = ai_recommender.generate_journey("late night drive", budget=0.05, seed=1)
+    assert journey["fallback_reason"] == "deadline"
+    assert endless_model.closed.wait(2)
+
+
+def test_shared_generation_runs_on_while_another_request_waits(endless_model):
+    journeys = {}
+
+    def request(name, budget):
+        journeys[name] = ai_recommender.generate_journey("late night drive", budget=budget, seed=1)
+
+    first = threading.Thread(target=request, args=("first", 0.1))
+    first.start()
+    time.sleep(0.03)
+    second = threading.Thread(target=request, args=("second", 5))
+    second.start()
+
+    first.join()
+    assert journeys["first"]["fallback_reason"] == "deadline"
+    # The second request still wants the answer, so the model keeps going
+    assert not endless_model.closed.wait(0.1)
+
+    endless_model.finish.set()
+    second.join()
+    assert journeys["second"]["source"] == "ai"
+    assert len(journeys["second"]["tracks"]) > 10
+    assert endless_model.closed.is_set()
+    assert ai_recommender.inference_stops.waiters == {}
+
+
+def test_stopped_generation_is_not_served_as_ai(endless_model, monkeypatch):
+    stop = threading.Event()
+    monkeypatch.setattr(ai_recommender.inference_stops, "join", lambda key: stop)
+    monkeypatch.setattr(ai_recommender.inference_stops, "leave", lambda key: None)
+    threading.Timer(0.05, stop.set).start()
+    taste = ai_recommender.taste_summary(None, None)
+    assert ai_recommender._generate_ai_tracks("late night drive", taste, 5) is None
+    assert endless_model.closed.is_set()
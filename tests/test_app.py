@@ -0,0 +1,64 @@
+import numpy as np
+
+import app
+from track_index import TrackIndex
+
+
+def feature_rows(count, value):
+    return np.tile(np.array([value, value, value * 200.0, value], dtype=np.float32), (count, 1))
+
+
+def test_local_recommendations_never_index_top_tracks(monkeypatch):
+    index = TrackIndex(max_tracks=100)
+    monkeypatch.setattr(app, "track_index", index)
+    monkeypatch.setattr(app, "TRACK_INDEX_MIN_TRACKS", 0)
+    monkeypatch.setattr(app.spotify_client, "get_audio_feature_matrix",
+                        lambda access_token, track_ids: feature_rows(len(track_ids), 0.5))
+
+    top_tracks = [{"id": f"top{i}"} for i in range(5)]
+    assert app.local_recommendations("token", top_tracks, limit=3) is None
+    assert index.get_stats()["tracks"] == 0
+
+
+def test_local_recommendations_need_enough_close_tracks(monkeypatch):
+    index = TrackIndex(max_tracks=100)
+    recommended = [{"id": f"rec{i}"} for i in range(10)]
+    index.add(recommended[:5], feature_rows(5, 0.5))
+    index.add(recommended[5:], feature_rows(5, 0.9))
+    monkeypatch.setattr(app, "track_index", index)
+    monkeypatch.setattr(app, "TRACK_INDEX_MAX_DISTANCE", 0.05)
+    monkeypatch.setattr(app.spotify_client, "get_audio_feature_matrix",
+                        lambda access_token, track_ids: feature_rows(len(track_ids), 0.5))
+    top_tracks = [{"id": "top0"}]
+
+    monkeypatch.setattr(app, "TRACK_INDEX_MIN_TRACKS", 20)
+    assert app.local_recommendations("token", top_tracks, limit=5) is None
+
+    monkeypatch.setattr(app, "TRACK_INDEX_MIN_TRACKS", 10)
+    assert app.local_recommendations("token", top_tracks, limit=5) == recommended[:5]
+    assert app.local_recommendations("token", top_tracks, limit=6) is None
+
+
+def test_streamed_tracks_that_arrive_together_are_resolved_together(monkeypatch):
+    def stream_journey(prompt, top_artists, top_tracks, budget=None, seed=None):
+        yield {"tracks": [{"name": "One"}, {"name": "Two"}]}
+        yield {"tracks": [{"name": "Three"}]}
+        yield {"source": "ai", "seed": seed}
+
+    batches = []
+
+    def resolve_tracks(spotify_client, access_token, tracks, cache=None):
+        batches.append([track["name"] for track in tracks])
+        return [{**track, "uri": "spotify:track:" + track["name"]} for track in tracks]
+
+    monkeypatch.setattr(app, "stream_journey", stream_journey)
+    monkeypatch.setattr(app, "resolve_tracks", resolve_tracks)
+    monkeypatch.setattr(app.spotify_client, "get_app_token", lambda: "app-token")
+
+    response = app.app.test_client().post("/create-journey/stream", json={"prompt": "late night drive", "seed": 1})
+    body = response.get_data(as_text=True)
+
+    assert batches == [["One", "Two"], ["Three"]]
+    assert body.count("event: track") == 3
+    assert '"uri": "spotify:track:Three"' in body
+    assert "event: done" in body
@@ -0,0 +1,50 @@
+import asyncio
+from itertools import islice
+
+import asgi
+from async_spotify_client import AsyncSpotifyClient
+
+PAGES = {
+    "short_term": {"items": [{"id": "a"}, {"id": "b"}], "next": "page2"},
+    "page2": {"items": [{"id": "b"}, {"id": "c"}], "next": None},
+    "medium_term": {"items": [{"id": "d"}], "next": None},
+    "long_term": {"items": [{"id": "e"}], "next": None},
+}
+
+
+def fake_client(requested):
+    client = AsyncSpotifyClient("id", "secret", "http://localhost/callback")
+
+    async def get_user_data(access_token, url, params=None):
+        page = url if params is None else params["time_range"]
+        requested.append(page)
+        return PAGES[page]
+
+    client._get_user_data = get_user_data
+    return client
+
+
+def test_top_items_are_fetched_lazily_from_a_worker_thread():
+    requested = []
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        items = asgi.blocking_iter(fake_client(requested).iter_top_artists("token"), loop)
+        first = await loop.run_in_executor(None, lambda: [item["id"] for item in islice(items, 2)])
+        items.close()
+        await asyncio.sleep(0)
+        return first
+
+    assert asyncio.run(main()) == ["a", "b"]
+    # The next page was prefetched, the other time ranges never requested
+    assert requested == ["short_term", "page2"]
+
+
+def test_top_items_skip_duplicates_across_pages_and_time_ranges():
+    requested = []
+
+    async def main():
+        return [item["id"] async for item in fake_client(requested).iter_top_tracks("token")]
+
+    assert asyncio.run(main()) == ["a", "b", "c", "d", "e"]
+    assert requested == ["short_term", "page2", "medium_term", "long_term"]
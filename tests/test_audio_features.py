@@ -0,0 +1,74 @@
+import threading
+
+import numpy as np
+
+from app import SpotifyClient
+from audio_features import AudioFeatureCache
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+def make_client(tmp_path, requests):
+    client = SpotifyClient("id", "secret", "http://localhost/callback",
+                           token_store_path=str(tmp_path / "tokens.sqlite3"), audio_feature_cache=AudioFeatureCache())
+    lock = threading.Lock()
+
+    def request(method, url, **kwargs):
+        ids = kwargs["params"]["ids"].split(",")
+        with lock:
+            requests.append(ids)
+        # Spotify has no features for tracks whose ID starts with "x"
+        return FakeResponse({"audio_features": [
+            None if track_id.startswith("x") else
+            {"id": track_id, "energy": 0.5, "valence": 0.25, "tempo": 120.0, "danceability": 0.75}
+            for track_id in ids
+        ]})
+
+    client._request = request
+    return client
+
+
+def test_ids_are_requested_in_batches_of_100(tmp_path):
+    requests = []
+    client = make_client(tmp_path, requests)
+    track_ids = [f"t{i}" for i in range(250)]
+
+    features = client.get_audio_features("token", track_ids + ["t0", None])
+
+    assert sorted(len(ids) for ids in requests) == [50, 100, 100]
+    assert sorted(track_id for ids in requests for track_id in ids) == sorted(track_ids)
+    assert features["t249"] == (0.5, 0.25, 120.0, 0.75)
+
+
+def test_cached_tracks_skip_the_network(tmp_path):
+    requests = []
+    client = make_client(tmp_path, requests)
+    client.get_audio_features("token", ["a", "b"])
+    requests.clear()
+
+    assert set(client.get_audio_features("token", ["a", "b", "c"])) == {"a", "b", "c"}
+    assert requests == [["c"]]
+    client.get_audio_features("token", ["a", "c"])
+    assert requests == [["c"]]
+
+
+def test_tracks_without_features_are_cached_as_none_and_keep_their_rows(tmp_path):
+    requests = []
+    client = make_client(tmp_path, requests)
+
+    matrix = client.get_audio_feature_matrix("token", ["a", "x1", "b"])
+    assert matrix.dtype == np.float32 and matrix.flags["C_CONTIGUOUS"]
+    assert matrix.shape == (3, 4)
+    assert np.isnan(matrix[1]).all()
+    assert matrix[0].tolist() == matrix[2].tolist() == [0.5, 0.25, 120.0, 0.75]
+
+    requests.clear()
+    matrix = client.get_audio_feature_matrix("token", ["x1", "a"])
+    assert requests == []
+    assert np.isnan(matrix[0]).all() and not np.isnan(matrix[1]).any()
@@ -0,0 +1,47 @@
+import time
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+def test_opens_at_failure_rate_after_min_calls():
+    breaker = CircuitBreaker("test", failure_rate=0.5, min_calls=4)
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.is_open()
+
+
+def test_retry_after_opens_immediately_for_that_long():
+    breaker = CircuitBreaker("test", min_calls=10, open_seconds=30)
+    breaker.record_failure(retry_after=0.05)
+    assert breaker.is_open()
+    time.sleep(0.06)
+    assert breaker.get_state()["state"] == HALF_OPEN
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker("test", min_calls=1, open_seconds=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    assert breaker.is_open()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker("test", min_calls=1, open_seconds=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
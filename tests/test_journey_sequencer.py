@@ -0,0 +1,50 @@
+import numpy as np
+
+from journey_sequencer import CURVES, MOOD_POINTS, NEUTRAL_POINT, mood_order, mood_points, sequence, target_curve
+from track_catalog import MOODS
+from track_record import Track
+
+
+def test_target_curve_runs_through_its_anchors():
+    curve = target_curve(CURVES["peak"], 5)
+    assert curve.shape == (5, 2)
+    assert np.allclose(curve[0], CURVES["peak"][0])
+    assert np.allclose(curve[2], CURVES["peak"][1])
+    assert np.allclose(curve[-1], CURVES["peak"][-1])
+
+
+def test_sequence_follows_a_build_up():
+    rng = np.random.default_rng(3)
+    # Tracks along the curve, slightly off it, in shuffled order
+    points = target_curve(CURVES["build_up"], 30) + rng.normal(0.0, 0.03, (30, 2))
+    shuffled = rng.permutation(30)
+    order = sequence(points[shuffled], CURVES["build_up"])
+    assert sorted(order) == list(range(30))
+    energy = points[shuffled][order, 0]
+    assert energy[:10].mean() < energy[10:20].mean() < energy[20:].mean()
+    assert np.corrcoef(energy, np.arange(30))[0, 1] > 0.95
+
+
+def test_sequence_picks_the_candidates_closest_to_the_curve():
+    points = [(0.9, 0.9), (0.3, 0.35), (0.6, 0.5), (0.05, 0.95), (0.9, 0.7)]
+    order = sequence(points, CURVES["build_up"], length=3)
+    assert order == [1, 2, 4]
+
+
+def test_sequence_edge_cases():
+    assert sequence(np.empty((0, 2))) == []
+    assert sequence([(0.5, 0.5)], length=0) == []
+    # Identical candidates keep their original order
+    assert sequence([(0.5, 0.5)] * 4) == [0, 1, 2, 3]
+
+
+def test_every_mood_has_a_point():
+    assert set(MOOD_POINTS) == set(MOODS)
+    tracks = [Track("A", ("X",), "", "sad", ""), Track("B", ("Y",), "", "unknown", "")]
+    assert mood_points(tracks).tolist() == [list(MOOD_POINTS["sad"]), list(NEUTRAL_POINT)]
+
+
+def test_mood_order_groups_sections_in_journey_order():
+    moods = ["upbeat", "sad", "high_energy", "custom", "sad", "vibey", "melancholic"]
+    tracks = [Track(str(index), ("X",), "", mood, "") for index, mood in enumerate(moods)]
+    assert mood_order(tracks) == [2, 5, 6, 1, 4, 0, 3]
@@ -0,0 +1,44 @@
+import json
+
+from json_stream import JsonArrayParser
+
+TRACKS = [
+    {"title": "Nights", "artist": "Frank Ocean", "reason": "A \"two-part\" song, {braces} and [brackets] in text"},
+    {"title": "Pink + White", "artist": "Frank Ocean", "tags": ["a", {"nested": True}]},
+]
+
+
+def feed_in_pieces(parser, text, size):
+    objects = []
+    for start in range(0, len(text), size):
+        objects.extend(parser.feed(text[start:start + size]))
+    return objects
+
+
+def test_objects_arrive_as_soon_as_they_close():
+    parser = JsonArrayParser()
+    assert parser.feed('Sure! Here is your playlist:\n[{"title": "A", ') == []
+    assert parser.feed('"artist": "B"}') == [{"title": "A", "artist": "B"}]
+    assert parser.started and not parser.closed
+
+
+def test_any_split_gives_the_same_objects():
+    text = "```json\n" + json.dumps(TRACKS, indent=2) + "\n```"
+    for size in (1, 2, 7, len(text)):
+        parser = JsonArrayParser()
+        assert feed_in_pieces(parser, text, size) == TRACKS
+        assert parser.closed
+
+
+def test_malformed_element_is_skipped_and_truncation_keeps_the_prefix():
+    parser = JsonArrayParser()
+    objects = parser.feed('[{"title": "A", "artist": "B"}, {"title": oops}, {"title": "C", "artist": "D"}, {"title": "E", "ar')
+    assert objects == [{"title": "A", "artist": "B"}, {"title": "C", "artist": "D"}]
+    assert parser.skipped == 1
+    assert not parser.closed
+
+
+def test_text_after_the_array_is_ignored():
+    parser = JsonArrayParser()
+    assert parser.feed('[{"a": 1}] and also {"b": 2}') == [{"a": 1}]
+    assert parser.feed('{"c": 3}') == []
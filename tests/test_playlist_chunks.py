@@ -0,0 +1,105 @@
+import asyncio
+import json
+
+import pytest
+import requests
+
+from app import SpotifyClient
+from async_spotify_client import AsyncSpotifyClient
+from rate_limiter import RateLimiter
+
+
+class FakeResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.body = body
+        self.headers = {}
+
+    def json(self):
+        return self.body
+
+
+class FakePlaylist:
+    """
+    Spotify's side of a playlist: POSTs listed in `outcomes` answer that status, and
+    `applied` says whether the insert happened anyway (a 502 from a proxy after the change)
+    """
+
+    def __init__(self, outcomes, state_error=None):
+        self.tracks = []
+        self.outcomes = list(outcomes)
+        self.state_error = state_error
+        self.posts = []
+        self.limiter = RateLimiter(backoff_base=0.0)
+
+    def request(self, method, url, **kwargs):
+        if method == "GET":
+            if self.state_error:
+                raise self.state_error
+            return FakeResponse(200, {"snapshot_id": f"s{len(self.tracks)}", "tracks": {"total": len(self.tracks)}})
+
+        payload = json.loads(kwargs.get("data") or kwargs.get("content"))
+        self.posts.append(payload)
+        status, applied = self.outcomes.pop(0) if self.outcomes else (201, True)
+        if applied:
+            self.tracks[payload["position"]:payload["position"]] = payload["uris"]
+        if status >= 400:
+            return FakeResponse(status, {"error": {"status": status, "message": "Bad gateway"}})
+        return FakeResponse(status, {"snapshot_id": f"s{len(self.tracks)}"})
+
+
+@pytest.fixture
+def client(tmp_path):
+    return SpotifyClient("id", "secret", "http://localhost/callback", token_store_path=str(tmp_path / "tokens.sqlite3"))
+
+
+def use_playlist(client, playlist):
+    client.rate_limiter = playlist.limiter
+    client.session.request = playlist.request
+
+
+def test_applied_gateway_error_is_not_inserted_again(client):
+    playlist = FakePlaylist([(502, True)])
+    use_playlist(client, playlist)
+    result = client.add_tracks_to_playlist("token", "p1", ["a", "b", "c"], position=0)
+    assert "error" not in result
+    assert playlist.tracks == ["a", "b", "c"]
+    assert len(playlist.posts) == 1
+
+
+def test_unapplied_gateway_error_is_retried_once_per_attempt(client):
+    playlist = FakePlaylist([(503, False), (502, False)])
+    use_playlist(client, playlist)
+    result = client.add_tracks_to_playlist("token", "p1", ["a", "b"], position=0)
+    assert result["added"] == 2
+    assert playlist.tracks == ["a", "b"]
+    # The limiter doesn't retry these POSTs on its own
+    assert len(playlist.posts) == 3
+
+
+def test_no_retry_when_the_playlist_cant_be_checked(client):
+    playlist = FakePlaylist([(502, False)], state_error=requests.ConnectionError("down"))
+    use_playlist(client, playlist)
+    result = client.add_tracks_to_playlist("token", "p1", ["a"], position=0)
+    assert result["error"]["status"] == 502
+    assert len(playlist.posts) == 1
+
+
+def test_async_client_checks_before_retrying():
+    playlist = FakePlaylist([(504, True)])
+
+    async def request(method, url, **kwargs):
+        return playlist.request(method, url, **kwargs)
+
+    async def run():
+        client = AsyncSpotifyClient("id", "secret", "http://localhost/callback", rate_limiter=playlist.limiter)
+        client.http.request = request
+        try:
+            return await client.add_tracks_to_playlist("token", "p1", ["a", "b"], position=0)
+        finally:
+            await client.aclose()
+
+    result = asyncio.run(run())
+    assert "error" not in result
+    assert playlist.tracks == ["a", "b"]
+    assert len(playlist.posts) == 1
@@ -0,0 +1,43 @@
+from prompt_spec import parse_prompt
+
+
+def test_track_count_but_not_top_tracks():
+    assert parse_prompt("journey from my top 50 tracks").track_limit is None
+    assert parse_prompt("give me 10 tracks of my top artists").track_limit == 10
+    assert parse_prompt("ten tracks from my top 20 tracks").track_limit == 10
+    assert parse_prompt("15 tracks").track_limit == 15
+    assert parse_prompt("exactly 12 tracks please").track_limit == 12
+    assert parse_prompt("twelve tracks total").track_limit == 12
+    assert parse_prompt("a 15-track journey through my top artists").track_limit == 15
+    assert parse_prompt("exactly 500 tracks").track_limit == 50
+
+
+def test_sized_journey_still_counts_as_a_journey():
+    spec = parse_prompt("a 15-track journey through my top artists")
+    assert spec.mixed_journey
+
+
+def test_tracks_per_mood_is_not_a_track_count():
+    spec = parse_prompt("two tracks per mood")
+    assert spec.tracks_per_mood == 2
+    assert spec.track_limit is None
+
+
+def test_names_inside_lists_still_count_as_mentions():
+    spec = parse_prompt("journey of my top artists. include: playboi carti, future. end with something loud")
+    assert spec.include_artists == ("Playboi Carti", "Future")
+    assert spec.mentions_carti
+    assert spec.finale
+
+    spec = parse_prompt("intro with add track: walk by playboi carti")
+    assert spec.mentions_walk and spec.mentions_carti
+    assert spec.intro
+    assert [track.name for track in spec.custom_tracks] == ["walk"]
+
+
+def test_lists_and_curves():
+    spec = parse_prompt("exclude: drake, future include: sza. more sad, less upbeat. make it build up")
+    assert spec.exclude_artists == ("Drake", "Future")
+    assert spec.include_artists == ("Sza",)
+    assert dict(spec.mood_weights) == {"sad": 2, "upbeat": 0.5}
+    assert spec.energy_curve == "build_up"
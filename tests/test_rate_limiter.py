@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from rate_limiter import (
+    RateLimiter,
+    RateLimitExceeded,
+    parse_retry_after,
+    retry_statuses_for,
+)
+
+
+class FakeResponse:
+    def __init__(self, status_code, retry_after=None):
+        self.status_code = status_code
+        self.headers = {"Retry-After": retry_after} if retry_after is not None else {}
+
+
+def sender(*statuses):
+    calls = []
+
+    def send():
+        calls.append(None)
+        return statuses[len(calls) - 1]
+    return send, calls
+
+
+def limiter(**kwargs):
+    return RateLimiter(**{"backoff_base": 0.0, "max_retries": 3, **kwargs})
+
+
+def test_get_retries_server_errors():
+    send, calls = sender(FakeResponse(502), FakeResponse(503), FakeResponse(200))
+    assert limiter().call(send, retry_statuses=retry_statuses_for("GET")).status_code == 200
+    assert len(calls) == 3
+
+
+def test_post_does_not_retry_server_errors():
+    rate_limiter = limiter()
+    send, calls = sender(FakeResponse(502), FakeResponse(200))
+    assert rate_limiter.call(send, retry_statuses=retry_statuses_for("POST")).status_code == 502
+    assert len(calls) == 1
+    assert rate_limiter.get_stats()["retries"] == 0
+
+
+def test_post_retries_rate_limited():
+    send, calls = sender(FakeResponse(429, "0"), FakeResponse(201))
+    assert limiter().call(send, retry_statuses=retry_statuses_for("POST")).status_code == 201
+    assert len(calls) == 2
+
+
+def test_retry_after_is_remembered_even_without_retrying():
+    rate_limiter = limiter(max_wait=0.5)
+    send, calls = sender(FakeResponse(429, "30"))
+    assert rate_limiter.call(send, "user", retry_statuses=()).status_code == 429
+    assert len(calls) == 1
+    with pytest.raises(RateLimitExceeded):
+        rate_limiter.acquire("someone else")
+
+
+def test_gives_up_after_max_retries():
+    rate_limiter = limiter(max_retries=2)
+    send, calls = sender(*[FakeResponse(500)] * 5)
+    assert rate_limiter.call(send).status_code == 500
+    assert len(calls) == 3
+    assert rate_limiter.get_stats()["gave_up"] == 1
+
+
+def test_in_flight_cap():
+    rate_limiter = limiter(max_in_flight=1, max_wait=0.05)
+    rate_limiter.acquire()
+    with pytest.raises(RateLimitExceeded):
+        rate_limiter.acquire()
+    rate_limiter.release()
+    rate_limiter.acquire()
+
+
+def test_async_call_uses_the_same_rules():
+    statuses = iter([FakeResponse(502), FakeResponse(200)])
+
+    async def send():
+        return next(statuses)
+
+    response = asyncio.run(limiter().call_async(send, retry_statuses=retry_statuses_for("POST")))
+    assert response.status_code == 502
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("2.5") == 2.5
+    assert parse_retry_after("-1") == 0.0
+    assert parse_retry_after("soon") == 1.0
+    assert parse_retry_after(None, default=None) is None
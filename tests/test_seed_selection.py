@@ -0,0 +1,39 @@
+from seed_selection import maximal_marginal_relevance, select_seeds
+
+import numpy as np
+
+
+def artist(artist_id, genre):
+    return {"id": artist_id, "genres": [genre]}
+
+
+def track(track_id, artist_id):
+    return {"id": track_id, "artists": [{"id": artist_id}]}
+
+
+FEATURES = {
+    "a1": (0.8, 0.5, 120, 0.7), "a2": (0.81, 0.5, 121, 0.7), "a3": (0.8, 0.52, 119, 0.7),
+    "b1": (0.3, 0.2, 90, 0.4), "c1": (0.5, 0.9, 150, 0.5), "d1": (0.2, 0.7, 100, 0.9),
+}
+
+
+def test_seeds_by_an_already_picked_artist_come_last():
+    # The user's top artist also has their top three tracks, which sound alike
+    artists = [artist("A", "rap")]
+    tracks = [track("a1", "A"), track("a2", "A"), track("a3", "A"),
+              track("b1", "B"), track("c1", "C"), track("d1", "D")]
+
+    seed_artists, seed_tracks = select_seeds([artists] * 3, [tracks] * 3, FEATURES)
+
+    assert seed_artists == ["A"]
+    assert seed_tracks[:3] == ["b1", "c1", "d1"]
+    assert len(seed_artists) + len(seed_tracks) == 5
+
+
+def test_seeds_without_history():
+    assert select_seeds([[]] * 3, [[]] * 3, {}) == ([], [])
+
+
+def test_relevance_weight_one_takes_the_top_items():
+    similarity = np.ones((3, 3))
+    assert maximal_marginal_relevance(np.array([0.2, 1.0, 0.5]), similarity, 2, relevance_weight=1.0) == [1, 2]
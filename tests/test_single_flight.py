@@ -0,0 +1,128 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from single_flight import SingleFlight, request_key
+
+
+def test_request_key_ignores_param_order_and_types():
+    assert request_key("GET", "/me", {"a": 1, "b": "x"}) == request_key("GET", "/me", {"b": "x", "a": "1"})
+    assert request_key("GET", "/me", headers={"Authorization": "a"}) != request_key("GET", "/me", headers={"Authorization": "b"})
+
+
+def test_concurrent_calls_share_one_result():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "result"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("key", fetch)))
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=lambda: results.append(flight.do("key", fetch)))
+    follower.start()
+    time.sleep(0.05)
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert results == ["result", "result"]
+    assert len(calls) == 1
+    assert flight.get_stats()["shared"] == 1
+
+
+def test_followers_share_the_error():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def fail():
+        started.set()
+        release.wait(5)
+        raise ValueError("upstream")
+
+    errors = []
+
+    def run():
+        try:
+            flight.do("key", fail)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run)]
+    threads[0].start()
+    started.wait(5)
+    threads.append(threading.Thread(target=run))
+    threads[1].start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(errors) == 2 and errors[0] is errors[1]
+
+
+def test_follower_stops_waiting_after_timeout():
+    flight = SingleFlight(wait_timeout=0.05)
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "leader"
+
+    leader = threading.Thread(target=lambda: flight.do("key", slow))
+    leader.start()
+    started.wait(5)
+    assert flight.do("key", lambda: "own") == "own"
+    assert flight.get_stats()["wait_timeouts"] == 1
+    release.set()
+    leader.join()
+
+
+def test_async_followers_get_the_result_when_the_leader_is_cancelled():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do_async("key", fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do_async("key", fetch))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert await follower == "result"
+        assert flight.async_calls == {}
+
+    asyncio.run(main())
+    assert len(calls) == 1
+
+
+def test_async_errors_reach_every_caller():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream")
+
+    async def main():
+        results = await asyncio.gather(flight.do_async("key", fail), flight.do_async("key", fail), return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+
+    asyncio.run(main())
+    assert flight.get_stats()["calls"] == 1
@@ -0,0 +1,73 @@
+from spotify_common import TopItemPages, add_tracks_steps, slice_top_items, top_items_count
+
+
+def items(*ids):
+    return [{"id": item_id} for item_id in ids]
+
+
+def test_top_items_count_only_slices_valid_limits():
+    assert top_items_count("5") == 5
+    assert top_items_count(50) == 50
+    assert top_items_count(0) is None
+    assert top_items_count(51) is None
+    assert top_items_count("ten") is None
+    assert slice_top_items({"items": items(1, 2, 3), "limit": 50}, 2) == {"items": items(1, 2), "limit": 2}
+    assert slice_top_items({"error": "nope"}, 2) == {"error": "nope"}
+
+
+def test_top_item_pages_follow_cursor_then_next_range_without_repeats():
+    pages = TopItemPages("top", ("short_term", "long_term"), None, 2)
+    assert pages.first() == ("top", {"time_range": "short_term", "limit": 2})
+    assert pages.take({"items": items(1, 2), "next": "top?offset=2"}) == (items(1, 2), ("top?offset=2", None))
+    assert pages.take({"items": items(3)}) == (items(3), ("top", {"time_range": "long_term", "limit": 2}))
+    assert pages.take({"items": items(2, 4)}) == (items(4), None)
+
+
+def test_top_item_pages_stop_at_max_items_or_error():
+    pages = TopItemPages("top", ("short_term", "long_term"), 3, 2)
+    pages.first()
+    assert pages.take({"items": items(1, 2), "next": "more"}) == (items(1, 2), ("more", None))
+    assert pages.take({"items": items(3, 4), "next": "more"}) == (items(3), None)
+
+    pages = TopItemPages("top", ("short_term", "long_term"), None, 2)
+    pages.first()
+    assert pages.take({"error": {"status": 401}}) == ([], None)
+
+
+def run_steps(steps, answers):
+    """
+    Answer each step from answers[kind] in turn, returning the steps taken and the result
+    """
+    taken = []
+    answer = None
+    while True:
+        try:
+            step = steps.send(answer)
+        except StopIteration as done:
+            return taken, done.value
+        taken.append(step)
+        answer = answers[step[0]].pop(0) if step[0] != "wait" else None
+
+
+def test_add_steps_chain_chunks_from_the_playlist_length():
+    taken, result = run_steps(add_tracks_steps("p", ["a", "b", "c"], None, 2, 2), {
+        "state": [{"snapshot_id": "s0", "tracks": {"total": 4}}],
+        "add": [(201, {"snapshot_id": "s1"}, False), (201, {"snapshot_id": "s2"}, False)],
+    })
+    assert taken == [("state",), ("add", ["a", "b"], 4), ("add", ["c"], 6)]
+    assert result == {"snapshot_id": "s2", "snapshot_ids": ["s1", "s2"], "added": 3}
+
+
+def test_add_steps_retry_only_server_errors_and_raised_calls():
+    failed = {"error": {"status": 400, "message": "bad uri"}}
+    taken, result = run_steps(add_tracks_steps("p", ["a"], 0, 100, 2), {"add": [(400, failed, False)]})
+    assert taken == [("add", ["a"], 0)]
+    assert result["error"] == failed["error"] and result["added"] == 0
+
+    dropped = {"error": {"status": 200, "message": "not JSON"}}
+    taken, result = run_steps(add_tracks_steps("p", ["a"], 0, 100, 2), {
+        "add": [(200, dropped, True), (201, {"snapshot_id": "s1"}, False)],
+        "state": [{"snapshot_id": "s0", "tracks": {"total": 0}}],
+    })
+    assert taken == [("add", ["a"], 0), ("wait", 0, 200), ("state",), ("add", ["a"], 0)]
+    assert result["snapshot_ids"] == ["s1"]
@@ -0,0 +1,61 @@
+import sqlite3
+import threading
+
+from recommendation_cache import RecommendationCache
+from search_cache import SearchCache
+from sqlite_store import SQLiteStore
+
+SCHEMA = ("CREATE TABLE IF NOT EXISTS items (key TEXT PRIMARY KEY, value TEXT)",)
+
+
+def test_each_thread_gets_its_own_connection(tmp_path):
+    store = SQLiteStore(str(tmp_path / "store.sqlite3"), SCHEMA)
+    connections = []
+    thread = threading.Thread(target=lambda: connections.append(store.connect()))
+    thread.start()
+    thread.join()
+    assert store.connect() is store.connect()
+    assert connections[0] is not store.connect()
+
+
+def test_schema_runs_once_per_process(tmp_path, monkeypatch):
+    path = str(tmp_path / "store.sqlite3")
+    SQLiteStore(path, SCHEMA).connect()
+
+    statements = []
+    connect = sqlite3.connect
+
+    def traced(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    monkeypatch.setattr(sqlite3, "connect", traced)
+    conn = SQLiteStore(path, SCHEMA).connect()
+    assert statements == ["PRAGMA synchronous=NORMAL"]
+    assert conn.execute("SELECT COUNT(*) FROM items").fetchone() == (0,)
+    assert conn.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+
+
+def test_eviction_is_due_every_n_writes(tmp_path):
+    store = SQLiteStore(str(tmp_path / "store.sqlite3"), SCHEMA, evict_every=3)
+    assert [store.writes_due_eviction() for _ in range(7)] == [False, False, True, False, False, True, False]
+
+
+def test_search_cache_round_trip_and_eviction(tmp_path):
+    cache = SearchCache(path=str(tmp_path / "search.sqlite3"), max_entries=2)
+    cache.set("a", {"id": 1})
+    cache.set("b", None)
+    cache.set("c", {"id": 3})
+    assert cache.get("a") == (True, {"id": 1})
+    assert cache.get("b") == (True, None)
+    assert cache.get("missing") == (False, None)
+    cache.evict()
+    assert cache.get_stats()["evicted"] == 1
+
+
+def test_shared_recommendation_cache(tmp_path):
+    path = str(tmp_path / "recommendations.sqlite3")
+    key = RecommendationCache.make_key("  Sad  Songs ", "artists", "tracks")
+    RecommendationCache(path=path).set(key, [{"name": "x"}])
+    assert RecommendationCache(path=path).get(RecommendationCache.make_key("sad songs", "artists", "tracks")) == (True, [{"name": "x"}])
@@ -0,0 +1,42 @@
+import os
+import stat
+import time
+
+from token_store import TokenStore
+
+
+def make_store(tmp_path, refreshed):
+    def refresh(refresh_token):
+        refreshed.append(refresh_token)
+        return {"access_token": f"new-{refresh_token}", "expires_in": 3600}
+    return TokenStore(refresh, path=str(tmp_path / "private" / "tokens.sqlite3"), active_within=600)
+
+
+def expire(store, session_id, last_used):
+    now = time.time()
+    store.store.connect().execute(
+        "UPDATE sessions SET expires_at = ?, last_used = ? WHERE session_id = ?", (now + 60, now - last_used, session_id))
+
+
+def test_background_refresh_only_renews_active_sessions(tmp_path):
+    refreshed = []
+    store = make_store(tmp_path, refreshed)
+    active = store.create_session({"access_token": "a", "refresh_token": "ra"})
+    idle = store.create_session({"access_token": "b", "refresh_token": "rb"})
+    expire(store, active, last_used=60)
+    expire(store, idle, last_used=24 * 3600)
+
+    assert store.refresh_expiring() == 1
+    assert refreshed == ["ra"]
+
+    # The idle session is renewed once it's used again and its token runs out
+    store.store.connect().execute("UPDATE sessions SET expires_at = ? WHERE session_id = ?", (time.time() + 10, idle))
+    assert store.get_access_token(idle) == "new-rb"
+    assert refreshed == ["ra", "rb"]
+
+
+def test_token_file_is_private(tmp_path):
+    store = make_store(tmp_path, [])
+    store.create_session({"access_token": "a", "refresh_token": "ra"})
+    assert stat.S_IMODE(os.stat(store.path).st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(os.path.dirname(store.path)).st_mode) == 0o700
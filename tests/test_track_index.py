@@ -0,0 +1,98 @@
+import threading
+
+import numpy as np
+
+from audio_features import FEATURE_COLUMNS
+from track_index import TrackIndex
+
+
+def random_tracks(count, seed=0, prefix="t"):
+    rng = np.random.default_rng(seed)
+    matrix = rng.random((count, len(FEATURE_COLUMNS)), dtype=np.float32)
+    matrix[:, 2] *= 200.0
+    return [{"id": f"{prefix}{i}"} for i in range(count)], matrix
+
+
+def brute_force(matrix, point, n, exclude=()):
+    scaled = matrix.copy()
+    scaled[:, 2] /= 200.0
+    target = np.array(point, dtype=np.float32)
+    target[2] /= 200.0
+    distances = ((scaled - target) ** 2).sum(axis=1)
+    order = [i for i in np.argsort(distances, kind="stable") if f"t{i}" not in exclude]
+    return [f"t{i}" for i in order[:n]]
+
+
+def test_exact_matches_brute_force_and_skips_excluded():
+    tracks, matrix = random_tracks(500)
+    index = TrackIndex(max_tracks=1000, approximate_above=10000)
+    index.add(tracks, matrix)
+    point = matrix[0]
+    exclude = {"t0", "t5"}
+    found = [track["id"] for track in index.nearest(point, 10, exclude=exclude)]
+    assert found == brute_force(matrix, point, 10, exclude)
+    assert not exclude & set(found)
+
+
+def test_approximate_recall():
+    tracks, matrix = random_tracks(5000)
+    index = TrackIndex(max_tracks=5000, approximate_above=1000, probes=8)
+    index.add(tracks, matrix)
+    index.build_future.result()
+    queries = random_tracks(50, seed=1)[1]
+    hits = 0
+    for point in queries:
+        found = {track["id"] for track in index.nearest(point, 10)}
+        hits += len(found & set(brute_force(matrix, point, 10)))
+    assert index.get_stats()["approximate_queries"] == 50
+    assert hits / (50 * 10) >= 0.95
+
+
+def test_max_distance_leaves_out_far_tracks():
+    tracks = [{"id": "near"}, {"id": "far"}]
+    matrix = np.array([[0.5, 0.5, 100.0, 0.5], [1.0, 0.0, 200.0, 1.0]], dtype=np.float32)
+    index = TrackIndex(max_tracks=10)
+    index.add(tracks, matrix)
+    found = index.nearest(np.array([0.5, 0.5, 100.0, 0.5]), 2, max_distance=0.05)
+    assert [track["id"] for track in found] == ["near"]
+
+
+def test_overwrites_oldest_when_full():
+    tracks, matrix = random_tracks(15)
+    index = TrackIndex(max_tracks=10)
+    index.add(tracks, matrix)
+    assert index.get_stats()["tracks"] == 10
+    assert set(index.rows) == {f"t{i}" for i in range(5, 15)}
+
+
+def test_rows_added_during_a_build_are_searched():
+    tracks, matrix = random_tracks(2000)
+    index = TrackIndex(max_tracks=5000, approximate_above=1000)
+
+    started, resume = threading.Event(), threading.Event()
+    assign = TrackIndex._assign
+
+    def slow_assign(points, centroids):
+        started.set()
+        resume.wait(5)
+        return assign(points, centroids)
+
+    index._assign = slow_assign
+    # Crossing approximate_above starts the build in the background
+    index.add(tracks, matrix)
+    assert started.wait(5)
+    build = index.build_future
+
+    # Adds and queries go through meanwhile, without starting another build
+    late = {"id": "late"}
+    index.add([late], np.array([[0.01, 0.01, 2.0, 0.01]], dtype=np.float32))
+    assert index.nearest(np.array([0.0, 0.0, 0.0, 0.0]), 1) == [late]
+    assert index.get_stats()["exact_queries"] == 1
+    assert index.build_future is build
+    resume.set()
+    build.result(5)
+
+    assert index.get_stats()["builds"] == 1
+    assert index.nearest(np.array([0.0, 0.0, 0.0, 0.0]), 1) == [late]
+    assert index.get_stats()["approximate_queries"] == 1
+
@@ -0,0 +1,94 @@
+import asyncio
+import threading
+
+from track_resolver import (
+    MIN_MATCH_SCORE,
+    cache_key,
+    normalize,
+    resolve_tracks,
+    resolve_tracks_async,
+    resolved_uris,
+    similarity,
+)
+
+
+def search_result(name, artist):
+    slug = name.lower().replace(" ", "-")
+    return {"tracks": {"items": [{
+        "name": name, "uri": f"spotify:track:{slug}", "id": slug,
+        "artists": [{"name": artist, "id": artist.lower()}],
+        "album": {"name": "Album", "images": []},
+    }]}}
+
+
+class FakeClient:
+    def __init__(self):
+        self.queries = []
+
+    def search_tracks(self, access_token, query, limit=5):
+        self.queries.append(query)
+        title = query.split('"')[1]
+        return search_result(title, "Artist") if title != "Unknown Song" else {"tracks": {"items": []}}
+
+
+class RecordingCache:
+    """
+    Dict-backed stand-in for SearchCache that records which threads touch it
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.threads = set()
+
+    def get(self, key):
+        self.threads.add(threading.current_thread().name)
+        return (True, self.entries[key]) if key in self.entries else (False, None)
+
+    def set(self, key, value):
+        self.threads.add(threading.current_thread().name)
+        self.entries[key] = value
+
+
+def journey(*titles):
+    return [{"name": title, "artists": [{"name": "Artist"}]} for title in titles]
+
+
+def test_resolves_in_order_and_reuses_the_cache():
+    client, cache = FakeClient(), RecordingCache()
+    tracks = resolve_tracks(client, "token", journey("One", "Unknown Song", "Two"), cache=cache)
+    assert resolved_uris(tracks) == ["spotify:track:one", "spotify:track:two"]
+    assert "uri" not in tracks[1]
+    assert {name.startswith("track-resolver") for name in cache.threads} == {True}
+
+    resolve_tracks(client, "token", journey("Two", "One", "Unknown Song"), cache=cache)
+    assert len(client.queries) == 3
+
+
+def test_async_keeps_sqlite_off_the_event_loop():
+    class AsyncClient(FakeClient):
+        async def search_tracks(self, access_token, query, limit=5):
+            return FakeClient.search_tracks(self, access_token, query, limit)
+
+    client, cache = AsyncClient(), RecordingCache()
+    tracks = asyncio.run(resolve_tracks_async(client, "token", journey("One", "Two"), cache=cache))
+    assert resolved_uris(tracks) == ["spotify:track:one", "spotify:track:two"]
+    assert cache.threads and all(name.startswith("track-resolver") for name in cache.threads)
+
+
+def test_normalize_keeps_non_latin_text():
+    assert normalize("Beyoncé") == "beyonce"
+    assert normalize("Sigur Rós - Remastered 2011") == "sigur ros"
+    assert normalize("Лето (feat. X)") == "лето"
+    assert normalize("夜に駆ける") == "夜に駆ける"
+    assert normalize("방탄소년단") == "방탄소년단"
+    assert similarity("Кино", "Звезда") < MIN_MATCH_SCORE
+    assert cache_key("夜に駆ける", "YOASOBI") != cache_key("アイドル", "YOASOBI")
+
+
+def test_non_latin_titles_resolve():
+    class NonLatinClient(FakeClient):
+        def search_tracks(self, access_token, query, limit=5):
+            return search_result("夜に駆ける", "YOASOBI")
+
+    tracks = resolve_tracks(NonLatinClient(), "token", [{"name": "夜に駆ける", "artists": [{"name": "YOASOBI"}]}])
+    assert tracks[0].get("uri")
@@ -0,0 +1,26 @@
+import ttl_cache
+from audio_features import AudioFeatureCache
+from ttl_cache import TTLCache
+
+
+def test_entries_expire(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(ttl_cache.time, "monotonic", lambda: now[0])
+    cache = TTLCache(ttl=10, max_entries=10)
+    cache.store("key", "value")
+    assert cache.lookup("key") == (True, "value")
+    now[0] += 11
+    assert cache.lookup("key") == (False, None)
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_audio_features_keep_tracks_without_features():
+    cache = AudioFeatureCache(max_entries=2)
+    cache.set_many({"a": (0.5, 0.5, 120.0, 0.5), "b": None})
+    assert cache.get_many(["a", "b", "c"]) == ({"a": (0.5, 0.5, 120.0, 0.5), "b": None}, ["c"])
+
+    # "a" was used last, so "b" is evicted
+    cache.get_many(["a"])
+    cache.set_many({"c": None})
+    assert cache.get_many(["a", "b", "c"])[1] == ["b"]
+    assert cache.get_stats() == {"ttl": 7 * 24 * 3600, "entries": 2, "max_entries": 2, "hits": 5, "misses": 2}
@@ -0,0 +1,44 @@
+from user_cache import UserDataCache
+
+PROFILE = UserDataCache.make_key("https://api.spotify.com/v1/me")
+TOP = UserDataCache.make_key("https://api.spotify.com/v1/me/top/artists", {"limit": 50})
+
+
+def test_linked_entries_survive_a_token_refresh():
+    cache = UserDataCache()
+    cache.link("old-token", "session:1")
+    cache.set("old-token", PROFILE, {"id": "user"})
+
+    cache.link("new-token", "session:1")
+    assert cache.get("new-token", PROFILE) == (True, {"id": "user"})
+    assert cache.invalidate("new-token") == 1
+    assert cache.get("old-token", PROFILE) == (False, None)
+
+
+def test_unlinked_tokens_are_kept_apart():
+    cache = UserDataCache()
+    cache.set("a", PROFILE, {"id": "a"})
+    assert cache.get("b", PROFILE) == (False, None)
+    assert cache.get("a", PROFILE) == (True, {"id": "a"})
+
+
+def test_byte_cap_evicts_least_recently_used():
+    cache = UserDataCache(max_bytes=100)
+    cache.set("a", PROFILE, {}, size=40)
+    cache.set("b", PROFILE, {}, size=40)
+    cache.get("a", PROFILE)
+    cache.set("c", TOP, {}, size=40)
+    assert cache.get("b", PROFILE) == (False, None)
+    assert cache.get("a", PROFILE)[0] and cache.get("c", TOP)[0]
+    assert cache.get_stats()["bytes"] == 80
+
+    cache.set("a", PROFILE, {}, size=10)
+    assert cache.get_stats()["bytes"] == 50
+
+
+def test_entry_cap():
+    cache = UserDataCache(max_entries=2)
+    for user in "abc":
+        cache.set(user, PROFILE, {})
+    assert cache.get_stats()["entries"] == 2
+    assert cache.get("a", PROFILE) == (False, None)
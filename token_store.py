@@ -0,0 +1,251 @@
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+from sqlite_store import SQLiteStore
+
+# Refresh tokens are stored in plain text, so the file lives next to the app (Flask's
+# instance folder) rather than in the shared temp directory, and only its owner can read it
+DEFAULT_TOKEN_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "spotify_token_store.sqlite3")
+
+
+class TokenStore:
+    """
+    Server-side store of Spotify tokens, keyed by an opaque session id handed to the browser.
+
+    Refresh tokens never leave the server. A background thread renews access tokens of
+    sessions used in the last `active_within` seconds that expire within `refresh_margin`
+    seconds, so active users almost never wait on a token refresh or fail on an expired
+    token. Other sessions are renewed when they're next used. The SQLite file is shared by all workers on the machine;
+    a short claim on each row keeps two workers from refreshing the same session at once.
+    """
+
+    def __init__(self, refresh, path=DEFAULT_TOKEN_STORE_PATH, refresh_margin=300, check_interval=60, max_idle=30 * 24 * 3600, active_within=3600):
+        # refresh(refresh_token) -> Spotify token response
+        self.refresh = refresh
+        self.path = path
+        self.refresh_margin = refresh_margin
+        self.check_interval = check_interval
+        self.max_idle = max_idle
+        self.active_within = active_within
+        # Writes are rare and must survive a crash, so SQLite's default FULL sync is kept
+        self.store = SQLiteStore(path, (
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " session_id TEXT PRIMARY KEY,"
+            " access_token TEXT NOT NULL,"
+            " refresh_token TEXT,"
+            " expires_at REAL NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " refreshing_until REAL NOT NULL DEFAULT 0)",
+            "CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires_at)",
+        ), synchronous=None, private=True)
+        self.refresher = None
+        self.stopped = threading.Event()
+        self.store.connect()
+
+    def create_session(self, token_info):
+        """
+        Store the tokens from an authorization-code exchange and return a new session id
+        """
+        session_id = secrets.token_urlsafe(32)
+        now = time.time()
+        self.store.connect().execute(
+            "INSERT INTO sessions (session_id, access_token, refresh_token, expires_at, last_used) VALUES (?, ?, ?, ?, ?)",
+            (session_id, token_info['access_token'], token_info.get('refresh_token'),
+             now + int(token_info.get('expires_in', 3600)), now)
+        )
+        return session_id
+
+    def get_access_token(self, session_id):
+        """
+        Return a valid access token for the session, or None if the session is unknown
+        or its token can no longer be renewed
+        """
+        conn = self.store.connect()
+        row = conn.execute(
+            "SELECT access_token, refresh_token, expires_at FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        access_token, refresh_token, expires_at = row
+        now = time.time()
+        conn.execute("UPDATE sessions SET last_used = ? WHERE session_id = ?", (now, session_id))
+        if expires_at - now > 30:
+            return access_token
+
+        # The background refresher missed this one (e.g. the worker just started); renew inline
+        renewed = self._renew(session_id, refresh_token)
+        if renewed:
+            return renewed
+        return access_token if expires_at > now else None
+
+    def delete_session(self, session_id):
+        self.store.connect().execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def _claim(self, session_id, now):
+        # Only one worker gets to refresh a session in any 30 second window
+        claimed = self.store.connect().execute(
+            "UPDATE sessions SET refreshing_until = ? WHERE session_id = ? AND refreshing_until < ?",
+            (now + 30, session_id, now)
+        ).rowcount
+        return claimed == 1
+
+    def _renew(self, session_id, refresh_token, wait=True):
+        if not refresh_token:
+            return None
+        now = time.time()
+        if not self._claim(session_id, now):
+            if not wait:
+                return None
+            # Another worker is refreshing it; pick up its result if it has finished
+            time.sleep(0.5)
+            row = self.store.connect().execute(
+                "SELECT access_token, expires_at FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            return row[0] if row and row[1] > time.time() else None
+
+        try:
+            token_info = self.refresh(refresh_token)
+        except Exception as e:
+            print(f"Error refreshing Spotify token: {str(e)}")
+            token_info = {}
+
+        conn = self.store.connect()
+        if 'access_token' not in token_info:
+            print(f"Could not refresh Spotify token: {token_info.get('error')}")
+            if token_info.get('error') == 'invalid_grant':
+                # Revoked or expired refresh token; stop trying, the user has to log in again
+                conn.execute("UPDATE sessions SET refresh_token = NULL, refreshing_until = 0 WHERE session_id = ?", (session_id,))
+            else:
+                conn.execute("UPDATE sessions SET refreshing_until = 0 WHERE session_id = ?", (session_id,))
+            return None
+
+        conn.execute(
+            "UPDATE sessions SET access_token = ?, refresh_token = ?, expires_at = ?, refreshing_until = 0 WHERE session_id = ?",
+            (token_info['access_token'],
+             # Spotify only sometimes rotates the refresh token
+             token_info.get('refresh_token') or refresh_token,
+             time.time() + int(token_info.get('expires_in', 3600)),
+             session_id)
+        )
+        return token_info['access_token']
+
+    def refresh_expiring(self):
+        """
+        Renew every recently used session whose access token expires within refresh_margin,
+        and drop sessions nobody has used for max_idle seconds
+        """
+        now = time.time()
+        conn = self.store.connect()
+        conn.execute("DELETE FROM sessions WHERE last_used < ?", (now - self.max_idle,))
+        expiring = conn.execute(
+            "SELECT session_id, refresh_token FROM sessions"
+            " WHERE expires_at < ? AND last_used >= ? AND refreshing_until < ? AND refresh_token IS NOT NULL",
+            (now + self.refresh_margin, now - self.active_within, now)
+        ).fetchall()
+        renewed = 0
+        for session_id, refresh_token in expiring:
+            if self._renew(session_id, refresh_token, wait=False):
+                renewed += 1
+        return renewed
+
+    def start(self):
+        """
+        Start the background refresher thread (once per process)
+        """
+        if self.refresher is not None:
+            return
+        self.refresher = threading.Thread(target=self._run, name="token-refresher", daemon=True)
+        self.refresher.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def _run(self):
+        while not self.stopped.wait(self.check_interval):
+            try:
+                renewed = self.refresh_expiring()
+                if renewed:
+                    print(f"Refreshed {renewed} Spotify access tokens")
+            except Exception as e:
+                print(f"Error in token refresher: {str(e)}")
+
+    def get_stats(self):
+        now = time.time()
+        total, expiring = self.store.connect().execute(
+            "SELECT COUNT(*), SUM(CASE WHEN expires_at < ? THEN 1 ELSE 0 END) FROM sessions", (now + self.refresh_margin,)
+        ).fetchone()
+        return {"sessions": total, "expiring_soon": expiring or 0, "refresh_margin": self.refresh_margin}
+
+
+class AppTokenCache:
+    """
+    Client-credentials (app) token shared by all workers through the same SQLite file as
+    TokenStore. Each process also keeps the token in memory, so the common path is a dict
+    read; the token is fetched again `refresh_margin` seconds before it expires.
+    """
+
+    def __init__(self, fetch, path=DEFAULT_TOKEN_STORE_PATH, refresh_margin=300):
+        # fetch() -> Spotify token response for the client-credentials grant
+        self.fetch = fetch
+        self.path = path
+        self.refresh_margin = refresh_margin
+        self.store = SQLiteStore(path, (
+            "CREATE TABLE IF NOT EXISTS app_token ("
+            " id INTEGER PRIMARY KEY CHECK (id = 1),"
+            " access_token TEXT NOT NULL,"
+            " expires_at REAL NOT NULL)",
+        ), synchronous=None, private=True)
+        self.lock = threading.Lock()
+        self.token = None
+        self.expires_at = 0.0
+
+    def _fresh(self, expires_at):
+        return expires_at - time.time() > self.refresh_margin
+
+    def get_token(self):
+        """
+        Return a valid app access token, or None if Spotify won't issue one
+        """
+        if self.token and self._fresh(self.expires_at):
+            return self.token
+
+        with self.lock:
+            if self.token and self._fresh(self.expires_at):
+                return self.token
+
+            # Another worker may already have fetched one
+            try:
+                row = self.store.connect().execute("SELECT access_token, expires_at FROM app_token WHERE id = 1").fetchone()
+            except sqlite3.Error as e:
+                print(f"App token cache read failed: {str(e)}")
+                row = None
+            if row and self._fresh(row[1]):
+                self.token, self.expires_at = row
+                return self.token
+
+            try:
+                token_info = self.fetch()
+            except Exception as e:
+                print(f"Error fetching Spotify app token: {str(e)}")
+                token_info = {}
+            if 'access_token' not in token_info:
+                print(f"Could not get Spotify app token: {token_info.get('error')}")
+                # A token that is past the refresh margin but not yet expired still works
+                if self.token and self.expires_at > time.time():
+                    return self.token
+                return None
+
+            self.token = token_info['access_token']
+            self.expires_at = time.time() + int(token_info.get('expires_in', 3600))
+            try:
+                self.store.connect().execute(
+                    "INSERT OR REPLACE INTO app_token (id, access_token, expires_at) VALUES (1, ?, ?)",
+                    (self.token, self.expires_at)
+                )
+            except sqlite3.Error as e:
+                print(f"App token cache write failed: {str(e)}")
+            return self.token
@@ -0,0 +1,235 @@
+from collections import defaultdict
+
+from track_record import Track
+
+# The order moods are played in a journey
+MOODS = ("high_energy", "vibey", "melancholic", "sad", "upbeat")
+
+# Every song the local recommenders know: id -> (name, credited artists, album, default reason)
+SONGS = {
+    # Playboi Carti
+    "walk": ("WALK", ("Playboi Carti",), "WHOLE LOTTA RED", "Requested as the intro track - high energy opener"),
+    "new_tank": ("New Tank", ("Playboi Carti",), "Whole Lotta Red", "Rage-type track with aggressive delivery"),
+    "stop_breathing": ("Stop Breathing", ("Playboi Carti",), "Whole Lotta Red", "Intense, aggressive track with a hard-hitting beat"),
+    "rip": ("R.I.P.", ("Playboi Carti",), "Die Lit", "Mosh pit energy with punk-inspired production"),
+    "location": ("Location", ("Playboi Carti",), "Playboi Carti", "Ethereal production with ambient qualities"),
+    "sky": ("Sky", ("Playboi Carti",), "Whole Lotta Red", "More vibey and ambient sound with melodic elements"),
+    "place": ("Place", ("Playboi Carti",), "Whole Lotta Red", "Spacey production with a relaxed flow"),
+    "flex": ("Flex", ("Playboi Carti", "Leven Kali"), "Playboi Carti", "Smooth, laid-back track with dreamy production"),
+    "iloveuihateu": ("ILoveUIHateU", ("Playboi Carti",), "Whole Lotta Red", "Melancholic but still energetic with bittersweet lyrics"),
+    "over": ("Over", ("Playboi Carti",), "Whole Lotta Red", "Reflective track with a nostalgic feel"),
+    "fell_in_luv": ("Fell In Luv", ("Playboi Carti", "Bryson Tiller"), "Die Lit", "Emotional track about love with a dreamy beat"),
+    "long_time": ("Long Time (Intro)", ("Playboi Carti",), "Die Lit", "Emotional and reflective with introspective lyrics"),
+    "f33l_lik3_dyin": ("F33l Lik3 Dyin", ("Playboi Carti",), "Whole Lotta Red", "Emotional outro to Whole Lotta Red with vulnerable lyrics"),
+    "control": ("Control", ("Playboi Carti",), "Whole Lotta Red", "Emotional track with themes of love and vulnerability"),
+    "magnolia": ("Magnolia", ("Playboi Carti",), "Playboi Carti", "Bouncy and upbeat with an infectious hook"),
+    "shoota": ("Shoota", ("Playboi Carti", "Lil Uzi Vert"), "Die Lit", "Energetic collaboration with a playful vibe"),
+    "wokeuplikethis": ("wokeuplikethis*", ("Playboi Carti", "Lil Uzi Vert"), "Playboi Carti", "Upbeat track with a catchy melody"),
+    "slay3r": ("Slay3r", ("Playboi Carti",), "Whole Lotta Red", "Bouncy track with a fun, energetic vibe"),
+    "teen_x": ("Teen X", ("Playboi Carti", "Future"), "Whole Lotta Red", "Experimental and high-energy finale that blends multiple styles"),
+    "metamorphosis": ("Metamorphosis", ("Playboi Carti", "Kid Cudi"), "Whole Lotta Red", "Psychedelic track that combines energy with emotional depth - perfect finale"),
+    # Kendrick Lamar
+    "dna": ("DNA.", ("Kendrick Lamar",), "DAMN.", "Intense lyrics and hard-hitting beat with aggressive delivery"),
+    "humble": ("HUMBLE.", ("Kendrick Lamar",), "DAMN.", "Confident, assertive track with a powerful beat"),
+    "maad_city": ("m.A.A.d city", ("Kendrick Lamar", "MC Eiht"), "good kid, m.A.A.d city", "Intense storytelling with a hard-hitting beat"),
+    "pride": ("PRIDE.", ("Kendrick Lamar",), "DAMN.", "Introspective track with a dreamy, nostalgic production"),
+    "u": ("u", ("Kendrick Lamar",), "To Pimp A Butterfly", "Intense emotional breakdown with themes of self-loathing and guilt"),
+    # Drake
+    "passionfruit": ("Passionfruit", ("Drake",), "More Life", "Tropical house-influenced track with a relaxed, groovy feel"),
+    "marvins_room": ("Marvin's Room", ("Drake",), "Take Care", "Raw emotional vulnerability with drunk phone calls and regret"),
+    "nice_for_what": ("Nice For What", ("Drake",), "Scorpion", "Bouncy New Orleans bounce-inspired track with an empowering message"),
+    "headlines": ("Headlines", ("Drake",), "Take Care", "Confident track with a triumphant feel that works well as a finale"),
+    # Travis Scott
+    "sicko_mode": ("Sicko Mode", ("Travis Scott", "Drake"), "Astroworld", "High energy track with dynamic beat changes and multiple sections"),
+    "goosebumps": ("Goosebumps", ("Travis Scott", "Kendrick Lamar"), "Birds in the Trap Sing McKnight", "Hypnotic, high-energy track with psychedelic elements"),
+    "skeletons": ("SKELETONS", ("Travis Scott",), "Astroworld", "Psychedelic and dreamy production with a hypnotic feel"),
+    "stargazing": ("STARGAZING", ("Travis Scott",), "Astroworld", "Psychedelic track with a beat switch that serves as a perfect finale"),
+    # Kanye West
+    "power": ("POWER", ("Kanye West",), "My Beautiful Dark Twisted Fantasy", "Powerful production with energetic delivery"),
+    "flashing_lights": ("Flashing Lights", ("Kanye West", "Dwele"), "Graduation", "Lush production with strings and synths creating an immersive atmosphere"),
+    "runaway": ("Runaway", ("Kanye West", "Pusha T"), "My Beautiful Dark Twisted Fantasy", "Beautiful piano intro leading to an introspective journey of self-awareness"),
+    "street_lights": ("Street Lights", ("Kanye West",), "808s & Heartbreak", "Emotional track with auto-tuned vocals expressing vulnerability"),
+    "good_life": ("Good Life", ("Kanye West", "T-Pain"), "Graduation", "Celebratory track with a positive message and catchy chorus"),
+    "stronger": ("Stronger", ("Kanye West",), "Graduation", "Triumphant finale that combines electronic elements with motivational themes"),
+    "all_of_the_lights": ("All of the Lights", ("Kanye West", "Rihanna", "Kid Cudi"), "My Beautiful Dark Twisted Fantasy", "Grand, orchestral production that brings together multiple elements for an epic conclusion"),
+    # Frank Ocean
+    "nights": ("Nights", ("Frank Ocean",), "Blonde", "Atmospheric with a beat switch that changes the mood halfway through"),
+    "self_control": ("Self Control", ("Frank Ocean",), "Blonde", "Bittersweet lyrics with beautiful guitar and vocal layering"),
+    "ivy": ("Ivy", ("Frank Ocean",), "Blonde", "Reflective lyrics about past relationships with a nostalgic tone"),
+    # Tyler, The Creator
+    "earfquake": ("EARFQUAKE", ("Tyler, The Creator",), "IGOR", "Bouncy track with a catchy chorus and playful energy"),
+    "see_you_again": ("See You Again", ("Tyler, The Creator", "Kali Uchis"), "Flower Boy", "Dreamy production with nostalgic lyrics about longing"),
+    # The Weeknd
+    "after_hours": ("After Hours", ("The Weeknd",), "After Hours", "Ambient production with a hypnotic rhythm and nocturnal feel"),
+    "blinding_lights": ("Blinding Lights", ("The Weeknd",), "After Hours", "Energetic 80s-inspired synth-pop track with a driving beat"),
+    # Everyone else
+    "mo_bamba": ("Mo Bamba", ("Sheck Wes",), "Mudboy", "Rage-inducing anthem with heavy bass and crowd-pleasing energy"),
+    "redbone": ("Redbone", ("Childish Gambino",), "Awaken, My Love!", "Smooth, funk-inspired groove with atmospheric production"),
+    "505": ("505", ("Arctic Monkeys",), "Favourite Worst Nightmare", "Nostalgic and builds to an emotional climax with yearning lyrics"),
+    "mirrors": ("Mirrors", ("Justin Timberlake",), "The 20/20 Experience", "Reflective lyrics with a bittersweet melody and expansive production"),
+    "jocelyn_flores": ("Jocelyn Flores", ("XXXTENTACION",), "17", "Deeply emotional tribute to a friend who passed away"),
+    "hurt": ("Hurt", ("Johnny Cash",), "American IV: The Man Comes Around", "Powerful cover filled with regret and reflection"),
+    "everybody_hurts": ("Everybody Hurts", ("R.E.M.",), "Automatic for the People", "Universal anthem about pain and the importance of perseverance"),
+    "sunflower": ("Sunflower", ("Post Malone", "Swae Lee"), "Spider-Man: Into the Spider-Verse", "Bright melody with uplifting lyrics and a catchy chorus"),
+    "good_feeling": ("Good Feeling", ("Flo Rida",), "Wild Ones", "Energetic dance track with positive vibes and motivational lyrics"),
+    "dance_with_somebody": ("I Wanna Dance With Somebody", ("Whitney Houston",), "Whitney", "Classic feel-good dance anthem with joyful energy"),
+    "cant_stop_the_feeling": ("Can't Stop the Feeling!", ("Justin Timberlake",), "Trolls (Original Motion Picture Soundtrack)", "Infectious pop song designed to make people dance and feel good"),
+    "uptown_funk": ("Uptown Funk", ("Mark Ronson", "Bruno Mars"), "Uptown Special", "Funk-inspired hit with irresistible groove and confident energy"),
+}
+
+# Which songs each recommender draws from, by section. A section is a mood or "finale"
+# (finale tracks are high energy). An entry is a song id, or (song id, reason) where a
+# collection describes the song differently.
+#
+# - signature: per artist, used when the artist is one of the user's top artists
+# - outro: per artist, replaces the Playboi Carti finale when a different outro is asked for;
+#   the first artist the user listens to wins, "" is the default
+# - backfill: tops up a thin mood in a top-artists journey, first usable entry wins
+# - carti, mixed, general: the three fixed fallback journeys
+COLLECTIONS = {
+    "signature": {
+        "Playboi Carti": {
+            "high_energy": ["new_tank", "stop_breathing"],
+            "vibey": ["location", "sky"],
+            "melancholic": ["iloveuihateu"],
+            "sad": ["f33l_lik3_dyin"],
+            "upbeat": ["magnolia", "slay3r"],
+            "finale": ["teen_x", "metamorphosis"],
+        },
+        "Kendrick Lamar": {
+            "high_energy": ["dna", "humble"],
+            "melancholic": ["pride"],
+            "sad": ["u"],
+        },
+        "Drake": {
+            "vibey": ["passionfruit"],
+            "sad": ["marvins_room"],
+            "upbeat": ["nice_for_what"],
+        },
+        "Travis Scott": {
+            "high_energy": ["sicko_mode"],
+            "vibey": ["skeletons"],
+        },
+        "Kanye West": {
+            "high_energy": ["power"],
+            "melancholic": ["runaway"],
+            "sad": ["street_lights"],
+            "upbeat": ["good_life"],
+        },
+        "Frank Ocean": {
+            "vibey": ["nights"],
+            "melancholic": ["self_control", "ivy"],
+        },
+        "Tyler, The Creator": {
+            "upbeat": ["earfquake"],
+            "melancholic": ["see_you_again"],
+        },
+        "The Weeknd": {
+            "vibey": ["after_hours"],
+            "upbeat": ["blinding_lights"],
+        },
+    },
+    "outro": {
+        "Kanye West": {"finale": ["stronger"]},
+        "Travis Scott": {"finale": ["stargazing"]},
+        "Drake": {"finale": ["headlines"]},
+        "": {"finale": ["stronger"]},
+    },
+    "backfill": {
+        "": {
+            "high_energy": ["mo_bamba"],
+            "vibey": ["redbone"],
+            "melancholic": ["505"],
+            "sad": ["jocelyn_flores", "hurt"],
+            "upbeat": ["sunflower"],
+            "finale": ["stronger"],
+        },
+    },
+    "carti": {
+        "": {
+            "high_energy": ["walk", ("new_tank", "High energy, rage-type track with aggressive delivery"), "stop_breathing", "rip"],
+            "vibey": ["sky", "place", "flex", "location"],
+            "melancholic": ["iloveuihateu", "over", "fell_in_luv"],
+            "sad": ["long_time", "f33l_lik3_dyin", "control"],
+            "upbeat": ["magnolia", "shoota", "wokeuplikethis", "slay3r"],
+            "finale": ["teen_x", ("metamorphosis", "Psychedelic track that combines energy with emotional depth")],
+        },
+    },
+    "mixed": {
+        "": {
+            "high_energy": ["sicko_mode", "dna", "new_tank", "power", "maad_city"],
+            "vibey": ["nights", "location", "redbone", "after_hours", "flashing_lights"],
+            "melancholic": ["self_control", "iloveuihateu", "runaway", "ivy", "505"],
+            "sad": ["marvins_room", "f33l_lik3_dyin", "u", "jocelyn_flores", "street_lights"],
+            "upbeat": ["magnolia", "good_life", "sunflower", "earfquake", "slay3r"],
+            "finale": ["teen_x", "metamorphosis"],
+        },
+    },
+    "general": {
+        "": {
+            "high_energy": [("sicko_mode", "High energy opener with dynamic beat changes and multiple sections"), "dna", "mo_bamba", "humble", "goosebumps"],
+            "vibey": ["redbone", "nights", "after_hours", "passionfruit", "flashing_lights"],
+            "melancholic": ["self_control", "505", "ivy", "runaway", "mirrors"],
+            "sad": ["marvins_room", "jocelyn_flores", "u", ("hurt", "Powerful cover filled with regret and reflection at the end of life"), "everybody_hurts"],
+            "upbeat": ["sunflower", "good_feeling", "dance_with_somebody", "cant_stop_the_feeling", "uptown_funk"],
+            "finale": ["stronger", "all_of_the_lights"],
+        },
+    },
+}
+
+
+def artist_key(name):
+    return " ".join((name or "").lower().split())
+
+
+class TrackCatalog:
+    """
+    The local song catalog, built once at import. Tracks are looked up by collection,
+    artist and section instead of being rebuilt on every request, so adding artists
+    doesn't make journeys slower.
+
+    A song that appears in several collections with the same mood and reason is one record.
+    """
+
+    def __init__(self, songs, collections):
+        self.songs = songs
+        self.records = {}
+        self.sections = {}
+        self.by_artist = defaultdict(list)
+        self.intro = self._track("walk", "high_energy")
+
+        for collection, groups in collections.items():
+            for group, sections in groups.items():
+                for section, entries in sections.items():
+                    mood = "high_energy" if section == "finale" else section
+                    tracks = []
+                    for entry in entries:
+                        song_id, reason = entry if isinstance(entry, tuple) else (entry, None)
+                        track = self._track(song_id, mood, reason)
+                        tracks.append(track)
+                        if collection == "signature":
+                            self.by_artist[artist_key(group)].append(track)
+                    self.sections[(collection, artist_key(group), section)] = tuple(tracks)
+
+        self.outro_artists = tuple(group for group in collections["outro"] if group)
+
+    def _track(self, song_id, mood, reason=None):
+        name, artists, album, default_reason = self.songs[song_id]
+        key = (song_id, mood, reason or default_reason)
+        if key not in self.records:
+            self.records[key] = Track(name, artists, album, mood, reason or default_reason)
+        return self.records[key]
+
+    def get(self, collection, section, artist=""):
+        return self.sections.get((collection, artist_key(artist), section), ())
+
+    def has_artist(self, artist):
+        return artist_key(artist) in self.by_artist
+
+
+CATALOG = TrackCatalog(SONGS, COLLECTIONS)
+
+
+def credits_any(track, artists):
+    keys = {artist_key(artist) for artist in artists}
+    return any(artist_key(credited) in keys for credited in track.artists)
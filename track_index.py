@@ -0,0 +1,189 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from audio_features import FEATURE_COLUMNS, normalized
+
+# Rows assigned to clusters per chunk while building, to bound the temporary distance matrix
+_BUILD_CHUNK = 8192
+
+
+class TrackIndex:
+    """
+    In-process nearest-neighbour index over audio feature vectors of tracks the app has
+    seen in Spotify's recommendations, for generating candidates without a network call.
+
+    Up to max_tracks tracks are kept in one preallocated float32 matrix; beyond that the
+    oldest are overwritten. Below approximate_above tracks, queries compare against every
+    row (exact). From there on the rows are grouped into k-means clusters and a query only
+    compares against the rows of the `probes` clusters nearest to it (approximate). The
+    clusters are rebuilt once a quarter of the rows have been added since the last build;
+    rows added in between are always compared. add() starts the rebuild on the index's own
+    background thread, one at a time, over a snapshot of the rows; queries never wait for
+    it and use the previous clusters, or compare every row if there are none yet.
+
+    Stored track dicts are shared with callers and must not be mutated.
+    """
+
+    def __init__(self, max_tracks=50000, approximate_above=20000, probes=8):
+        self.max_tracks = max_tracks
+        self.approximate_above = approximate_above
+        self.probes = probes
+        self.features = np.zeros((max_tracks, len(FEATURE_COLUMNS)), dtype=np.float32)
+        self.tracks = [None] * max_tracks
+        self.rows = {}
+        self.size = 0
+        self.next_row = 0
+        self.lock = threading.Lock()
+
+        # Approximate mode: cluster centres, rows sorted by cluster with each cluster's
+        # start offset, and rows added since the clusters were built
+        self.centroids = None
+        self.members = None
+        self.offsets = None
+        self.unclustered = []
+        # Rows added while a build is running, or None when no build is
+        self.building = None
+        self.build_future = None
+        self.build_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="track-index")
+        self.stats = {"exact_queries": 0, "approximate_queries": 0, "builds": 0}
+
+    def add(self, tracks, matrix):
+        """
+        Index Spotify track dicts with their rows of a feature matrix (see
+        audio_features.feature_matrix). Tracks without an ID or features are skipped;
+        tracks already indexed are updated in place.
+        """
+        scaled = normalized(matrix)
+        added = 0
+        with self.lock:
+            for track, values in zip(tracks, scaled):
+                track_id = track.get('id')
+                if not track_id or np.isnan(values).any():
+                    continue
+                row = self.rows.get(track_id)
+                if row is None:
+                    row = self.next_row
+                    self.next_row = (row + 1) % self.max_tracks
+                    replaced = self.tracks[row]
+                    if replaced is not None:
+                        del self.rows[replaced['id']]
+                    else:
+                        self.size += 1
+                    self.rows[track_id] = row
+                    if self.centroids is not None:
+                        self.unclustered.append(row)
+                    if self.building is not None:
+                        self.building.append(row)
+                    added += 1
+                self.tracks[row] = track
+                self.features[row] = values
+
+            points = None
+            if self.building is None and self.size >= self.approximate_above and (
+                    self.centroids is None or len(self.unclustered) * 4 > self.size):
+                self.building = []
+                points = self.features[:self.size].copy()
+        if points is not None:
+            self.build_future = self.build_executor.submit(self._build, points)
+        return added
+
+    def nearest(self, point, n=20, exclude=(), max_distance=None):
+        """
+        The n indexed tracks closest to a feature vector (e.g. audio_features.centroid of
+        a user's top tracks), nearest first, leaving out the track IDs in exclude and,
+        with max_distance, tracks further than that (squared, over normalized features)
+        """
+        target = normalized(point)[0]
+        with self.lock:
+            if self.size < self.approximate_above or self.centroids is None:
+                candidates = np.arange(self.size)
+                self.stats["exact_queries"] += 1
+            else:
+                candidates = self._probe(target)
+                self.stats["approximate_queries"] += 1
+
+            excluded = [self.rows[track_id] for track_id in exclude if track_id in self.rows]
+            if excluded:
+                candidates = candidates[~np.isin(candidates, excluded)]
+            distances = ((self.features[candidates] - target) ** 2).sum(axis=1)
+            if max_distance is not None:
+                close = distances <= max_distance
+                candidates, distances = candidates[close], distances[close]
+            count = min(n, len(candidates))
+            if count <= 0:
+                return []
+
+            closest = np.argpartition(distances, count - 1)[:count]
+            closest = closest[np.argsort(distances[closest], kind="stable")]
+            return [self.tracks[row] for row in candidates[closest]]
+
+    def _probe(self, target):
+        nearest_clusters = np.argsort(((self.centroids - target) ** 2).sum(axis=1))[:self.probes]
+        parts = [self.members[self.offsets[cluster]:self.offsets[cluster + 1]] for cluster in nearest_clusters]
+        parts.append(np.array(self.unclustered, dtype=np.intp))
+        # A row overwritten since the build can be both a member and unclustered
+        return np.unique(np.concatenate(parts))
+
+    def _build(self, points, iterations=8):
+        """
+        k-means over points, a snapshot of every row, with about sqrt(size) clusters,
+        swapped in when done. Runs on build_executor.
+        """
+        try:
+            clusters = max(min(int(np.sqrt(len(points))), len(points)), 1)
+            # Fixed seed so the same rows always give the same clusters
+            start = np.random.default_rng(0).choice(len(points), clusters, replace=False)
+            centroids = points[start].astype(np.float64)
+
+            for _ in range(iterations):
+                assignment = self._assign(points, centroids)
+                counts = np.bincount(assignment, minlength=clusters)
+                sums = np.column_stack([
+                    np.bincount(assignment, weights=points[:, column], minlength=clusters)
+                    for column in range(points.shape[1])
+                ])
+                filled = counts > 0
+                # Empty clusters keep their previous centre
+                centroids[filled] = sums[filled] / counts[filled, None]
+
+            assignment = self._assign(points, centroids)
+            members = np.argsort(assignment, kind="stable")
+            offsets = np.searchsorted(assignment[members], np.arange(clusters + 1))
+        except Exception as e:
+            print(f"Error building track index clusters: {str(e)}")
+            with self.lock:
+                self.building = None
+            return
+
+        with self.lock:
+            self.centroids = centroids.astype(np.float32)
+            self.members = members
+            self.offsets = offsets
+            # Rows added or overwritten during the build aren't in the snapshot
+            self.unclustered = self.building
+            self.building = None
+            self.stats["builds"] += 1
+
+    @staticmethod
+    def _assign(points, centroids):
+        centres = (-2.0 * centroids.T).astype(np.float32)
+        centroid_norms = (centroids ** 2).sum(axis=1).astype(np.float32)
+        assignment = np.empty(len(points), dtype=np.intp)
+        for start in range(0, len(points), _BUILD_CHUNK):
+            # |x - c|^2 without the |x|^2 term, which doesn't change the closest centre
+            distances = points[start:start + _BUILD_CHUNK] @ centres
+            distances += centroid_norms
+            assignment[start:start + _BUILD_CHUNK] = np.argmin(distances, axis=1)
+        return assignment
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "tracks": self.size,
+                "max_tracks": self.max_tracks,
+                "mode": "approximate" if self.size >= self.approximate_above else "exact",
+                "clusters": 0 if self.centroids is None else len(self.centroids),
+                **self.stats
+            }
@@ -0,0 +1,36 @@
+from collections import namedtuple
+
+
+class Track(namedtuple("Track", ("name", "artists", "album", "mood", "reason"))):
+    """
+    Immutable journey track: a plain tuple with artist names as a tuple of strings.
+
+    Journeys are assembled from these and only turned into the JSON shape the API returns
+    ({'name', 'artists': [{'name'}], 'album': {'name'}, 'mood', 'reason'}) by to_dict() at
+    the response boundary. Being immutable, one record can sit in the catalog, in caches
+    and in many journeys at once without being copied.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_dict(cls, track):
+        return cls(
+            track.get('name', ''),
+            tuple(artist.get('name', '') for artist in track.get('artists', [])),
+            (track.get('album') or {}).get('name', ''),
+            track.get('mood', ''),
+            track.get('reason', '')
+        )
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'artists': [{'name': artist} for artist in self.artists],
+            'album': {'name': self.album},
+            'mood': self.mood,
+            'reason': self.reason
+        }
+
+
+def to_dicts(tracks):
+    return [track.to_dict() for track in tracks]
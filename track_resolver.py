@@ -0,0 +1,198 @@
+import asyncio
+import re
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from difflib import SequenceMatcher
+
+# How many searches run at once while resolving a journey
+RESOLVE_CONCURRENCY = 8
+
+# Shared by every resolve in the process, so the threads (and their SQLite search cache
+# connections) are reused instead of started for each journey
+resolve_executor = ThreadPoolExecutor(max_workers=RESOLVE_CONCURRENCY, thread_name_prefix="track-resolver")
+
+# Matches scoring below this are treated as "not found" rather than attached to the wrong song
+MIN_MATCH_SCORE = 0.6
+
+# Text in brackets ("(feat. X)", "[Remastered 2011]", "- Radio Edit") that shouldn't affect matching
+_DECORATION = re.compile(r"\s*[\(\[].*?[\)\]]|\s+-\s+.*$")
+_NON_WORD = re.compile(r"[^\w\s]")
+
+
+def normalize(text):
+    """
+    Casefolded text without diacritics, bracketed decorations or punctuation. Letters of
+    every script are kept, so non-Latin titles still compare ("Beyoncé" -> "beyonce",
+    "夜に駆ける" stays as it is).
+    """
+    decomposed = unicodedata.normalize("NFKD", (text or "").casefold())
+    text = unicodedata.normalize("NFC", "".join(char for char in decomposed if not unicodedata.combining(char)))
+    text = _DECORATION.sub("", text)
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+def similarity(a, b):
+    a, b = normalize(a), normalize(b)
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def track_title(track):
+    return track.get('name') or track.get('title') or ''
+
+
+def track_artist(track):
+    artists = track.get('artists') or [{}]
+    return artists[0].get('name', '') or track.get('artist', '')
+
+
+def cache_key(title, artist):
+    return f"{normalize(title)}\x1f{normalize(artist)}"
+
+
+def compact_match(match):
+    """
+    The parts of a search result that apply_match uses, small enough to cache
+    """
+    album = match.get('album') or {}
+    return {
+        'name': match.get('name'),
+        'uri': match.get('uri'),
+        'id': match.get('id'),
+        'artists': [{'name': artist.get('name'), 'id': artist.get('id')} for artist in match.get('artists', [])],
+        'album': {'name': album.get('name'), 'images': album.get('images', [])},
+        'external_urls': match.get('external_urls', {})
+    }
+
+
+def search_query(title, artist):
+    query = f'track:"{title}"'
+    if artist:
+        query += f' artist:"{artist}"'
+    return query
+
+
+def match_score(title, artist, candidate):
+    """
+    Score a Spotify search result against the suggested title/artist. Title counts
+    for 60%, the best-matching credited artist for 40%.
+    """
+    title_score = similarity(title, candidate.get('name', ''))
+    artist_score = max((similarity(artist, credited.get('name', '')) for credited in candidate.get('artists', [])), default=0.0)
+    if not artist:
+        return title_score
+    return 0.6 * title_score + 0.4 * artist_score
+
+
+def best_match(title, artist, search_response):
+    if not search_response or 'error' in search_response:
+        return None
+    candidates = search_response.get('tracks', {}).get('items', [])
+    scored = [(match_score(title, artist, candidate), candidate) for candidate in candidates if candidate]
+    if not scored:
+        return None
+    score, candidate = max(scored, key=lambda pair: pair[0])
+    return candidate if score >= MIN_MATCH_SCORE else None
+
+
+def apply_match(track, match):
+    """
+    Copy the Spotify identifiers and album art from a search match onto a journey track
+    """
+    resolved = dict(track)
+    resolved['uri'] = match.get('uri')
+    resolved['id'] = match.get('id')
+    album = dict(resolved.get('album') or {})
+    album.setdefault('name', match.get('album', {}).get('name', 'Unknown Album'))
+    album['images'] = match.get('album', {}).get('images', [])
+    resolved['album'] = album
+    if match.get('external_urls'):
+        resolved['external_urls'] = match['external_urls']
+    return resolved
+
+
+def _cached(cache, title, artist):
+    if cache is None:
+        return False, None
+    return cache.get(cache_key(title, artist))
+
+
+def _finish(cache, track, title, artist, response):
+    match = best_match(title, artist, response)
+    # Only cache real answers; a failed search (rate limited, expired token) says nothing about the song
+    if cache is not None and response and 'error' not in response:
+        cache.set(cache_key(title, artist), compact_match(match) if match else None)
+    if match is None:
+        print(f"No confident match for '{title}' by {artist}")
+        return track
+    return apply_match(track, match)
+
+
+def resolve_track(spotify_client, access_token, track, cache=None):
+    """
+    Resolve a single journey track, e.g. one streamed from the model
+    """
+    if track.get('uri'):
+        return track
+    title, artist = track_title(track), track_artist(track)
+    found, match = _cached(cache, title, artist)
+    if found:
+        return apply_match(track, match) if match else track
+    try:
+        response = spotify_client.search_tracks(access_token, search_query(title, artist), limit=5)
+    except Exception as e:
+        print(f"Error searching for '{title}' by {artist}: {str(e)}")
+        return track
+    return _finish(cache, track, title, artist, response)
+
+
+def resolve_tracks(spotify_client, access_token, tracks, cache=None):
+    """
+    Look up Spotify URIs for AI-suggested tracks on the shared resolver threads, up to
+    RESOLVE_CONCURRENCY searches at once per process. Returns the tracks in their original
+    order; each track that matched gets 'uri', 'id' and album art, the rest are returned
+    unchanged. With a SearchCache, earlier answers for the same title/artist are reused
+    without searching.
+    """
+    if not tracks:
+        return []
+    if len(tracks) == 1:
+        # Not worth a hop to another thread
+        return [resolve_track(spotify_client, access_token, tracks[0], cache)]
+    return list(resolve_executor.map(lambda track: resolve_track(spotify_client, access_token, track, cache), tracks))
+
+
+async def resolve_tracks_async(spotify_client, access_token, tracks, cache=None, max_concurrency=RESOLVE_CONCURRENCY):
+    """
+    Async version of resolve_tracks for AsyncSpotifyClient. Search cache reads and writes
+    are blocking SQLite calls, so they run on the resolver threads, off the event loop.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    loop = asyncio.get_running_loop()
+
+    async def resolve_one(track):
+        if track.get('uri'):
+            return track
+        title, artist = track_title(track), track_artist(track)
+        found, match = await loop.run_in_executor(resolve_executor, _cached, cache, title, artist)
+        if found:
+            return apply_match(track, match) if match else track
+        async with semaphore:
+            try:
+                response = await spotify_client.search_tracks(access_token, search_query(title, artist), limit=5)
+            except Exception as e:
+                print(f"Error searching for '{title}' by {artist}: {str(e)}")
+                return track
+        return await loop.run_in_executor(resolve_executor, _finish, cache, track, title, artist, response)
+
+    return list(await asyncio.gather(*(resolve_one(track) for track in tracks)))
+
+
+def resolved_uris(tracks):
+    """
+    URIs of the resolved tracks, in journey order, ready for add_tracks_to_playlist
+    """
+    return [track['uri'] for track in tracks if track.get('uri')]
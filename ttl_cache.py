@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Thread-safe in-memory LRU cache whose entries expire ttl seconds after they were set.
+    Holds at most max_entries entries and, with max_bytes, about max_bytes of them (as
+    measured by the size passed to store()). Least recently used entries are evicted first.
+    The base of the per-user and per-track caches.
+    """
+
+    def __init__(self, ttl, max_entries, max_bytes=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        # Reentrant so subclasses can hold it around several calls
+        self.lock = threading.RLock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def _drop(self, key):
+        self.bytes -= self.entries.pop(key)[2]
+
+    def lookup(self, key):
+        """
+        Return (found, value)
+        """
+        found, missing = self.get_many((key,))
+        return (True, found[key]) if found else (False, None)
+
+    def get_many(self, keys):
+        """
+        Return ({key: value} for the keys cached, [keys that aren't])
+        """
+        found = {}
+        missing = []
+        now = time.monotonic()
+        with self.lock:
+            for key in keys:
+                entry = self.entries.get(key)
+                if entry is None or entry[0] < now:
+                    if entry is not None:
+                        self._drop(key)
+                    missing.append(key)
+                    continue
+                self.entries.move_to_end(key)
+                found[key] = entry[1]
+            self.stats["hits"] += len(found)
+            self.stats["misses"] += len(missing)
+        return found, missing
+
+    def store(self, key, value, size=0):
+        self.set_many({key: value}, size)
+
+    def set_many(self, values, size=0):
+        """
+        Cache each of values ({key: value}); size is the byte size of each
+        """
+        expires_at = time.monotonic() + self.ttl
+        with self.lock:
+            for key, value in values.items():
+                if key in self.entries:
+                    self._drop(key)
+                self.entries[key] = (expires_at, value, size)
+                self.bytes += size
+            while self.entries and (len(self.entries) > self.max_entries
+                                    or (self.max_bytes is not None and self.bytes > self.max_bytes)):
+                self._drop(next(iter(self.entries)))
+
+    def get_stats(self):
+        with self.lock:
+            stats = {"ttl": self.ttl, "entries": len(self.entries), "max_entries": self.max_entries}
+            if self.max_bytes is not None:
+                stats.update(bytes=self.bytes, max_bytes=self.max_bytes)
+            return {**stats, **self.stats}
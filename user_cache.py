@@ -0,0 +1,70 @@
+from collections import OrderedDict
+
+from ttl_cache import TTLCache
+
+
+class UserDataCache(TTLCache):
+    """
+    Short-lived in-memory cache of per-user Spotify data (profile, top artists, top tracks),
+    keyed by the user and the request parameters. A logged-in session that hits
+    /user-profile, /top-artists, /top-tracks and then /create-journey fetches each resource
+    once instead of once per endpoint.
+
+    Entries are stored under the key of the token that fetched them, unless that token has
+    been linked to its session with link(); then they're stored under the session, so they
+    survive the token being refreshed. The cache holds at most max_entries responses and
+    about max_bytes of them (measured as the size of the response body).
+
+    Cached responses are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, ttl=300, max_entries=1000, max_bytes=32 * 1024 * 1024):
+        super().__init__(ttl, max_entries, max_bytes)
+        # token key -> session key, least recently linked first
+        self.owners = OrderedDict()
+        self.stats["invalidations"] = 0
+
+    @staticmethod
+    def make_key(url, params=None):
+        # Query args arrive as strings from Flask and as ints from internal callers
+        return (url, tuple(sorted((name, str(value)) for name, value in (params or {}).items())))
+
+    def link(self, user_key, owner_key):
+        """
+        File entries for the token user_key under owner_key (its session) from now on
+        """
+        with self.lock:
+            self.owners[user_key] = owner_key
+            self.owners.move_to_end(user_key)
+            while len(self.owners) > self.max_entries:
+                self.owners.popitem(last=False)
+
+    def _owner(self, user_key):
+        return self.owners.get(user_key, user_key)
+
+    def get(self, user_key, key):
+        """
+        Return (found, value)
+        """
+        with self.lock:
+            return self.lookup((self._owner(user_key), key))
+
+    def set(self, user_key, key, value, size=0):
+        """
+        Cache value; size is the byte size of the response it was parsed from
+        """
+        with self.lock:
+            self.store((self._owner(user_key), key), value, size)
+
+    def invalidate(self, user_key, url=None):
+        """
+        Drop a user's cached data, or only the entries for one endpoint URL
+        """
+        with self.lock:
+            owner = self._owner(user_key)
+            stale = [entry_key for entry_key in self.entries
+                     if entry_key[0] == owner and (url is None or entry_key[1][0] == url)]
+            for entry_key in stale:
+                self._drop(entry_key)
+            self.stats["invalidations"] += 1
+            return len(stale)